@@ -0,0 +1,235 @@
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import networkx as nx
+from parser import Expresion, SIN_REQUISITOS, hojas_requisitos
+
+TIPOS_ARISTA = ("COURSE", "COURSE_CRED")
+# créditos requeridos de una arista que no los tiene
+SIN_CREDITOS = -1
+
+
+class AlmacenCursos:
+    """Cursos del catálogo en arreglos paralelos, una posición por curso.
+
+    Las posiciones siguen el orden de inserción y un curso eliminado deja su
+    posición vacía, así que recorrer el almacén da el mismo orden que tenían los
+    nodos del grafo. Cada curso guarda su expresión de requisitos y sus aristas
+    entrantes como tuplas (posición de origen, tipo, créditos requeridos).
+    """
+
+    def __init__(self):
+        self._ids: List[Optional[str]] = []
+        self._posiciones: Dict[str, int] = {}
+        self._codigos: List[Optional[str]] = []
+        self._nombres: List[Optional[str]] = []
+        self._requisitos: List[Expresion] = []
+        self._entrantes: List[Tuple[Tuple[int, int, int], ...]] = []
+        self._creditos = np.zeros(0, dtype=np.float64)
+        self._niveles = np.zeros(0, dtype=np.int64)
+        self._carreras = np.zeros(0, dtype=np.int32)
+        self.tabla_carreras: List[str] = []
+        self._ids_carrera: Dict[str, int] = {}
+        # muchos cursos comparten la misma expresión de requisitos (p. ej. ninguna)
+        self._requisitos_unicos: Dict[Expresion, Expresion] = {}
+        self.version = 0
+        self._adyacencia: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+        self._vista: Optional[nx.DiGraph] = None
+
+    def __len__(self) -> int:
+        return len(self._posiciones)
+
+    def __contains__(self, id_curso) -> bool:
+        return id_curso in self._posiciones
+
+    def __iter__(self) -> Iterator[str]:
+        return (id_curso for id_curso in self._ids if id_curso is not None)
+
+    def _modificado(self):
+        self.version += 1
+        self._adyacencia = None
+        self._vista = None
+
+    def _asegurar_capacidad(self, total: int):
+        if total <= len(self._creditos):
+            return
+        capacidad = max(64, 2 * len(self._creditos), total)
+        for nombre in ("_creditos", "_niveles", "_carreras"):
+            anterior = getattr(self, nombre)
+            nuevo = np.zeros(capacidad, dtype=anterior.dtype)
+            nuevo[:len(anterior)] = anterior
+            setattr(self, nombre, nuevo)
+
+    def _id_de_carrera(self, carrera: str) -> int:
+        id_carrera = self._ids_carrera.get(carrera)
+        if id_carrera is None:
+            id_carrera = self._ids_carrera[carrera] = len(self.tabla_carreras)
+            self.tabla_carreras.append(carrera)
+        return id_carrera
+
+    def agregar(self, id_curso: str, codigo: str, creditos: float, nombre: str, nivel: int,
+                carrera: str, requisitos: Expresion) -> bool:
+        # Devuelve True si el curso es nuevo; si ya existía se actualizan sus datos
+        # y conserva su posición y sus aristas
+        posicion = self._posiciones.get(id_curso)
+        nuevo = posicion is None
+        if nuevo:
+            posicion = len(self._ids)
+            self._asegurar_capacidad(posicion + 1)
+            self._posiciones[id_curso] = posicion
+            self._ids.append(id_curso)
+            self._codigos.append(None)
+            self._nombres.append(None)
+            self._requisitos.append(SIN_REQUISITOS)
+            self._entrantes.append(())
+
+        self._codigos[posicion] = sys.intern(codigo)
+        self._nombres[posicion] = sys.intern(nombre or "")
+        self._requisitos[posicion] = self._requisitos_unicos.setdefault(requisitos, requisitos)
+        self._creditos[posicion] = creditos
+        self._niveles[posicion] = nivel or 0
+        self._carreras[posicion] = self._id_de_carrera(carrera)
+        self._modificado()
+        return nuevo
+
+    def eliminar(self, id_curso: str):
+        posicion = self._posiciones.pop(id_curso, None)
+        if posicion is None:
+            return
+        # las aristas que salían de este curso se descartan al recorrerlas
+        self._ids[posicion] = None
+        self._codigos[posicion] = None
+        self._nombres[posicion] = None
+        self._requisitos[posicion] = SIN_REQUISITOS
+        self._entrantes[posicion] = ()
+        self._modificado()
+
+    def codigo(self, id_curso: str) -> str:
+        return self._codigos[self._posiciones[id_curso]]
+
+    def nombre(self, id_curso: str) -> str:
+        return self._nombres[self._posiciones[id_curso]]
+
+    def creditos(self, id_curso: str) -> float:
+        return float(self._creditos[self._posiciones[id_curso]])
+
+    def nivel(self, id_curso: str) -> int:
+        return int(self._niveles[self._posiciones[id_curso]])
+
+    def carrera(self, id_curso: str) -> str:
+        return self.tabla_carreras[self._carreras[self._posiciones[id_curso]]]
+
+    def expresion_requisitos(self, id_curso: str) -> Expresion:
+        return self._requisitos[self._posiciones[id_curso]]
+
+    def requisitos(self, id_curso: str) -> Tuple[Tuple, ...]:
+        # lista plana de requisitos (cursos y créditos), alternativas incluidas
+        return hojas_requisitos(self.expresion_requisitos(id_curso))
+
+    def creditos_generales_requeridos(self, id_curso: str) -> List:
+        return [r[1] for r in self.requisitos(id_curso) if r[0] == "CRED" and len(r) > 1]
+
+    def datos(self, id_curso: str) -> Dict:
+        # mismos atributos que tenía el nodo en el grafo
+        return {
+            "codigo": self.codigo(id_curso),
+            "creditos": self.creditos(id_curso),
+            "nombre": self.nombre(id_curso),
+            "nivel": self.nivel(id_curso),
+            "carrera": self.carrera(id_curso),
+            "reqs_logicos": list(self.requisitos(id_curso)),
+            "creditos_generales_requeridos": self.creditos_generales_requeridos(id_curso)
+        }
+
+    def fijar_entrantes(self, id_curso: str, aristas: List[Tuple[str, str, Optional[int]]]):
+        # aristas: (id de origen, tipo, créditos requeridos o None). Un mismo origen
+        # repetido se fusiona como en networkx: gana el último tipo y se conservan
+        # los créditos requeridos si alguna lo traía.
+        fusionadas: Dict[int, List[int]] = {}
+        for id_origen, tipo, creditos_requeridos in aristas:
+            atributos = fusionadas.setdefault(self._posiciones[id_origen], [0, SIN_CREDITOS])
+            atributos[0] = TIPOS_ARISTA.index(tipo)
+            if creditos_requeridos is not None:
+                atributos[1] = creditos_requeridos
+        self._entrantes[self._posiciones[id_curso]] = tuple(
+            (origen, tipo, creditos_requeridos) for origen, (tipo, creditos_requeridos) in fusionadas.items()
+        )
+        self._modificado()
+
+    @staticmethod
+    def _atributos_arista(tipo: int, creditos_requeridos: int) -> Dict:
+        atributos = {"tipo": TIPOS_ARISTA[tipo]}
+        if creditos_requeridos != SIN_CREDITOS:
+            atributos["creditos_requeridos"] = creditos_requeridos
+        return atributos
+
+    def _adyacencia_csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # (inicio por origen, destinos, tipos, créditos); destinos en orden de posición
+        if self._adyacencia is None:
+            origenes, destinos, tipos, creditos = [], [], [], []
+            for destino, entrantes in enumerate(self._entrantes):
+                for origen, tipo, creditos_requeridos in entrantes:
+                    if self._ids[origen] is not None:
+                        origenes.append(origen)
+                        destinos.append(destino)
+                        tipos.append(tipo)
+                        creditos.append(creditos_requeridos)
+            origenes = np.array(origenes, dtype=np.int64)
+            orden = np.argsort(origenes, kind="stable")
+            inicios = np.zeros(len(self._ids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(origenes, minlength=len(self._ids)), out=inicios[1:])
+            self._adyacencia = (
+                inicios,
+                np.array(destinos, dtype=np.int32)[orden],
+                np.array(tipos, dtype=np.int8)[orden],
+                np.array(creditos, dtype=np.int32)[orden]
+            )
+        return self._adyacencia
+
+    def total_aristas(self) -> int:
+        return len(self._adyacencia_csr()[1])
+
+    def aristas(self) -> Iterator[Tuple[str, str, Dict]]:
+        # mismo orden que graph.edges: por origen y, dentro de cada uno, por destino
+        inicios, destinos, tipos, creditos = self._adyacencia_csr()
+        inicios, destinos, tipos, creditos = inicios.tolist(), destinos.tolist(), tipos.tolist(), creditos.tolist()
+        for origen, id_origen in enumerate(self._ids):
+            for k in range(inicios[origen], inicios[origen + 1]):
+                yield id_origen, self._ids[destinos[k]], self._atributos_arista(tipos[k], creditos[k])
+
+    def salientes(self, id_curso: str) -> Iterator[Tuple[str, Dict]]:
+        inicios, destinos, tipos, creditos = self._adyacencia_csr()
+        origen = self._posiciones[id_curso]
+        for k in range(inicios[origen], inicios[origen + 1]):
+            yield self._ids[destinos[k]], self._atributos_arista(int(tipos[k]), int(creditos[k]))
+
+    def aristas_entre(self, ids: List[str]) -> List[Tuple[str, str]]:
+        miembros = {self._posiciones[id_curso] for id_curso in ids}
+        return [
+            (self._ids[origen], id_curso)
+            for id_curso in ids
+            for origen, _, _ in self._entrantes[self._posiciones[id_curso]]
+            if origen in miembros
+        ]
+
+    def copiar(self) -> "AlmacenCursos":
+        copia = AlmacenCursos.__new__(AlmacenCursos)
+        copia.__dict__.update(self.__dict__)
+        for nombre in ("_ids", "_codigos", "_nombres", "_requisitos", "_entrantes", "tabla_carreras"):
+            setattr(copia, nombre, list(getattr(self, nombre)))
+        for nombre in ("_posiciones", "_ids_carrera", "_requisitos_unicos"):
+            setattr(copia, nombre, dict(getattr(self, nombre)))
+        for nombre in ("_creditos", "_niveles", "_carreras"):
+            setattr(copia, nombre, getattr(self, nombre).copy())
+        copia._vista = None
+        return copia
+
+    def vista_networkx(self) -> nx.DiGraph:
+        # Grafo networkx armado a pedido (y reutilizado mientras no haya cambios)
+        # para el código que todavía lo necesita; no se debe modificar
+        if self._vista is None:
+            grafo = nx.DiGraph()
+            grafo.add_nodes_from((id_curso, self.datos(id_curso)) for id_curso in self)
+            grafo.add_edges_from(self.aristas())
+            self._vista = nx.freeze(grafo)
+        return self._vista
@@ -0,0 +1,34 @@
+"""Tiempo de armar las aristas de requisitos.
+
+Replica el catálogo del CSV en carreras renombradas y mide _construir_aristas
+sobre todos los nodos.
+
+    python benchmarks/bench_aristas.py [factor ...]     (por defecto 1 10)
+"""
+import sys
+import time
+from comun import silencio
+from motor_academico import MotorAcademico
+from supabase_local import SupabaseLocal, filas_cursos_csv
+
+FACTORES = [int(f) for f in sys.argv[1:]] or [1, 10]
+
+
+def main():
+    for factor in FACTORES:
+        with silencio():
+            filas = filas_cursos_csv(replicas=factor)
+        motor = MotorAcademico(None, supabase=SupabaseLocal(), cargar=False)
+        for fila in filas:
+            motor._agregar_nodo_al_grafo(
+                fila["codigo"], float(fila["creditos"]), fila["nombre"], fila["nivel"],
+                fila["carrera"], fila["requisitos"] or ""
+            )
+        inicio = time.perf_counter()
+        motor._construir_aristas()
+        segundos = time.perf_counter() - inicio
+        print(f"x{factor:<4} {len(motor.cursos):7d} nodos {motor.cursos.total_aristas():7d} aristas {segundos * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
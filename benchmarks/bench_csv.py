@@ -0,0 +1,41 @@
+"""Lectura del CSV del catálogo por bloques.
+
+Escribe un CSV temporal con el catálogo replicado en carreras renombradas y
+mide _leer_cursos_csv completo (parseo y limpieza de columnas).
+
+    python benchmarks/bench_csv.py [replicas]     (por defecto 60, ~198k filas)
+"""
+import os
+import sys
+import tempfile
+import time
+import pandas as pd
+from comun import silencio
+from motor_academico import MotorAcademico
+from supabase_local import SupabaseLocal
+
+REPLICAS = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+
+
+def main():
+    base = pd.read_csv("mallas_consolidadas.csv", dtype=str)
+    grande = pd.concat(
+        [base.assign(Carrera=base["Carrera"] + (f" #{k}" if k else "")) for k in range(REPLICAS)],
+        ignore_index=True
+    )
+    descriptor, ruta = tempfile.mkstemp(suffix=".csv")
+    os.close(descriptor)
+    try:
+        grande.to_csv(ruta, index=False)
+        motor = MotorAcademico(None, supabase=SupabaseLocal(), cargar=False)
+        inicio = time.perf_counter()
+        with silencio():
+            cursos = sum(1 for _ in motor._leer_cursos_csv(ruta))
+        segundos = time.perf_counter() - inicio
+    finally:
+        os.remove(ruta)
+    print(f"{len(grande)} filas, {cursos} cursos leídos en {segundos:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
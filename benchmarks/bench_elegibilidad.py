@@ -0,0 +1,65 @@
+"""Costo de decidir qué cursos cumplen requisitos, antes y ahora.
+
+Con historiales al azar sobre el catálogo del CSV mide, en la misma corrida,
+la elegibilidad de toda una carrera por petición con el recorrido anterior
+(cumple_requisitos curso por curso sobre los atributos del nx.DiGraph, ver
+comun.MotorAnterior) y con el actual (vector de aprobados + evaluación de la
+partición), además de cumple_requisitos por curso en ambos.
+
+    python benchmarks/bench_elegibilidad.py [historiales]
+"""
+import random
+import sys
+import numpy as np
+from comun import MotorAnterior, cronometrar, motor_local, silencio
+from supabase_local import filas_cursos_csv
+
+HISTORIALES = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+
+
+def main():
+    motor, _ = motor_local()
+    with silencio():
+        anterior = MotorAnterior(filas_cursos_csv())
+    random.seed(0)
+    carreras = sorted(motor._nodos_por_carrera)
+    casos = []
+    with silencio():
+        for _ in range(HISTORIALES):
+            carrera_clean = random.choice(carreras)
+            ids = motor._nodos_por_carrera[carrera_clean]
+            carrera = motor.cursos.carrera(ids[0])
+            historial = [motor.cursos.codigo(i) for i in random.sample(ids, random.randint(0, len(ids) // 2))]
+            aprobados_dict, total_creditos = motor._procesar_historial(historial, carrera)
+            casos.append((carrera, motor._obtener_particion(carrera), aprobados_dict, total_creditos))
+
+    llamadas = sum(len(p.nodos) for _, p, _, _ in casos)
+
+    def por_curso(cumple_requisitos):
+        def correr():
+            for _, particion, aprobados_dict, total_creditos in casos:
+                for id_curso in particion.nodos:
+                    cumple_requisitos(id_curso, aprobados_dict, total_creditos)
+        return correr
+
+    def por_carrera_anterior():
+        for carrera, _, aprobados_dict, total_creditos in casos:
+            anterior.elegibles(carrera, aprobados_dict, total_creditos)
+
+    def por_carrera_actual():
+        for _, particion, aprobados_dict, total_creditos in casos:
+            aprobados = motor._vector_aprobados(particion, aprobados_dict)
+            motor._evaluar_elegibles(particion, aprobados[None, :], [aprobados_dict], np.array([total_creditos]))
+
+    print(f"{len(casos)} historiales, {llamadas} evaluaciones de curso")
+    antes = cronometrar(por_curso(anterior.cumple_requisitos)) / llamadas
+    ahora = cronometrar(por_curso(motor.cumple_requisitos)) / llamadas
+    print(f"  cumple_requisitos           antes {antes * 1e6:8.2f} us  ahora {ahora * 1e6:8.2f} us por llamada")
+    antes = cronometrar(por_carrera_anterior) / len(casos)
+    ahora = cronometrar(por_carrera_actual) / len(casos)
+    print(f"  elegibilidad de la carrera  antes {antes * 1e6:8.2f} us  ahora {ahora * 1e6:8.2f} us por petición "
+          f"({antes / ahora:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Codificación JSON de las respuestas grandes.
+
+Codifica el grafo de /api/grafo (completo y de una carrera) y la respuesta
+de /api/planificar con el camino por defecto de FastAPI (jsonable_encoder y
+JSONResponse), con json.dumps y con RespuestaJSON (orjson si está instalado),
+y muestra el tamaño del cuerpo sin comprimir, con gzip y con brotli.
+
+    python benchmarks/bench_json.py
+"""
+import gzip
+import json
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from comun import cronometrar, motor_local, silencio
+from respuestas import RespuestaJSON, brotli, orjson
+from services import PlanificacionService
+
+
+def cargas(motor):
+    carrera = "Ingeniería Civil"
+    ids = motor._nodos_por_carrera[motor._normalizar_carrera(carrera)]
+    historial = [motor.cursos.codigo(i) for i in ids[:len(ids) // 3]]
+    with silencio():
+        creditos_previos = PlanificacionService.calcular_creditos_previos(historial, motor, carrera)
+        todos, sugeridos = motor.generar_planificacion(historial, 22.0, carrera_filtro=carrera)
+    plan = {
+        "resumen_creditos_aprobados": creditos_previos,
+        "carrera_filtro": carrera,
+        "cursos_disponibles": todos,
+        "recomendacion_optima": sugeridos
+    }
+    return [
+        ("grafo completo", motor.exportar_grafo(None)),
+        (f"grafo {carrera}", motor.exportar_grafo(carrera)),
+        ("plan", plan),
+    ]
+
+
+def main():
+    motor, _ = motor_local()
+    codificadores = [
+        ("jsonable_encoder + JSONResponse", lambda datos: JSONResponse(jsonable_encoder(datos)).body),
+        ("json.dumps", lambda datos: json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")),
+        ("RespuestaJSON" + (" (orjson)" if orjson is not None else " (json)"), lambda datos: RespuestaJSON(datos).body),
+    ]
+    for nombre, datos in cargas(motor):
+        cuerpo = RespuestaJSON(datos).body
+        tamanos = f"{len(cuerpo) / 1024:8.1f} KiB, gzip {len(gzip.compress(cuerpo, compresslevel=6)) / 1024:7.1f} KiB"
+        if brotli is not None:
+            tamanos += f", brotli {len(brotli.compress(cuerpo, quality=5)) / 1024:7.1f} KiB"
+        print(f"{nombre}: {tamanos}")
+        base = None
+        for nombre_codificador, codificar in codificadores:
+            segundos = cronometrar(lambda: codificar(datos), 5)
+            base = base or segundos
+            print(f"  {nombre_codificador:32s} {segundos * 1000:8.2f} ms  ({base / segundos:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Planificaciones por segundo del lote.
+
+Arma estudiantes al azar sobre el catálogo del CSV (historiales de hasta la
+mitad de su carrera, voraz por defecto) y mide, en planificaciones por segundo,
+generar_planificacion_lote solo y POST /api/planificar/lote completo con
+TestClient: lectura y validación del cuerpo, motor, JSON y envío del NDJSON.
+La meta es 10k por segundo en un núcleo.
+
+    python benchmarks/bench_lote.py [estudiantes] [voraz|optimo]     (por defecto 10000 voraz)
+"""
+import random
+import sys
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from comun import motor_local, silencio
+import endpoints
+from respuestas import codificar_json
+
+ESTUDIANTES = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+MODO = sys.argv[2] if len(sys.argv) > 2 else "voraz"
+
+
+def por_segundo(funcion) -> float:
+    # mejor de 3 corridas, después de una de calentamiento
+    mejor = float("inf")
+    for _ in range(4):
+        inicio = time.perf_counter()
+        with silencio():
+            funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return ESTUDIANTES / mejor
+
+
+def main():
+    motor, _ = motor_local()
+    random.seed(0)
+    carreras = sorted(motor._nodos_por_carrera)
+    estudiantes = []
+    for _ in range(ESTUDIANTES):
+        ids = motor._nodos_por_carrera[random.choice(carreras)]
+        estudiantes.append({
+            "historial": [motor.cursos.codigo(i) for i in random.sample(ids, random.randint(0, len(ids) // 2))],
+            "max_creditos": 22.0,
+            "carrera": motor.cursos.carrera(ids[0]),
+            "modo_seleccion": MODO
+        })
+    tuplas = [(e["historial"], e["max_creditos"], e["carrera"], e["modo_seleccion"]) for e in estudiantes]
+    cuerpo = codificar_json(estudiantes)
+
+    endpoints.set_motor(motor)
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    cliente = TestClient(app)
+
+    def por_http():
+        respuesta = cliente.post("/api/planificar/lote", content=cuerpo, headers={"Content-Type": "application/json"})
+        assert respuesta.status_code == 200 and respuesta.content.count(b"\n") == ESTUDIANTES
+
+    print(f"{ESTUDIANTES} estudiantes ({MODO}) de {len(carreras)} carreras, cuerpo de {len(cuerpo) / 1e6:.1f} MB")
+    print(f"  generar_planificacion_lote   {por_segundo(lambda: list(motor.generar_planificacion_lote(tuplas))):8.0f} /s")
+    print(f"  POST /api/planificar/lote    {por_segundo(por_http):8.0f} /s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Memoria del catálogo en el motor, antes y ahora.
+
+Carga el mismo catálogo (replicado) en la representación anterior, un
+nx.DiGraph con un dict de atributos por curso y por arista (ver
+comun.MotorAnterior), y en un motor vacío actual, y mide con tracemalloc lo
+que ocupan los nodos y las aristas, en bytes por curso.
+
+    python benchmarks/bench_memoria.py [replicas ...]     (por defecto 1 20)
+"""
+import gc
+import sys
+import tracemalloc
+from comun import MotorAnterior, silencio
+from motor_academico import MotorAcademico
+from supabase_local import SupabaseLocal, filas_cursos_csv
+
+REPLICAS = [int(r) for r in sys.argv[1:]] or [1, 20]
+
+
+def medir(construir):
+    # bytes que quedan vivos (y el pico) mientras se arma la representación
+    gc.collect()
+    tracemalloc.start()
+    representacion = construir()
+    gc.collect()
+    actual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del representacion
+    return actual, pico
+
+
+def main():
+    for replicas in REPLICAS:
+        with silencio():
+            filas = filas_cursos_csv(replicas=replicas)
+
+        motor = MotorAcademico(None, supabase=SupabaseLocal(), cargar=False)
+
+        def actual():
+            motor.reiniciar_grafo()
+            for fila in filas:
+                motor._agregar_nodo_al_grafo(
+                    fila["codigo"], float(fila["creditos"]), fila["nombre"], fila["nivel"],
+                    fila["carrera"], fila["requisitos"] or ""
+                )
+            motor._construir_aristas()
+            return motor
+
+        print(f"{len(filas):7d} cursos:")
+        for nombre, construir in (("nx.DiGraph con atributos", lambda: MotorAnterior(filas)), ("motor actual", actual)):
+            bytes_vivos, pico = medir(construir)
+            print(f"  {nombre:26s} {bytes_vivos / len(filas):6.0f} B/curso (pico {pico / len(filas):.0f})")
+
+
+if __name__ == "__main__":
+    main()
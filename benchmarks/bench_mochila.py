@@ -0,0 +1,47 @@
+"""Selección voraz contra mochila exacta.
+
+Arma listas reales de candidatos (historiales al azar, 20 por carrera) y
+compara, para topes de 12, 18 y 22 créditos, el impacto total elegido, el
+uso de créditos y el tiempo de cada modo.
+
+    python benchmarks/bench_mochila.py [historiales_por_carrera]
+"""
+import random
+import sys
+from comun import cronometrar, motor_local, silencio
+
+POR_CARRERA = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+TOPES = (12, 18, 22)
+
+
+def main():
+    motor, _ = motor_local()
+    random.seed(0)
+    listas = []
+    with silencio():
+        for carrera_clean in sorted(motor._nodos_por_carrera):
+            ids = motor._nodos_por_carrera[carrera_clean]
+            carrera = motor.cursos.carrera(ids[0])
+            for _ in range(POR_CARRERA):
+                historial = [motor.cursos.codigo(i) for i in random.sample(ids, random.randint(0, len(ids) // 2))]
+                aprobados_dict, total_creditos = motor._procesar_historial(historial, carrera)
+                candidatos = motor._obtener_candidatos(aprobados_dict, total_creditos, carrera)
+                if candidatos:
+                    listas.append(candidatos)
+
+    print(f"{len(listas)} listas de candidatos, topes {TOPES}")
+    for modo in ("voraz", "optimo"):
+        impacto = usados = 0.0
+        for candidatos in listas:
+            for tope in TOPES:
+                elegidos = motor._seleccionar_optimos(candidatos, tope, modo)
+                impacto += sum(c["impacto"] for c in elegidos)
+                usados += sum(c["creditos"] for c in elegidos) / tope
+        casos = len(listas) * len(TOPES)
+        segundos = cronometrar(lambda: [motor._seleccionar_optimos(c, t, modo) for c in listas for t in TOPES])
+        print(f"  {modo:7s} impacto {impacto / casos:6.2f}, créditos usados {usados / casos:6.1%}, "
+              f"{segundos / casos * 1e6:7.1f} us por selección")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Parseo de los textos de requisitos: parser original contra el actual.
+
+Toma la columna Requisitos del CSV (una entrada por curso, con repeticiones
+entre carreras, como la ve la carga) y mide el parser original, que partía
+con re.split y compilaba las expresiones en cada token, contra
+parse_expresion_requisitos en frío (caché vacía) y con la caché llena.
+
+    python benchmarks/bench_parser.py
+"""
+import pandas as pd
+from comun import cronometrar, parse_requisitos_original
+from parser import _parse_expresion, hojas_requisitos, parse_expresion_requisitos
+
+
+def main():
+    textos = pd.read_csv("mallas_consolidadas.csv", dtype=str)["Requisitos"].fillna("").tolist()
+
+    def original():
+        for texto in textos:
+            parse_requisitos_original(texto)
+
+    def actual_en_frio():
+        _parse_expresion.cache_clear()
+        for texto in textos:
+            parse_expresion_requisitos(texto)
+
+    def actual_con_cache():
+        for texto in textos:
+            parse_expresion_requisitos(texto)
+
+    # mismos cursos requeridos en ambos (el actual además agrupa alternativas)
+    distintas = sum(
+        1 for texto in set(textos)
+        if sorted(parse_requisitos_original(texto)) != sorted(hojas_requisitos(parse_expresion_requisitos(texto)))
+    )
+
+    print(f"{len(textos)} textos de requisitos ({len(set(textos))} distintos), {distintas} con hojas distintas")
+    base = cronometrar(original, 5)
+    for nombre, funcion in (("original (re.split)", original), ("actual en frío", actual_en_frio),
+                            ("actual con caché", actual_con_cache)):
+        segundos = cronometrar(funcion, 5)
+        print(f"  {nombre:22s} {segundos * 1000:7.2f} ms  ({base / segundos:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Rendimiento del upsert del catálogo por lotes.
+
+Sube el catálogo (replicado) a un cliente local con latencia por llamada y
+compara tamaños de lote y concurrencia; las cifras salen de metricas_carga.
+
+    python benchmarks/bench_upsert.py [replicas] [latencia_ms]     (por defecto 3 y 50)
+"""
+import os
+import sys
+from comun import silencio
+from motor_academico import MotorAcademico
+from supabase_local import SupabaseLocal, filas_cursos_csv
+
+REPLICAS = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+LATENCIA = (float(sys.argv[2]) if len(sys.argv) > 2 else 50.0) / 1000
+CONFIGURACIONES = [(100, 1), (500, 1), (500, 4), (500, 8)]
+
+
+def main():
+    with silencio():
+        filas = filas_cursos_csv(replicas=REPLICAS)
+    print(f"{len(filas)} cursos, {LATENCIA * 1000:.0f} ms por llamada")
+    for tamano_lote, concurrencia in CONFIGURACIONES:
+        os.environ["CURSOS_LOTE_UPSERT"] = str(tamano_lote)
+        os.environ["CURSOS_CONCURRENCIA_UPSERT"] = str(concurrencia)
+        cliente = SupabaseLocal(latencia=LATENCIA)
+        motor = MotorAcademico(None, supabase=cliente, cargar=False)
+        with silencio():
+            motor._insertar_cursos_en_lotes(filas)
+        m = motor.metricas_carga
+        assert len(cliente.tablas["cursos"]) == m["cursos_guardados"]
+        print(f"  lote {tamano_lote:4d} x {concurrencia} en paralelo: {m['lotes']:3d} lotes, "
+              f"{m['segundos']:6.2f}s, {m['cursos_por_segundo']:9.1f} cursos/s")
+
+
+if __name__ == "__main__":
+    main()
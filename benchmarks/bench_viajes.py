@@ -0,0 +1,53 @@
+"""Viajes a Supabase por operación de UsuarioService.
+
+Corre cada operación contra el cliente en memoria con una latencia fija por
+llamada y cuenta las llamadas que hizo y el tiempo que tomó.
+
+    python benchmarks/bench_viajes.py [latencia_ms]
+"""
+import sys
+import time
+from comun import cliente_local, silencio
+from models import HistorialUpdate, UsuarioUpdate
+from services import UsuarioService
+
+LATENCIA = (float(sys.argv[1]) if len(sys.argv) > 1 else 20.0) / 1000
+USUARIO = "bench-usuario"
+
+
+def main():
+    cliente = cliente_local(latencia=LATENCIA)
+    cursos = cliente.tablas["cursos"]
+    carrera = cursos[0]["carrera"]
+    de_la_carrera = [c for c in cursos if c["carrera"] == carrera]
+
+    cliente.tablas["usuarios"] = [{"id": USUARIO, "carrera": carrera, "codigo_alumno": "20200001", "creditos_totales": 0.0}]
+    cliente.tablas["historial_aprobados"] = []
+    with silencio():
+        for curso in de_la_carrera[:10]:
+            UsuarioService.agregar_curso_aprobado(USUARIO, curso["codigo"], carrera)
+
+    aprobado, nuevo, otro = (c["codigo"] for c in de_la_carrera[9:12])
+    operaciones = [
+        ("obtener_usuario", lambda: UsuarioService.obtener_usuario(USUARIO)),
+        ("agregar_curso_aprobado (sin carrera)", lambda: UsuarioService.agregar_curso_aprobado(USUARIO, nuevo)),
+        ("agregar_curso_aprobado (con carrera)", lambda: UsuarioService.agregar_curso_aprobado(USUARIO, otro, carrera)),
+        ("eliminar_curso_aprobado", lambda: UsuarioService.eliminar_curso_aprobado(USUARIO, otro)),
+        ("actualizar_usuario", lambda: UsuarioService.actualizar_usuario(USUARIO, UsuarioUpdate(codigo_alumno="20200002"))),
+        ("actualizar_curso_aprobado", lambda: UsuarioService.actualizar_curso_aprobado(
+            USUARIO, aprobado, HistorialUpdate(curso_codigo=aprobado, aprobado_en="2026-07-15"))),
+        ("obtener_historial_completo", lambda: UsuarioService.obtener_historial_completo(USUARIO)),
+    ]
+
+    print(f"latencia simulada: {LATENCIA * 1000:.0f} ms por llamada")
+    for nombre, operacion in operaciones:
+        antes = len(cliente.llamadas)
+        inicio = time.perf_counter()
+        with silencio():
+            operacion()
+        ms = (time.perf_counter() - inicio) * 1000
+        print(f"  {nombre:38s} {len(cliente.llamadas) - antes:2d} viajes {ms:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
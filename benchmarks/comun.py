@@ -0,0 +1,184 @@
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Iterator, List, Tuple
+import networkx as nx
+
+# Los benchmarks se corren desde cualquier carpeta: python benchmarks/bench_*.py
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.chdir(RAIZ)
+# nunca leer ni pisar el snapshot del entorno de desarrollo
+os.environ["MOTOR_SNAPSHOT_PATH"] = os.path.join(tempfile.gettempdir(), f"bench_snapshot_{os.getpid()}.bin")
+
+import database  # noqa: E402
+from motor_academico import MotorAcademico  # noqa: E402
+from supabase_local import SupabaseLocal, filas_cursos_csv  # noqa: E402
+
+
+@contextlib.contextmanager
+def silencio() -> Iterator[None]:
+    # el motor y los servicios imprimen su progreso; aquí solo interesan las cifras
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def cliente_local(replicas: int = 1, latencia: float = 0.0) -> SupabaseLocal:
+    """Cliente en memoria con la tabla cursos cargada desde el CSV, instalado
+    como cliente global (lo usan los servicios y la unidad de trabajo)"""
+    with silencio():
+        cliente = SupabaseLocal({
+            "cursos": filas_cursos_csv(replicas=replicas),
+            "catalogo_version": [{"id": 1, "version": 1}]
+        }, latencia=latencia)
+    database.set_supabase(cliente)
+    return cliente
+
+
+def motor_local(replicas: int = 1) -> Tuple[MotorAcademico, SupabaseLocal]:
+    cliente = cliente_local(replicas)
+    with silencio():
+        motor = MotorAcademico(None, supabase=cliente)
+    return motor, cliente
+
+
+def cronometrar(funcion: Callable[[], object], repeticiones: int = 1) -> float:
+    """Segundos por llamada: el mejor de 3 lotes de `repeticiones` llamadas"""
+    mejor = float("inf")
+    for _ in range(3):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        mejor = min(mejor, (time.perf_counter() - inicio) / repeticiones)
+    return mejor
+
+
+# Copias de la implementación anterior, para medirla junto a la actual en la misma corrida
+
+def parse_requisitos_original(req_str) -> List[Tuple]:
+    # lista plana de requisitos, partida con re.split y sin distinguir alternativas
+    s = str(req_str).strip()
+    if not s or s == "nan":
+        return []
+
+    parts = re.split(r'(?:,|;|/|\s+y\s+|\s+o\s+)', s, flags=re.IGNORECASE)
+    parsed = []
+
+    for t in parts:
+        t = t.strip()
+        if not t:
+            continue
+
+        U = t.upper()
+
+        m_cc = re.fullmatch(r'([A-Z]{2,}\d{2,})\s*:\s*(\d+)', U)
+        if m_cc:
+            parsed.append(("COURSE_CRED", m_cc.group(1), int(m_cc.group(2))))
+            continue
+
+        m_cr = re.search(r'(\d+)\s*(CRED|CREDITOS?)', U)
+        if m_cr:
+            parsed.append(("CRED", int(m_cr.group(1))))
+            continue
+
+        if re.fullmatch(r'[A-Z]{2,}\d{2,}', U):
+            parsed.append(("COURSE", U))
+
+    return parsed
+
+
+class MotorAnterior:
+    """Catálogo como lo guardaba el motor antes: un nx.DiGraph con un dict de
+    atributos por curso, aristas con atributos y la elegibilidad evaluada
+    curso por curso con cumple_requisitos"""
+
+    def __init__(self, filas: List[Dict]):
+        self.graph = nx.DiGraph()
+        self._indice_nodos: Dict[Tuple[str, str], str] = {}
+        self._nodos_por_carrera: Dict[str, List[str]] = {}
+        for fila in filas:
+            self._agregar_nodo(fila["codigo"], float(fila["creditos"]), fila["nombre"], fila["nivel"],
+                               fila["carrera"], fila["requisitos"] or "")
+        self._construir_aristas()
+
+    def _agregar_nodo(self, codigo, creditos, nombre, nivel, carrera, requisitos_str):
+        parsed = parse_requisitos_original(requisitos_str)
+        creditos_generales_requeridos = [r[1] for r in parsed if r[0] == "CRED" and len(r) > 1]
+
+        id_curso = MotorAcademico._crear_id_curso(codigo, carrera)
+        if id_curso not in self.graph:
+            carrera_clean = MotorAcademico._normalizar_carrera(carrera)
+            self._indice_nodos.setdefault((codigo, carrera_clean), id_curso)
+            self._nodos_por_carrera.setdefault(carrera_clean, []).append(id_curso)
+
+        self.graph.add_node(
+            id_curso,
+            codigo=codigo,
+            creditos=creditos,
+            nombre=nombre,
+            nivel=nivel,
+            carrera=carrera,
+            reqs_logicos=parsed,
+            creditos_generales_requeridos=creditos_generales_requeridos
+        )
+
+    def _construir_aristas(self):
+        for id_curso, nodo_data in self.graph.nodes(data=True):
+            carrera_curso = MotorAcademico._normalizar_carrera(nodo_data.get("carrera", ""))
+            for r in nodo_data.get("reqs_logicos", []):
+                if r[0] not in ("COURSE", "COURSE_CRED"):
+                    continue
+                otro_id = self._indice_nodos.get((r[1], carrera_curso))
+                if otro_id is None:
+                    continue
+                if r[0] == "COURSE":
+                    self.graph.add_edge(otro_id, id_curso, tipo="COURSE")
+                else:
+                    self.graph.add_edge(otro_id, id_curso, tipo="COURSE_CRED",
+                                        creditos_requeridos=r[2] if len(r) > 2 else 0)
+
+    def get_info_curso(self, id_curso: str):
+        if id_curso not in self.graph.nodes:
+            return None
+        data = self.graph.nodes[id_curso]
+        return {
+            "nombre": data.get("nombre", ""),
+            "creditos": data.get("creditos", 0),
+            "nivel": data.get("nivel", 0),
+            "carrera": data.get("carrera", ""),
+            "reqs": data.get("reqs_logicos", [])
+        }
+
+    def cumple_requisitos(self, id_curso_objetivo: str, aprobados_dict: Dict, total_creditos: float) -> bool:
+        info = self.get_info_curso(id_curso_objetivo)
+        if not info:
+            return False
+
+        carrera_objetivo = info.get("carrera", "")
+        reqs = info["reqs"]
+        if not reqs:
+            return True
+
+        for r in reqs:
+            tipo = r[0]
+            if tipo in ("COURSE", "COURSE_CRED"):
+                curso_req_codigo = r[1] if len(r) > 1 else None
+                if curso_req_codigo:
+                    id_prereq = MotorAcademico._crear_id_curso(curso_req_codigo, carrera_objetivo)
+                    if id_prereq not in aprobados_dict:
+                        return False
+            elif tipo == "CRED":
+                if total_creditos < (r[1] if len(r) > 1 else 0):
+                    return False
+        return True
+
+    def elegibles(self, carrera: str, aprobados_dict: Dict, total_creditos: float) -> List[str]:
+        # el recorrido de _obtener_candidatos, sin armar los dicts de salida
+        return [
+            id_curso for id_curso in self._nodos_por_carrera.get(MotorAcademico._normalizar_carrera(carrera), ())
+            if id_curso not in aprobados_dict and self.cumple_requisitos(id_curso, aprobados_dict, total_creditos)
+        ]
@@ -0,0 +1,215 @@
+import copy
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class _Respuesta:
+    def __init__(self, data: List[Dict], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _patron_like(patron: str) -> "re.Pattern":
+    partes = (".*" if c == "%" else "." if c == "_" else re.escape(c) for c in patron)
+    return re.compile("".join(partes), re.IGNORECASE | re.DOTALL)
+
+
+class _Consulta:
+    """Subconjunto del query builder de supabase-py que usa el proyecto"""
+
+    def __init__(self, cliente: "SupabaseLocal", tabla: str):
+        self.cliente = cliente
+        self.tabla = tabla
+        self.operacion = "select"
+        self.columnas = "*"
+        self.contar = False
+        self.solo_conteo = False
+        self.filtros: List[Callable[[Dict], bool]] = []
+        self.ordenes: List[Tuple[str, bool]] = []
+        self.rango: Optional[Tuple[int, int]] = None
+        self.limite: Optional[int] = None
+        self.datos: Any = None
+        self.conflicto: List[str] = ["id"]
+
+    def select(self, columnas: str = "*", count: Optional[str] = None, head: bool = False):
+        self.columnas, self.contar, self.solo_conteo = columnas, count is not None, head
+        return self
+
+    def eq(self, columna: str, valor):
+        self.filtros.append(lambda fila: fila.get(columna) == valor)
+        return self
+
+    def is_(self, columna: str, valor):
+        # solo "null", que es lo que usa el proyecto
+        self.filtros.append(lambda fila: fila.get(columna) is None)
+        return self
+
+    def neq(self, columna: str, valor):
+        self.filtros.append(lambda fila: fila.get(columna) != valor)
+        return self
+
+    def in_(self, columna: str, valores):
+        valores = set(valores)
+        self.filtros.append(lambda fila: fila.get(columna) in valores)
+        return self
+
+    def ilike(self, columna: str, patron: str):
+        regex = _patron_like(patron)
+        self.filtros.append(lambda fila: regex.fullmatch(str(fila.get(columna) or "")) is not None)
+        return self
+
+    def order(self, columna: str, desc: bool = False):
+        self.ordenes.append((columna, desc))
+        return self
+
+    def range(self, inicio: int, fin: int):
+        self.rango = (inicio, fin)
+        return self
+
+    def limit(self, n: int):
+        self.limite = n
+        return self
+
+    def insert(self, filas):
+        self.operacion, self.datos = "insert", filas if isinstance(filas, list) else [filas]
+        return self
+
+    def upsert(self, filas, on_conflict: Optional[str] = None, ignore_duplicates: bool = False):
+        self.operacion, self.datos = "upsert", filas if isinstance(filas, list) else [filas]
+        self.conflicto = on_conflict.split(",") if on_conflict else ["id"]
+        self.ignorar_duplicados = ignore_duplicates
+        return self
+
+    def update(self, datos: Dict):
+        self.operacion, self.datos = "update", datos
+        return self
+
+    def delete(self):
+        self.operacion = "delete"
+        return self
+
+    def execute(self) -> _Respuesta:
+        return self.cliente._ejecutar(self)
+
+
+class _Rpc:
+    def __init__(self, cliente: "SupabaseLocal", nombre: str, parametros: Dict):
+        self.cliente, self.nombre, self.parametros = cliente, nombre, parametros
+
+    def execute(self) -> _Respuesta:
+        return self.cliente._ejecutar_rpc(self)
+
+
+class SupabaseLocal:
+    """Cliente de Supabase en memoria para benchmarks y pruebas.
+
+    Las tablas son listas de dicts en `tablas`; cada llamada se anota en
+    `llamadas` como (tabla, operación) y espera `latencia` segundos, para
+    contar viajes y simular la red. `fallar` permite inyectar errores: recibe
+    (tabla, operación) y devuelve True si esa llamada debe fallar. Si existe la
+    tabla catalogo_version, cada escritura en cursos sube su versión.
+    """
+
+    def __init__(self, tablas: Optional[Dict[str, List[Dict]]] = None, latencia: float = 0.0):
+        self.tablas: Dict[str, List[Dict]] = copy.deepcopy(tablas) if tablas else {}
+        self.latencia = latencia
+        self.llamadas: List[Tuple[str, str]] = []
+        self.fallar: Optional[Callable[[str, str], bool]] = None
+        self._lock = threading.RLock()
+
+    def table(self, tabla: str) -> _Consulta:
+        return _Consulta(self, tabla)
+
+    def rpc(self, nombre: str, parametros: Optional[Dict] = None) -> _Rpc:
+        return _Rpc(self, nombre, parametros or {})
+
+    def _registrar(self, tabla: str, operacion: str):
+        with self._lock:
+            self.llamadas.append((tabla, operacion))
+        if self.fallar is not None and self.fallar(tabla, operacion):
+            raise Exception(f"fallo simulado en {operacion} de {tabla}")
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    def _ejecutar(self, consulta: _Consulta) -> _Respuesta:
+        self._registrar(consulta.tabla, consulta.operacion)
+        with self._lock:
+            if consulta.operacion != "select" and consulta.tabla == "cursos":
+                self._subir_version_catalogo()
+            filas = self.tablas.setdefault(consulta.tabla, [])
+            coincidentes = [f for f in filas if all(filtro(f) for filtro in consulta.filtros)]
+
+            if consulta.operacion == "select":
+                for columna, desc in reversed(consulta.ordenes):
+                    coincidentes.sort(key=lambda f: (f.get(columna) is None, f.get(columna)), reverse=desc)
+                total = len(coincidentes)
+                if consulta.rango:
+                    coincidentes = coincidentes[consulta.rango[0]:consulta.rango[1] + 1]
+                if consulta.limite is not None:
+                    coincidentes = coincidentes[:consulta.limite]
+                if consulta.columnas != "*":
+                    columnas = [c.strip() for c in consulta.columnas.split(",")]
+                    coincidentes = [{c: f.get(c) for c in columnas} for f in coincidentes]
+                datos = [] if consulta.solo_conteo else [dict(f) for f in coincidentes]
+                return _Respuesta(datos, total if consulta.contar else None)
+
+            if consulta.operacion == "insert":
+                filas.extend(dict(f) for f in consulta.datos)
+                return _Respuesta([dict(f) for f in consulta.datos])
+
+            if consulta.operacion == "upsert":
+                indice = {tuple(f.get(c) for c in consulta.conflicto): f for f in filas}
+                resultado = []
+                for fila in consulta.datos:
+                    existente = indice.get(tuple(fila.get(c) for c in consulta.conflicto))
+                    if existente is None:
+                        existente = dict(fila)
+                        filas.append(existente)
+                        indice[tuple(fila.get(c) for c in consulta.conflicto)] = existente
+                    elif consulta.ignorar_duplicados:
+                        continue
+                    else:
+                        existente.update(fila)
+                    resultado.append(dict(existente))
+                return _Respuesta(resultado)
+
+            if consulta.operacion == "update":
+                for fila in coincidentes:
+                    fila.update(consulta.datos)
+                return _Respuesta([dict(f) for f in coincidentes])
+
+            borrados = {id(f) for f in coincidentes}
+            self.tablas[consulta.tabla] = [f for f in filas if id(f) not in borrados]
+            return _Respuesta([dict(f) for f in coincidentes])
+
+    def _subir_version_catalogo(self):
+        # lo que hace el trigger de supabase/migrations/*_catalogo_version.sql
+        for fila in self.tablas.get("catalogo_version", []):
+            fila["version"] += 1
+
+    def _ejecutar_rpc(self, rpc: _Rpc) -> _Respuesta:
+        self._registrar("rpc", rpc.nombre)
+        with self._lock:
+            if rpc.nombre == "get_unique_carreras":
+                carreras = sorted({f.get("carrera") for f in self.tablas.get("cursos", []) if f.get("carrera")})
+                return _Respuesta([{"carrera": c} for c in carreras])
+            if rpc.nombre == "get_user_profile":
+                usuarios = self.tablas.get("usuarios", [])
+                return _Respuesta([dict(u) for u in usuarios if u.get("id") == rpc.parametros.get("p_user_id")])
+        raise Exception(f"rpc desconocida: {rpc.nombre}")
+
+
+def filas_cursos_csv(ruta: str = "mallas_consolidadas.csv", replicas: int = 1) -> List[Dict]:
+    """Filas que deja en la tabla cursos la carga del CSV; con replicas > 1 cada
+    copia va en carreras renombradas ("<carrera> #k") para agrandar el catálogo"""
+    from motor_academico import MotorAcademico
+    from utils import eliminar_duplicados_lote, limpiar_curso_data
+    lector = MotorAcademico(None, supabase=SupabaseLocal(), cargar=False)
+    base = [limpiar_curso_data(c) for c in eliminar_duplicados_lote(list(lector._leer_cursos_csv(ruta)))]
+    filas = []
+    for k in range(replicas):
+        sufijo = f" #{k}" if k else ""
+        filas.extend({**f, "carrera": f["carrera"] + sufijo} for f in base)
+    return filas
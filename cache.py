@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class CacheLRU:
+    """Cache acotada con expulsión LRU y expiración por TTL, segura entre hilos"""
+    
+    def __init__(self, max_entradas: int = 4096, ttl_segundos: Optional[float] = 600):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.expiradas = 0
+    
+    def obtener(self, clave: Hashable) -> Optional[Any]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            
+            valor, guardado_en = entrada
+            if self.ttl_segundos is not None and time.monotonic() - guardado_en > self.ttl_segundos:
+                del self._entradas[clave]
+                self.expiradas += 1
+                self.fallos += 1
+                return None
+            
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+    
+    def guardar(self, clave: Hashable, valor: Any):
+        if self.max_entradas <= 0:
+            return
+        with self._lock:
+            self._entradas[clave] = (valor, time.monotonic())
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.expulsiones += 1
+    
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+    
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl_segundos,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "expulsiones": self.expulsiones,
+                "expiradas": self.expiradas,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0
+            }
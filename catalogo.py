@@ -0,0 +1,50 @@
+import re
+from typing import Dict, List, Optional
+from almacen_cursos import AlmacenCursos
+
+
+def _patron_ilike(patron: str) -> "re.Pattern":
+    # Mismo criterio que ILIKE de Postgres: % = cualquier texto, _ = un carácter
+    partes = (".*" if c == "%" else "." if c == "_" else re.escape(c) for c in patron)
+    return re.compile("".join(partes), re.IGNORECASE | re.DOTALL)
+
+
+class VistaCatalogo:
+    """Catálogo de cursos tal como lo devuelven /api/cursos y /api/carreras,
+    armado una vez por versión del catálogo a partir del motor.
+
+    Las listas son compartidas entre peticiones: no se deben modificar.
+    """
+
+    def __init__(self, cursos: AlmacenCursos, version: int):
+        self.version = version
+        self.version_almacen = cursos.version
+        filas = sorted(
+            (cursos.codigo(id_curso), cursos.carrera(id_curso), id_curso) for id_curso in cursos
+        )
+
+        self.cursos: List[Dict] = []
+        self.cursos_por_carrera: Dict[str, List[Dict]] = {}
+        for codigo, carrera, id_curso in filas:
+            opcion = {
+                "value": codigo,
+                "label": f"{codigo} - {cursos.nombre(id_curso)}",
+                "carrera": carrera,
+                "creditos": cursos.creditos(id_curso),
+                "nivel": cursos.nivel(id_curso)
+            }
+            self.cursos.append(opcion)
+            self.cursos_por_carrera.setdefault(carrera, []).append(opcion)
+
+        self.carreras: List[str] = sorted({c.strip() for c in self.cursos_por_carrera if c and c.strip()})
+
+    def filtrar_cursos(self, carrera: Optional[str] = None) -> List[Dict]:
+        # carrera filtra como ilike("carrera", "%carrera%"); el orden es por código
+        if not carrera:
+            return self.cursos
+        patron = _patron_ilike(f"%{carrera}%")
+        coincidentes = [c for c in self.cursos_por_carrera if patron.fullmatch(c)]
+        if len(coincidentes) == 1:
+            return self.cursos_por_carrera[coincidentes[0]]
+        coincidentes = set(coincidentes)
+        return [opcion for opcion in self.cursos if opcion["carrera"] in coincidentes]
@@ -22,3 +22,9 @@ def get_supabase() -> Client:
         _supabase = create_client(supabase_url, supabase_key)
     return _supabase
 
+
+
+def set_supabase(cliente: Client):
+    # Permite usar otro cliente (p. ej. uno local que cuente los viajes)
+    global _supabase
+    _supabase = cliente
@@ -1,19 +1,62 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Literal
+import itertools
 import os
-import networkx as nx
-from models import UsuarioCreate, UsuarioUpdate, StudentInput, HistorialCreate, HistorialUpdate
+import threading
+from models import UsuarioCreate, UsuarioUpdate, StudentInput, HistorialCreate, HistorialUpdate, RoadmapInput
 from services import UsuarioService, CursoService, PlanificacionService
 from motor_academico import MotorAcademico
+from cache import CacheLRU
+from respuestas import CargaCodificada, RespuestaJSON, codificar_json, responder_carga
 from database import get_supabase
+from unidad_trabajo import estadisticas_viajes
 
 router = APIRouter()
 motor: Optional[MotorAcademico] = None
+error_motor: Optional[str] = None
+
+ROADMAP_PRESUPUESTO_MAX_MS = int(os.getenv("ROADMAP_PRESUPUESTO_MAX_MS", "2000"))
+MOTOR_REINTENTO_SEGUNDOS = int(os.getenv("MOTOR_REINTENTO_SEGUNDOS", "5"))
+# Starlette pasa cada trozo de una respuesta síncrona a un hilo: se envían las
+# líneas del lote de a varias para no pagar ese salto por estudiante
+LOTE_LINEAS_POR_ENVIO = int(os.getenv("LOTE_LINEAS_POR_ENVIO", "100"))
+
+
+# Las recargas arman un motor nuevo aparte y lo publican reasignando `motor`;
+# cada petición toma una sola referencia con obtener_motor() y la usa hasta
+# terminar, así nunca ve un grafo a medio construir. El motor anterior se libera
+# cuando la última petición que lo usa termina.
+_lock_recarga = threading.Lock()
+# grafo ya codificado por (versión del catálogo, carrera tal como llega)
+_cache_grafo = CacheLRU(max_entradas=int(os.getenv("GRAFO_CACHE_MAX_ENTRADAS", "256")), ttl_segundos=None)
+# /api/cursos y /api/carreras ya codificados por (ruta, versión del catálogo, carrera)
+_cache_catalogo = CacheLRU(max_entradas=int(os.getenv("CATALOGO_CACHE_MAX_ENTRADAS", "256")), ttl_segundos=None)
 
 
 def set_motor(m: MotorAcademico):
-    global motor
+    global motor, error_motor
     motor = m
+    error_motor = None
+
+
+def set_error_motor(error: str):
+    global error_motor
+    error_motor = error
+
+
+def obtener_motor() -> MotorAcademico:
+    # Mientras el motor se construye en segundo plano se responde de inmediato
+    # en vez de dejar la petición colgada
+    motor_actual = motor
+    if not motor_actual:
+        detalle = f"El motor no pudo inicializarse: {error_motor}" if error_motor else "El motor se está inicializando"
+        raise HTTPException(status_code=503, detail=detalle, headers={"Retry-After": str(MOTOR_REINTENTO_SEGUNDOS)})
+    return motor_actual
+
+
+def _cabeceras_version(motor_actual: MotorAcademico) -> dict:
+    return {"X-Version-Catalogo": str(motor_actual.version_catalogo)}
 
 
 @router.get("/")
@@ -21,6 +64,16 @@ def home():
     return {"status": "ok", "message": "API del Motor Académico funcionando"}
 
 
+@router.get("/health/ready")
+def health_ready():
+    motor_actual = obtener_motor()
+    return {
+        "status": "ready",
+        "total_cursos": len(motor_actual.cursos),
+        "version_catalogo": motor_actual.version_catalogo
+    }
+
+
 @router.get("/api/usuario/{user_id}")
 def get_usuario(user_id: str):
     return UsuarioService.obtener_usuario(user_id)
@@ -51,7 +104,7 @@ def actualizar_usuario(user_id: str, usuario: UsuarioUpdate):
 @router.get("/api/usuario/{user_id}/historial")
 def obtener_historial_completo(user_id: str, carrera: Optional[str] = None):
     """Obtener el historial académico completo del usuario con detalles de cursos"""
-    return UsuarioService.obtener_historial_completo(user_id, carrera)
+    return UsuarioService.obtener_historial_completo(user_id, carrera, motor=motor)
 
 
 @router.post("/api/usuario/{user_id}/historial")
@@ -61,7 +114,8 @@ def agregar_curso_aprobado(user_id: str, historial_data: HistorialCreate):
         return UsuarioService.agregar_curso_aprobado(
             user_id, 
             historial_data.curso_codigo, 
-            historial_data.carrera
+            historial_data.carrera,
+            motor=motor
         )
     except HTTPException as e:
         print(f"[ENDPOINT] HTTPException capturada: {e.status_code} - {e.detail}")
@@ -80,187 +134,206 @@ def agregar_curso_aprobado(user_id: str, historial_data: HistorialCreate):
 @router.put("/api/usuario/{user_id}/historial/{curso_codigo}")
 def actualizar_curso_aprobado(user_id: str, curso_codigo: str, historial_update: HistorialUpdate):
     """Actualizar un curso aprobado en el historial académico"""
-    return UsuarioService.actualizar_curso_aprobado(user_id, curso_codigo, historial_update)
+    return UsuarioService.actualizar_curso_aprobado(user_id, curso_codigo, historial_update, motor=motor)
 
 
 @router.delete("/api/usuario/{user_id}/historial/{curso_codigo}")
 def eliminar_curso_aprobado(user_id: str, curso_codigo: str, carrera: Optional[str] = None):
     """Eliminar un curso aprobado del historial académico"""
-    return UsuarioService.eliminar_curso_aprobado(user_id, curso_codigo, carrera)
+    return UsuarioService.eliminar_curso_aprobado(user_id, curso_codigo, carrera, motor=motor)
+
+
+@router.post("/api/creditos/reconciliar")
+def reconciliar_creditos(user_id: Optional[str] = None):
+    """Recalcular creditos_totales desde el historial (de un usuario o de todos) y corregir desviaciones"""
+    return UsuarioService.reconciliar_creditos(user_id, motor=motor)
 
 
 @router.get("/api/grafo")
-def get_grafo_completo(carrera: Optional[str] = None):
-    if not motor:
-        raise HTTPException(status_code=500, detail="El motor no está inicializado")
-    
-    if carrera and carrera.strip():
-        carrera_filtro_clean = carrera.strip().lower()
-        nodos = []
-        nodos_ids_compuestos = set()
-        
-        for n, data in motor.graph.nodes(data=True):
-            if data.get("carrera", "").strip().lower() == carrera_filtro_clean:
-                nodos_ids_compuestos.add(n)
-                
-                creditos_generales_requeridos = data.get("creditos_generales_requeridos", [])
-                
-                nodo = {
-                    "id": motor._extraer_codigo(n),
-                    "label": data.get("nombre", n),
-                    "nivel": data.get("nivel", 0),
-                    "creditos": data.get("creditos", 0),
-                    "carrera": data.get("carrera", "")
-                }
-                
-                if creditos_generales_requeridos:
-                    nodo["creditos_generales_requeridos"] = max(creditos_generales_requeridos)
-                
-                nodos.append(nodo)
-        
-        aristas = []
-        for u, v, edge_data in motor.graph.edges(data=True):
-            if (u in nodos_ids_compuestos and v in nodos_ids_compuestos
-                and motor.graph.nodes[u].get("carrera", "").strip().lower() == carrera_filtro_clean
-                and motor.graph.nodes[v].get("carrera", "").strip().lower() == carrera_filtro_clean):
-                
-                arista = {
-                    "source": motor._extraer_codigo(u),
-                    "target": motor._extraer_codigo(v)
-                }
-                
-                if edge_data.get("tipo") == "COURSE_CRED" and "creditos_requeridos" in edge_data:
-                    arista["tipo"] = "COURSE_CRED"
-                    arista["creditos_requeridos"] = edge_data["creditos_requeridos"]
-                elif edge_data.get("tipo") == "COURSE":
-                    arista["tipo"] = "COURSE"
-                
-                aristas.append(arista)
-    else:
-        nodos_por_codigo = {}
-        
-        for n, data in motor.graph.nodes(data=True):
-            codigo = motor._extraer_codigo(n)
-            if codigo not in nodos_por_codigo:
-                creditos_generales_requeridos = data.get("creditos_generales_requeridos", [])
-                
-                nodo = {
-                    "id": codigo,
-                    "label": data.get("nombre", codigo),
-                    "nivel": data.get("nivel", 0),
-                    "creditos": data.get("creditos", 0),
-                    "carrera": ""
-                }
-                
-                if creditos_generales_requeridos:
-                    nodo["creditos_generales_requeridos"] = max(creditos_generales_requeridos)
-                
-                nodos_por_codigo[codigo] = nodo
-        
-        nodos = list(nodos_por_codigo.values())
-        
-        aristas_dict = {}
-        for u, v, edge_data in motor.graph.edges(data=True):
-            codigo_u = motor._extraer_codigo(u)
-            codigo_v = motor._extraer_codigo(v)
-            if codigo_u != codigo_v:
-                key = (codigo_u, codigo_v)
-                if key not in aristas_dict:
-                    arista = {
-                        "source": codigo_u,
-                        "target": codigo_v
-                    }
-                    
-                    if edge_data.get("tipo") == "COURSE_CRED" and "creditos_requeridos" in edge_data:
-                        arista["tipo"] = "COURSE_CRED"
-                        arista["creditos_requeridos"] = edge_data["creditos_requeridos"]
-                    elif edge_data.get("tipo") == "COURSE":
-                        arista["tipo"] = "COURSE"
-                    
-                    aristas_dict[key] = arista
-        
-        aristas = list(aristas_dict.values())
-    
-    return {
-        "nodes": nodos,
-        "edges": aristas,
-        "total_nodes": len(nodos),
-        "total_edges": len(aristas),
-        "carrera_filtro": carrera if carrera else None
-    }
+def get_grafo_completo(request: Request, carrera: Optional[str] = None):
+    motor_actual = obtener_motor()
+    # se serializa una vez por versión del catálogo y carrera; después solo se
+    # sirven los bytes (o un 304 si el cliente ya los tiene)
+    clave = (motor_actual.version_catalogo, carrera)
+    carga = _cache_grafo.obtener(clave)
+    if carga is None:
+        carga = CargaCodificada(motor_actual.exportar_grafo(carrera))
+        _cache_grafo.guardar(clave, carga)
+    return responder_carga(request, carga, _cabeceras_version(motor_actual))
 
 
 @router.post("/api/planificar")
 def generar_plan(input_data: StudentInput):
-    if not motor:
-        raise HTTPException(status_code=500, detail="El motor no está inicializado")
+    motor_actual = obtener_motor()
     
     creditos_previos = PlanificacionService.calcular_creditos_previos(
-        input_data.historial, motor, input_data.carrera
+        input_data.historial, motor_actual, input_data.carrera
     )
     
-    todos, sugeridos = motor.generar_planificacion(
+    todos, sugeridos = motor_actual.generar_planificacion(
         input_data.historial,
         input_data.max_creditos,
-        carrera_filtro=input_data.carrera
+        carrera_filtro=input_data.carrera,
+        modo_seleccion=input_data.modo_seleccion
     )
     
-    return {
+    return RespuestaJSON({
         "resumen_creditos_aprobados": creditos_previos,
         "carrera_filtro": input_data.carrera,
         "cursos_disponibles": todos,
         "recomendacion_optima": sugeridos
-    }
+    }, headers=_cabeceras_version(motor_actual))
+
+
+@router.get("/api/planificar/cache")
+def get_estadisticas_cache():
+    """Aciertos, fallos y expulsiones de la cache de planificaciones"""
+    motor_actual = obtener_motor()
+    return motor_actual.estadisticas_cache()
+
+
+@router.get("/api/estadisticas/viajes")
+def get_estadisticas_viajes():
+    """Viajes a Supabase y lecturas reutilizadas por operación (unidades de trabajo)"""
+    return estadisticas_viajes()
+
+
+@router.post("/api/planificar/lote")
+def generar_plan_lote(estudiantes: List[StudentInput]):
+    """Planificar para muchos estudiantes en una sola llamada (respuesta NDJSON, una línea por estudiante)"""
+    motor_actual = obtener_motor()
+    
+    resultados = motor_actual.generar_planificacion_lote(
+        (est.historial, est.max_creditos, est.carrera, est.modo_seleccion) for est in estudiantes
+    )
+    
+    def generar_lineas():
+        pares = zip(estudiantes, resultados)
+        while True:
+            envio = list(itertools.islice(pares, LOTE_LINEAS_POR_ENVIO))
+            if not envio:
+                break
+            yield b"".join(
+                codificar_json({
+                    "resumen_creditos_aprobados": creditos_previos,
+                    "carrera_filtro": est.carrera,
+                    "cursos_disponibles": todos,
+                    "recomendacion_optima": sugeridos
+                }) + b"\n"
+                for est, (creditos_previos, todos, sugeridos) in envio
+            )
+    
+    return StreamingResponse(
+        generar_lineas(), media_type="application/x-ndjson",
+        headers=_cabeceras_version(motor_actual)
+    )
 
 
 @router.post("/api/planificar/{user_id}")
-def generar_plan_usuario(user_id: str, max_creditos: float = 22.0, carrera: Optional[str] = None):
-    if not motor:
-        raise HTTPException(status_code=500, detail="El motor no está inicializado")
+def generar_plan_usuario(user_id: str, max_creditos: float = Query(22.0, gt=0), carrera: Optional[str] = None, 
+                         modo_seleccion: Literal["voraz", "optimo"] = "voraz"):
+    motor_actual = obtener_motor()
     
     historial = UsuarioService.obtener_historial(user_id)
     
     if not carrera:
         carrera = UsuarioService.obtener_carrera_usuario(user_id)
     
-    creditos_previos = PlanificacionService.calcular_creditos_previos(historial, motor, carrera)
-    todos, sugeridos = motor.generar_planificacion(historial, max_creditos, carrera_filtro=carrera)
+    creditos_previos = PlanificacionService.calcular_creditos_previos(historial, motor_actual, carrera)
+    todos, sugeridos = motor_actual.generar_planificacion(
+        historial, max_creditos, carrera_filtro=carrera, modo_seleccion=modo_seleccion
+    )
     
-    return {
+    return RespuestaJSON({
         "resumen_creditos_aprobados": creditos_previos,
         "carrera_filtro": carrera,
         "cursos_disponibles": todos,
         "recomendacion_optima": sugeridos
-    }
+    }, headers=_cabeceras_version(motor_actual))
+
+
+@router.post("/api/roadmap")
+def generar_roadmap(input_data: RoadmapInput):
+    """Planificar semestre a semestre hasta completar la malla con el mínimo de semestres"""
+    motor_actual = obtener_motor()
+    presupuesto_ms = min(max(input_data.presupuesto_ms, 0), ROADMAP_PRESUPUESTO_MAX_MS)
+    return RespuestaJSON(motor_actual.generar_roadmap(
+        input_data.historial,
+        input_data.max_creditos,
+        input_data.carrera,
+        presupuesto_segundos=presupuesto_ms / 1000
+    ), headers=_cabeceras_version(motor_actual))
+
+
+def _responder_catalogo(request: Request, ruta: str, carrera: Optional[str], construir):
+    motor_actual = motor
+    if motor_actual is None:
+        # mientras el motor arranca se responde desde la base
+        return RespuestaJSON(construir(None))
+    clave = (ruta, motor_actual.version_catalogo, carrera)
+    carga = _cache_catalogo.obtener(clave)
+    if carga is None:
+        carga = CargaCodificada(construir(motor_actual))
+        _cache_catalogo.guardar(clave, carga)
+    return responder_carga(request, carga, _cabeceras_version(motor_actual))
 
 
 @router.get("/api/cursos")
-def get_cursos(carrera: Optional[str] = None):
-    return CursoService.obtener_cursos(carrera)
+def get_cursos(request: Request, carrera: Optional[str] = None):
+    return _responder_catalogo(
+        request, "cursos", carrera, lambda m: CursoService.obtener_cursos(carrera, motor=m)
+    )
 
 
 @router.get("/api/carreras")
-def get_carreras():
-    return CursoService.obtener_carreras()
+def get_carreras(request: Request):
+    return _responder_catalogo(
+        request, "carreras", None, lambda m: CursoService.obtener_carreras(motor=m)
+    )
 
 
 @router.post("/api/cursos/recargar")
-def recargar_cursos_desde_csv():
-    global motor
+def recargar_cursos_desde_csv(modo: Literal["incremental", "completo"] = "incremental"):
+    """Recargar el catálogo desde el CSV; "incremental" escribe solo las diferencias"""
     csv_file = "mallas_consolidadas.csv"
     
     if not os.path.exists(csv_file):
         raise HTTPException(status_code=404, detail="No se encontró el archivo 'mallas_consolidadas.csv'")
     
-    if motor is None:
-        motor = MotorAcademico(None)
+    # una recarga a la vez: cada una parte del motor publicado por la anterior
+    with _lock_recarga:
+        try:
+            if modo == "incremental":
+                nuevo, resumen = obtener_motor().recargar_incremental(csv_file)
+                mensaje = "Cursos recargados de forma incremental"
+            else:
+                resumen = {}
+                nuevo = MotorAcademico(None, cargar=False)
+                nuevo.cargar_desde_csv(csv_file, borrar_existentes=True)
+                nuevo.cargar_cursos_desde_db()
+                fallidos = nuevo.metricas_carga.get("lotes_fallidos", 0)
+                if nuevo.error_carga or fallidos or len(nuevo.cursos) == 0:
+                    raise RuntimeError(
+                        nuevo.error_carga or (f"{fallidos} lotes no se pudieron guardar" if fallidos else "el catálogo quedó vacío")
+                    )
+                mensaje = "Cursos recargados exitosamente"
+        except HTTPException:
+            raise
+        except Exception as e:
+            # cualquier error de Supabase a mitad de la recarga: se sigue sirviendo
+            # el motor publicado
+            print(f"❌ Error recargando el catálogo: {type(e).__name__}: {e}")
+            raise HTTPException(status_code=502, detail=f"No se pudo recargar el catálogo: {e}")
+        
+        set_motor(nuevo)
     
-    motor.graph = nx.DiGraph()
-    motor.cargar_desde_csv(csv_file, borrar_existentes=True)
-    motor.cargar_cursos_desde_db()
+    # el snapshot no retrasa la respuesta
+    threading.Thread(target=nuevo.guardar_snapshot, name="snapshot-motor", daemon=True).start()
     
     return {
-        "message": "Cursos recargados exitosamente",
-        "total_cursos": len(motor.graph.nodes)
+        "message": mensaje,
+        "total_cursos": len(nuevo.cursos),
+        "version_catalogo": nuevo.version_catalogo,
+        "metricas_carga": nuevo.metricas_carga,
+        **resumen
     }
-
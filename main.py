@@ -1,11 +1,18 @@
 import os
+import threading
+import time
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+import endpoints
 from motor_academico import MotorAcademico
-from endpoints import router, set_motor
+from endpoints import router, set_motor, set_error_motor
+from services import UsuarioService
 
 app = FastAPI(title="API Motor Académico UPC")
 
+# 0 desactiva la reconciliación periódica (sigue disponible en /api/creditos/reconciliar)
+CREDITOS_RECONCILIACION_MINUTOS = float(os.getenv("CREDITOS_RECONCILIACION_MINUTOS", "0"))
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -17,8 +24,40 @@ app.add_middleware(
 app.include_router(router)
 
 
-@app.on_event("startup")
 def cargar_datos():
     csv_file = "mallas_consolidadas.csv"
-    motor = MotorAcademico(csv_file if os.path.exists(csv_file) else None)
+    inicio = time.perf_counter()
+    try:
+        motor = MotorAcademico(csv_file if os.path.exists(csv_file) else None)
+    except Exception as e:
+        print(f"❌ Error inicializando el motor: {e}")
+        set_error_motor(str(e))
+        return
     set_motor(motor)
+    print(f"✅ Motor listo en {time.perf_counter() - inicio:.2f}s")
+    # se hace con el motor ya publicado y sin armar las carreras pendientes
+    if not motor.desde_snapshot:
+        motor.guardar_snapshot()
+
+
+@app.on_event("startup")
+def iniciar_carga():
+    # uvicorn acepta conexiones de inmediato; /health/ready indica cuándo el motor está listo
+    threading.Thread(target=cargar_datos, name="carga-motor", daemon=True).start()
+
+
+def reconciliar_creditos_periodicamente():
+    # Los créditos se ajustan por diferencia en cada cambio del historial; esto
+    # corrige cualquier desvío que haya quedado
+    while True:
+        time.sleep(CREDITOS_RECONCILIACION_MINUTOS * 60)
+        try:
+            UsuarioService.reconciliar_creditos(motor=endpoints.motor)
+        except Exception as e:
+            print(f"⚠️  Error reconciliando créditos: {e}")
+
+
+@app.on_event("startup")
+def iniciar_reconciliacion():
+    if CREDITOS_RECONCILIACION_MINUTOS > 0:
+        threading.Thread(target=reconciliar_creditos_periodicamente, name="reconciliar-creditos", daemon=True).start()
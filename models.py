@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional, Any
+from pydantic import BaseModel, Field
+from typing import List, Optional, Any, Literal
 
 
 class Usuario(BaseModel):
@@ -25,8 +25,16 @@ class UsuarioUpdate(BaseModel):
 
 class StudentInput(BaseModel):
     historial: List[str]
-    max_creditos: float = 22.0
+    max_creditos: float = Field(22.0, gt=0)
     carrera: str
+    modo_seleccion: Literal["voraz", "optimo"] = "voraz"
+
+
+class RoadmapInput(BaseModel):
+    historial: List[str]
+    max_creditos: float = Field(22.0, gt=0)
+    carrera: str
+    presupuesto_ms: int = 500
 
 
 class CursoItem(BaseModel):
@@ -1,12 +1,36 @@
+import bisect
+import hashlib
+import itertools
+import math
+import os
+import threading
+import time
+import numpy as np
 import pandas as pd
 import networkx as nx
-from typing import List, Optional, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Tuple, Iterable, Iterator
+from almacen_cursos import AlmacenCursos
+from cache import CacheLRU
+from catalogo import VistaCatalogo
 from database import get_supabase
-from parser import parse_requisitos
-from utils import limpiar_curso_data, eliminar_duplicados_lote
+from parser import Expresion, O, expresion_desde_listas, parse_expresion_requisitos
+from particion import ParticionCarrera, RequisitoCompilado, cumple_alternativas
+from roadmap import PlanificadorRoadmap
+from snapshot import guardar_snapshot, cargar_snapshot
+from utils import limpiar_curso_data, eliminar_duplicados_lote, reintentar
 
 
 class MotorAcademico:
+    MAX_ESTADOS_ROADMAP = 200_000
+    # compartido entre instancias: un motor publicado después siempre tiene versión mayor
+    _versiones = itertools.count(1)
+    COLUMNAS_CURSO = "codigo,nombre,creditos,nivel,carrera,requisitos"
+    # fila única con la versión del catálogo; un trigger la sube con cada escritura
+    # en cursos (supabase/migrations/20261017000000_catalogo_version.sql)
+    TABLA_VERSION_CATALOGO = "catalogo_version"
+    TAMANO_BLOQUE_CSV = 50_000
+    
     @staticmethod
     def _crear_id_curso(codigo: str, carrera: str) -> str:
         return f"{codigo}|{carrera}"
@@ -20,185 +44,700 @@ class MotorAcademico:
         parts = id_curso.split("|")
         return parts[1] if len(parts) > 1 else ""
     
-    def __init__(self, csv_path: Optional[str] = None):
-        self.graph = nx.DiGraph()
-        self.supabase = get_supabase()
+    @staticmethod
+    def _normalizar_carrera(carrera: Optional[str]) -> str:
+        return (carrera or "").strip().lower()
+    
+    def __init__(self, csv_path: Optional[str] = None, supabase=None, cargar: bool = True):
+        self.version_catalogo = 0
+        self._cache_planificacion = CacheLRU(
+            max_entradas=int(os.getenv("PLAN_CACHE_MAX_ENTRADAS", "4096")),
+            ttl_segundos=float(os.getenv("PLAN_CACHE_TTL_SEGUNDOS", "600"))
+        )
+        self.ruta_snapshot = os.getenv("MOTOR_SNAPSHOT_PATH", "motor_snapshot.bin")
+        # Las particiones se arman al primer uso de cada carrera, salvo estas
+        # (nombres separados por coma, "*" = todas)
+        self.carreras_precargadas = [
+            self._normalizar_carrera(c) for c in os.getenv("CARRERAS_PRECARGADAS", "").split(",") if c.strip()
+        ]
+        self._lock_particiones = threading.RLock()
+        self._vista_catalogo: Optional[VistaCatalogo] = None
+        # versión del catálogo en la base con la que se cargó el grafo (ver
+        # _marca_version); None si no se sabe y entonces no se guarda snapshot
+        self._marca_cargada: Optional[str] = None
+        self.reiniciar_grafo()
+        # se puede inyectar un cliente (p. ej. un stub local para medir la carga)
+        self.supabase = supabase if supabase is not None else get_supabase()
+        self.metricas_carga: Dict = {}
+        # motivo por el que falló la última carga desde la base (None si no falló)
+        self.error_carga: Optional[str] = None
+        if not cargar:
+            return
+        
+        # el snapshot se valida con una sola lectura, sin descargar la tabla cursos
+        version = self._version_catalogo_db()
+        if version is not None and self.cargar_desde_snapshot(self._marca_version(version)):
+            return
+        
         self.cargar_cursos_desde_db()
         
         if csv_path:
-            if len(self.graph.nodes) == 0:
+            if len(self.cursos) == 0:
                 self.cargar_desde_csv(csv_path)
             else:
-                print(f"Ya hay {len(self.graph.nodes)} cursos en la base de datos.")
+                print(f"Ya hay {len(self.cursos)} cursos en la base de datos.")
     
-    def cargar_cursos_desde_db(self):
+    @staticmethod
+    def _marca_version(version: int) -> str:
+        return f"catalogo_version={version}"
+    
+    def _version_catalogo_db(self) -> Optional[int]:
+        try:
+            response = self.supabase.table(self.TABLA_VERSION_CATALOGO).select("version").limit(1).execute()
+        except Exception as e:
+            print(f"⚠️  No se pudo leer la versión del catálogo (sin snapshot): {e}")
+            return None
+        if not response.data:
+            print(f"⚠️  La tabla {self.TABLA_VERSION_CATALOGO} está vacía (sin snapshot)")
+            return None
+        return int(response.data[0]["version"])
+    
+    def cargar_desde_snapshot(self, marca: str) -> bool:
         try:
-            all_cursos = []
-            offset = 0
-            page_size = 1000
+            contenido = cargar_snapshot(self.ruta_snapshot, marca)
+        except Exception as e:
+            print(f"⚠️  Snapshot ilegible, se hará la carga completa: {e}")
+            return False
+        if contenido is None:
+            print(f"📦 Sin snapshot vigente en '{self.ruta_snapshot}', se hará la carga completa")
+            return False
+        
+        datos, arreglos = contenido
+        self.reiniciar_grafo()
+        carreras = datos["carreras"]
+        creditos = arreglos["creditos"].tolist()
+        carrera_ids = arreglos["carrera_id"].tolist()
+        for i, codigo in enumerate(datos["codigos"]):
+            self._registrar_nodo(
+                codigo=codigo,
+                creditos=creditos[i],
+                nombre=datos["nombres"][i],
+                nivel=datos["niveles"][i],
+                carrera=carreras[carrera_ids[i]],
+                requisitos=expresion_desde_listas(datos["requisitos"][i])
+            )
+        
+        ids = list(self.cursos)
+        entrantes: Dict[str, List[Tuple[str, str, Optional[int]]]] = {}
+        aristas = zip(
+            arreglos["aristas_origen"].tolist(), arreglos["aristas_destino"].tolist(),
+            arreglos["aristas_tipo"].tolist(), arreglos["aristas_creditos"].tolist()
+        )
+        for u, v, tipo, creditos_requeridos in aristas:
+            entrantes.setdefault(ids[v], []).append((
+                ids[u], "COURSE_CRED" if tipo == 1 else "COURSE",
+                creditos_requeridos if creditos_requeridos >= 0 else None
+            ))
+        for id_curso, aristas_curso in entrantes.items():
+            self.cursos.fijar_entrantes(id_curso, aristas_curso)
+        
+        # los bits de descendientes quedan mapeados en el archivo y cada carrera
+        # los decodifica al armar su partición
+        limites = arreglos["descendientes_offsets"]
+        bits = arreglos["descendientes_bits"]
+        # (un curso sin bits es de una carrera que no estaba armada al guardar)
+        descendientes = {
+            id_curso: bits[limites[i]:limites[i + 1]] for i, id_curso in enumerate(ids) if limites[i + 1] > limites[i]
+        }
+        self._construir_particiones(descendientes)
+        self._marca_cargada = marca
+        self.desde_snapshot = True
+        print(f"⚡ Motor cargado desde snapshot: {len(self.cursos)} nodos, {self.cursos.total_aristas()} aristas.")
+        return True
+    
+    def guardar_snapshot(self):
+        # Guarda los descendientes solo de las carreras ya armadas: las demás se
+        # siguen armando al primer uso, también al arrancar desde el snapshot
+        if self._marca_cargada is None or len(self.cursos) == 0:
+            return
+        
+        with self._lock_particiones:
+            ubicaciones = dict(self._ubicaciones)
+            # los que vinieron de un snapshot y todavía no se usaron se conservan
+            precalculados = dict(self._descendientes_precalculados)
+        ids = list(self.cursos)
+        posiciones = {id_curso: i for i, id_curso in enumerate(ids)}
+        carreras: List[str] = []
+        carrera_ids: Dict[str, int] = {}
+        datos = {"codigos": [], "nombres": [], "niveles": [], "requisitos": [], "carreras": carreras}
+        creditos = np.zeros(len(ids), dtype=np.float64)
+        ids_carrera = np.zeros(len(ids), dtype=np.int32)
+        limites = np.zeros(len(ids) + 1, dtype=np.int64)
+        bloques_bits = []
+        
+        for i, id_curso in enumerate(ids):
+            carrera = self.cursos.carrera(id_curso)
+            if carrera not in carrera_ids:
+                carrera_ids[carrera] = len(carreras)
+                carreras.append(carrera)
+            datos["codigos"].append(self.cursos.codigo(id_curso))
+            datos["nombres"].append(self.cursos.nombre(id_curso))
+            datos["niveles"].append(self.cursos.nivel(id_curso))
+            datos["requisitos"].append(self.cursos.expresion_requisitos(id_curso))
+            creditos[i] = self.cursos.creditos(id_curso)
+            ids_carrera[i] = carrera_ids[carrera]
             
-            while True:
-                response = self.supabase.table("cursos").select("*").range(offset, offset + page_size - 1).execute()
-                cursos_pagina = response.data or []
-                
-                if not cursos_pagina:
-                    break
-                
-                all_cursos.extend(cursos_pagina)
-                offset += page_size
-                
-                if len(cursos_pagina) < page_size:
-                    break
+            limites[i + 1] = limites[i]
+            if id_curso in ubicaciones:
+                particion, j = ubicaciones[id_curso]
+                bloque = particion.descendientes[j].to_bytes((len(particion.nodos) + 7) // 8, "little")
+            elif id_curso in precalculados:
+                bloque = precalculados[id_curso].tobytes()
+            else:
+                continue
+            bloques_bits.append(bloque)
+            limites[i + 1] += len(bloque)
+        
+        aristas = list(self.cursos.aristas())
+        arreglos = {
+            "creditos": creditos,
+            "carrera_id": ids_carrera,
+            "descendientes_offsets": limites,
+            "descendientes_bits": np.frombuffer(b"".join(bloques_bits), dtype=np.uint8),
+            "aristas_origen": np.array([posiciones[u] for u, _, _ in aristas], dtype=np.int32),
+            "aristas_destino": np.array([posiciones[v] for _, v, _ in aristas], dtype=np.int32),
+            "aristas_tipo": np.array([1 if d.get("tipo") == "COURSE_CRED" else 0 for _, _, d in aristas], dtype=np.int8),
+            "aristas_creditos": np.array([d.get("creditos_requeridos", -1) for _, _, d in aristas], dtype=np.int32)
+        }
+        
+        try:
+            guardar_snapshot(self.ruta_snapshot, self._marca_cargada, datos, arreglos)
+            print(f"💾 Snapshot guardado en '{self.ruta_snapshot}' ({len(ids)} nodos, "
+                  f"{len(self._particiones)} de {len(self._nodos_por_carrera)} carreras armadas)")
+        except Exception as e:
+            print(f"⚠️  No se pudo guardar el snapshot: {e}")
+    
+    def _descargar_pagina_cursos(self, inicio: int, tamano_pagina: int) -> List[Dict]:
+        # orden total por (codigo, carrera) para que los rangos no se solapen entre consultas
+        response = reintentar(
+            lambda: self.supabase.table("cursos").select(self.COLUMNAS_CURSO)
+                .order("codigo").order("carrera")
+                .range(inicio, inicio + tamano_pagina - 1).execute(),
+            descripcion=f"la descarga de cursos {inicio}-{inicio + tamano_pagina - 1}"
+        )
+        return response.data or []
+    
+    def _paginas_cursos_db(self, tiempos: Optional[Dict] = None) -> Iterator[List[Dict]]:
+        # Con el conteo las páginas se piden en paralelo y se entregan en orden de
+        # página a medida que llegan; sin conteo se pagina en serie
+        tamano_pagina = int(os.getenv("CURSOS_PAGINA", "1000"))
+        concurrencia = max(1, int(os.getenv("CURSOS_CONCURRENCIA", "4")))
+        tiempos = tiempos if tiempos is not None else {}
+        inicio = time.perf_counter()
+        
+        total = reintentar(
+            lambda: self.supabase.table("cursos").select("codigo", count="exact").limit(1).execute(),
+            descripcion="el conteo de cursos"
+        ).count
+        paginas = math.ceil(total / tamano_pagina) if total else 0
+        tiempos.update(conteo=time.perf_counter() - inicio, paginas=paginas, concurrencia=concurrencia)
+        
+        ultima = tamano_pagina if total is None else 0
+        with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+            futuros = [
+                executor.submit(self._descargar_pagina_cursos, i * tamano_pagina, tamano_pagina)
+                for i in range(paginas)
+            ]
+            for futuro in futuros:
+                cursos_pagina = futuro.result()
+                ultima = len(cursos_pagina)
+                yield cursos_pagina
+        
+        # si el catálogo creció después del conteo, el resto se trae en serie
+        offset = paginas * tamano_pagina
+        while ultima == tamano_pagina:
+            cursos_pagina = self._descargar_pagina_cursos(offset, tamano_pagina)
+            ultima = len(cursos_pagina)
+            offset += tamano_pagina
+            yield cursos_pagina
+    
+    def cargar_cursos_desde_db(self):
+        # La versión se lee antes de descargar: si el catálogo cambia durante la
+        # carga, el snapshot queda vencido en vez de ocultar el cambio
+        self._marca_cargada = None
+        self.error_carga = None
+        version = self._version_catalogo_db()
+        try:
+            inicio = time.perf_counter()
+            tiempos = {}
+            carreras_cargadas = set()
+            total_obtenidos = 0
+            t_nodos = 0.0
             
-            print(f"📦 Total cursos obtenidos de Supabase: {len(all_cursos)}")
+            # los nodos se arman mientras llegan las páginas siguientes
+            for cursos_pagina in self._paginas_cursos_db(tiempos):
+                t = time.perf_counter()
+                for curso in cursos_pagina:
+                    self._agregar_nodo_al_grafo(
+                        codigo=curso["codigo"],
+                        creditos=float(curso["creditos"]),
+                        nombre=curso["nombre"],
+                        nivel=curso.get("nivel", 0),
+                        carrera=curso.get("carrera", ""),
+                        requisitos_str=curso.get("requisitos", "") or ""
+                    )
+                    if curso.get("carrera"):
+                        carreras_cargadas.add(curso["carrera"])
+                total_obtenidos += len(cursos_pagina)
+                t_nodos += time.perf_counter() - t
+            t_descarga = time.perf_counter() - inicio - tiempos["conteo"] - t_nodos
             
-            carreras_cargadas = set()
-            for curso in all_cursos:
-                self._agregar_nodo_al_grafo(
-                    codigo=curso["codigo"],
-                    creditos=float(curso["creditos"]),
-                    nombre=curso["nombre"],
-                    nivel=curso.get("nivel", 0),
-                    carrera=curso.get("carrera", ""),
-                    requisitos_str=curso.get("requisitos", "") or ""
-                )
-                if curso.get("carrera"):
-                    carreras_cargadas.add(curso["carrera"])
+            print(f"📦 Total cursos obtenidos de Supabase: {total_obtenidos}")
             
+            t = time.perf_counter()
             self._construir_aristas()
-            print(f"✅ Cursos cargados desde Supabase: {len(self.graph.nodes)} nodos, {len(carreras_cargadas)} carreras distintas.")
+            t_aristas = time.perf_counter() - t
+            t = time.perf_counter()
+            self._construir_particiones()
+            t_particiones = time.perf_counter() - t
+            print(f"✅ Cursos cargados desde Supabase: {len(self.cursos)} nodos, {len(carreras_cargadas)} carreras distintas.")
+            print(f"⏱️  Carga: conteo {tiempos['conteo']:.2f}s | descarga {t_descarga:.2f}s "
+                  f"({tiempos['paginas']} páginas en paralelo, concurrencia {tiempos['concurrencia']}) | "
+                  f"nodos {t_nodos:.2f}s | aristas {t_aristas:.2f}s | particiones {t_particiones:.2f}s")
+            self._marca_cargada = self._marca_version(version) if version is not None else None
         except Exception as e:
             print(f"❌ Error cargando cursos desde Supabase: {e}")
             import traceback
             traceback.print_exc()
-            self.graph = nx.DiGraph()
+            self.reiniciar_grafo()
+            self._marca_cargada = None
+            self.error_carga = str(e)
+    
+    def reiniciar_grafo(self):
+        self.cursos = AlmacenCursos()
+        # (codigo, carrera normalizada) -> id del nodo, para resolver aristas sin recorrer el grafo
+        self._indice_nodos: Dict[Tuple[str, str], str] = {}
+        self._nodos_por_carrera: Dict[str, List[str]] = {}
+        # codigo -> ids de nodo ordenados, para buscar cursos sin carrera
+        self._indice_codigos: Dict[str, List[str]] = {}
+        self._particiones: Dict[str, ParticionCarrera] = {}
+        # id del nodo -> (partición, índice dentro de la partición)
+        self._ubicaciones: Dict[str, Tuple[ParticionCarrera, int]] = {}
+        self._descendientes_precalculados: Dict[str, np.ndarray] = {}
+        self.desde_snapshot = False
     
     def cargar_desde_csv(self, csv_path: str, borrar_existentes: bool = False):
-        df = pd.read_csv(csv_path)
-        print(f"Cargando TODOS los cursos del CSV ({len(df)} filas encontradas)")
-        
-        df = df.dropna(subset=["Código", "Asignatura"])
-        df["Requisitos"] = df["Requisitos"].fillna("").astype(str)
-        
         cursos_para_insertar = []
         
-        for _, row in df.iterrows():
-            curso_data = self._procesar_fila_csv(row)
-            if curso_data:
-                self._agregar_nodo_al_grafo(
-                    codigo=curso_data["codigo"],
-                    creditos=curso_data["creditos"],
-                    nombre=curso_data["nombre"],
-                    nivel=curso_data["nivel"],
-                    carrera=curso_data["carrera"],
-                    requisitos_str=curso_data["requisitos"]
-                )
-                cursos_para_insertar.append(curso_data)
+        for curso_data in self._leer_cursos_csv(csv_path):
+            self._agregar_nodo_al_grafo(
+                codigo=curso_data["codigo"],
+                creditos=curso_data["creditos"],
+                nombre=curso_data["nombre"],
+                nivel=curso_data["nivel"],
+                carrera=curso_data["carrera"],
+                requisitos_str=curso_data["requisitos"]
+            )
+            cursos_para_insertar.append(curso_data)
         
         if borrar_existentes:
             self._borrar_cursos_existentes()
         
         if cursos_para_insertar:
             self._insertar_cursos_en_lotes(cursos_para_insertar)
+            # no se sabe qué versión dejaron estas escrituras (otro proceso pudo
+            # escribir en medio): sin marca no se guarda snapshot
+            self._marca_cargada = None
         
         self._construir_aristas()
-        print(f"Motor cargado correctamente con {len(self.graph.nodes)} nodos.")
+        self._construir_particiones()
+        print(f"Motor cargado correctamente con {len(self.cursos)} nodos.")
     
-    def _procesar_fila_csv(self, row: pd.Series) -> Optional[Dict]:
-        cod = str(row["Código"]).strip()
-        if not cod or cod.lower() == "nan":
-            return None
-        
-        cr = self._parse_creditos(row.get("Créditos", 0))
-        nm = self._parse_string(row.get("Asignatura", ""), "")
-        nivel = self._parse_nivel(row.get("Nivel", 0))
-        carrera = self._parse_string(row.get("Carrera", "General"), "General")
-        requisitos_str = self._parse_string(row.get("Requisitos", ""), "")
-        
-        return {
-            "codigo": cod,
-            "nombre": nm if nm else "",
-            "creditos": float(cr),
-            "nivel": int(nivel),
-            "carrera": carrera if carrera else "General",
-            "requisitos": requisitos_str if requisitos_str else None
-        }
+    def _leer_cursos_csv(self, csv_path: str) -> Iterator[Dict]:
+        # Se lee por bloques y todo como texto; cada columna se limpia de una vez
+        # con pandas en lugar de fila por fila
+        total_filas = 0
+        for bloque in pd.read_csv(csv_path, dtype=str, chunksize=self.TAMANO_BLOQUE_CSV):
+            total_filas += len(bloque)
+            bloque = bloque.dropna(subset=["Código", "Asignatura"])
+            codigos = bloque["Código"].str.strip()
+            validos = (codigos != "") & (codigos.str.lower() != "nan")
+            bloque, codigos = bloque[validos], codigos[validos]
+            
+            creditos = pd.to_numeric(
+                self._columna_csv(bloque, "Créditos").str.replace(",", ".", regex=False), errors="coerce"
+            ).fillna(0.0)
+            niveles = pd.to_numeric(self._columna_csv(bloque, "Nivel"), errors="coerce")
+            niveles = np.trunc(niveles.where(np.isfinite(niveles), 0)).astype(np.int64)
+            
+            yield from (
+                {
+                    "codigo": codigo,
+                    "nombre": nombre,
+                    "creditos": cr,
+                    "nivel": nivel,
+                    "carrera": carrera,
+                    "requisitos": requisitos
+                }
+                for codigo, nombre, cr, nivel, carrera, requisitos in zip(
+                    codigos.tolist(),
+                    self._limpiar_textos(bloque["Asignatura"], ""),
+                    creditos.tolist(),
+                    niveles.tolist(),
+                    self._limpiar_textos(self._columna_csv(bloque, "Carrera"), "General"),
+                    self._limpiar_textos(self._columna_csv(bloque, "Requisitos"), None)
+                )
+            )
+        print(f"Cargando TODOS los cursos del CSV ({total_filas} filas encontradas)")
     
-    def _parse_creditos(self, valor) -> float:
-        try:
-            if pd.isna(valor):
-                return 0.0
-            return float(str(valor).replace(",", "."))
-        except:
-            return 0.0
-    
-    def _parse_string(self, valor, default: str = "") -> str:
-        if pd.isna(valor):
-            return default
-        result = str(valor).strip()
-        return result if result and result.lower() != "nan" else default
-    
-    def _parse_nivel(self, valor) -> int:
-        if pd.isna(valor):
-            return 0
-        try:
-            return int(float(valor))
-        except:
-            return 0
+    @staticmethod
+    def _columna_csv(bloque: pd.DataFrame, columna: str) -> pd.Series:
+        if columna in bloque:
+            return bloque[columna]
+        return pd.Series(np.nan, index=bloque.index, dtype=object)
+    
+    @staticmethod
+    def _limpiar_textos(valores: pd.Series, default: Optional[str]) -> List[Optional[str]]:
+        textos = valores.str.strip()
+        vacios = (textos.isna() | (textos == "") | (textos.str.lower() == "nan")).tolist()
+        return [default if vacio else texto for texto, vacio in zip(textos.tolist(), vacios)]
     
     def _agregar_nodo_al_grafo(self, codigo: str, creditos: float, nombre: str, 
                                 nivel: int, carrera: str, requisitos_str: str):
-        parsed = parse_requisitos(requisitos_str)
+        requisitos = parse_expresion_requisitos(requisitos_str)
+        self._registrar_nodo(codigo, creditos, nombre, nivel, carrera, requisitos)
+    
+    def _registrar_nodo(self, codigo: str, creditos: float, nombre: str, nivel: int, 
+                        carrera: str, requisitos: Expresion):
+        id_curso = self._crear_id_curso(codigo, carrera)
+        if self.cursos.agregar(id_curso, codigo, creditos, nombre, nivel, carrera, requisitos):
+            carrera_clean = self._normalizar_carrera(carrera)
+            self._indice_nodos.setdefault((codigo, carrera_clean), id_curso)
+            self._nodos_por_carrera.setdefault(carrera_clean, []).append(id_curso)
+            bisect.insort(self._indice_codigos.setdefault(codigo, []), id_curso)
+    
+    @property
+    def graph(self) -> nx.DiGraph:
+        # Vista networkx de solo lectura, armada a pedido desde el almacén de cursos
+        return self.cursos.vista_networkx()
+    
+    def _eliminar_nodo_del_grafo(self, id_curso: str):
+        if id_curso not in self.cursos:
+            return
         
-        creditos_generales_requeridos = []
-        for r in parsed:
-            if r[0] == "CRED" and len(r) > 1:
-                creditos_generales_requeridos.append(r[1])
+        codigo = self.cursos.codigo(id_curso)
+        carrera_clean = self._normalizar_carrera(self.cursos.carrera(id_curso))
+        self.cursos.eliminar(id_curso)
         
-        id_curso = self._crear_id_curso(codigo, carrera)
-        self.graph.add_node(
-            id_curso, 
-            codigo=codigo,
-            creditos=creditos, 
-            nombre=nombre, 
-            nivel=nivel, 
-            carrera=carrera, 
-            reqs_logicos=parsed,
-            creditos_generales_requeridos=creditos_generales_requeridos
-        )
+        self._nodos_por_carrera[carrera_clean].remove(id_curso)
+        if not self._nodos_por_carrera[carrera_clean]:
+            del self._nodos_por_carrera[carrera_clean]
+        
+        ids_codigo = self._indice_codigos[codigo]
+        ids_codigo.remove(id_curso)
+        if not ids_codigo:
+            del self._indice_codigos[codigo]
+        
+        if self._indice_nodos.get((codigo, carrera_clean)) == id_curso:
+            del self._indice_nodos[(codigo, carrera_clean)]
+            for otro_id in self._nodos_por_carrera.get(carrera_clean, []):
+                if self.cursos.codigo(otro_id) == codigo:
+                    self._indice_nodos[(codigo, carrera_clean)] = otro_id
+                    break
     
-    def _construir_aristas(self):
-        for id_curso in self.graph.nodes:
-            nodo_data = self.graph.nodes[id_curso]
-            carrera_curso = nodo_data.get("carrera", "").strip().lower()
-            reqs = nodo_data.get("reqs_logicos", [])
+    def _resolver_id_curso(self, codigo: str) -> Optional[str]:
+        # Si el mismo código existe en varias carreras se elige siempre el nodo con
+        # el menor id "codigo|carrera" (orden alfabético de carrera), sin depender
+        # del orden en que se cargaron los cursos.
+        ids_codigo = self._indice_codigos.get(codigo)
+        return ids_codigo[0] if ids_codigo else None
+    
+    def _construir_aristas(self, carrera: Optional[str] = None):
+        if carrera is None:
+            ids_cursos = list(self.cursos)
+        else:
+            ids_cursos = self._nodos_por_carrera.get(self._normalizar_carrera(carrera), [])
+        
+        for id_curso in ids_cursos:
+            carrera_curso = self._normalizar_carrera(self.cursos.carrera(id_curso))
+            entrantes = []
             
-            for r in reqs:
+            for r in self.cursos.requisitos(id_curso):
+                if r[0] not in ("COURSE", "COURSE_CRED"):
+                    continue
+                
+                otro_id = self._indice_nodos.get((r[1], carrera_curso))
+                if otro_id is None:
+                    continue
+                
                 if r[0] == "COURSE":
-                    prereq_codigo = r[1]
-                    
-                    for otro_id in self.graph.nodes:
-                        otro_data = self.graph.nodes[otro_id]
-                        carrera_prereq = otro_data.get("carrera", "").strip().lower()
-                        if (otro_data.get("codigo") == prereq_codigo and 
-                            carrera_prereq == carrera_curso):
-                            self.graph.add_edge(otro_id, id_curso, tipo="COURSE")
-                            break
-                elif r[0] == "COURSE_CRED":
-                    prereq_codigo = r[1]
-                    creditos_requeridos = r[2] if len(r) > 2 else 0
-                    
-                    for otro_id in self.graph.nodes:
-                        otro_data = self.graph.nodes[otro_id]
-                        carrera_prereq = otro_data.get("carrera", "").strip().lower()
-                        if (otro_data.get("codigo") == prereq_codigo and 
-                            carrera_prereq == carrera_curso):
-                            self.graph.add_edge(
-                                otro_id, id_curso, 
-                                tipo="COURSE_CRED",
-                                creditos_requeridos=creditos_requeridos
-                            )
-                            break
+                    entrantes.append((otro_id, "COURSE", None))
+                else:
+                    entrantes.append((otro_id, "COURSE_CRED", r[2] if len(r) > 2 else 0))
+            
+            self.cursos.fijar_entrantes(id_curso, entrantes)
+    
+    def _construir_particiones(self, descendientes_precalculados: Optional[Dict[str, np.ndarray]] = None):
+        with self._lock_particiones:
+            self._particiones = {}
+            self._ubicaciones = {}
+            self._descendientes_precalculados = descendientes_precalculados or {}
+            precargar = self._nodos_por_carrera if "*" in self.carreras_precargadas else self.carreras_precargadas
+            for carrera_clean in precargar:
+                if carrera_clean in self._nodos_por_carrera:
+                    self._construir_particion(carrera_clean)
+            self._invalidar_planificaciones()
+        print(f"🧩 Particiones precargadas: {len(self._particiones)} de {len(self._nodos_por_carrera)} carreras")
+    
+    def _obtener_particion(self, carrera: Optional[str]) -> Optional[ParticionCarrera]:
+        carrera_clean = self._normalizar_carrera(carrera)
+        particion = self._particiones.get(carrera_clean)
+        if particion is not None or carrera_clean not in self._nodos_por_carrera:
+            return particion
+        with self._lock_particiones:
+            if carrera_clean not in self._particiones:
+                self._construir_particion(carrera_clean)
+            return self._particiones.get(carrera_clean)
+    
+    def _construir_particion(self, carrera: str):
+        carrera_clean = self._normalizar_carrera(carrera)
+        nodos = tuple(self._nodos_por_carrera.get(carrera_clean, []))
+        anterior = self._particiones.pop(carrera_clean, None)
+        if anterior is not None:
+            for id_curso in anterior.nodos:
+                self._ubicaciones.pop(id_curso, None)
+        if not nodos:
+            return
+        
+        metadata = {}
+        for id_curso in nodos:
+            metadata[id_curso] = {
+                "id": self.cursos.codigo(id_curso),
+                "nombre": self.cursos.nombre(id_curso),
+                "creditos": self.cursos.creditos(id_curso),
+                "nivel": self.cursos.nivel(id_curso),
+                "carrera": self.cursos.carrera(id_curso)
+            }
+        
+        indices = {id_curso: i for i, id_curso in enumerate(nodos)}
+        if all(n in self._descendientes_precalculados for n in nodos):
+            descendientes = [int.from_bytes(self._descendientes_precalculados.pop(n).tobytes(), "little") for n in nodos]
+        else:
+            subgrafo = nx.DiGraph()
+            subgrafo.add_nodes_from(nodos)
+            subgrafo.add_edges_from(self.cursos.aristas_entre(nodos))
+            descendientes = self._calcular_descendientes(subgrafo, indices)
+        impacto = tuple(d.bit_count() for d in descendientes)
+        
+        requisitos = tuple(self._compilar_requisitos(id_curso, indices) for id_curso in nodos)
+        matriz_requisitos = np.zeros((len(nodos), len(nodos)), dtype=bool)
+        for i, req in enumerate(requisitos):
+            matriz_requisitos[i, list(req.indices)] = True
+        orden_topologico, alturas, dependientes = self._ordenar_requisitos(requisitos)
+        
+        particion = ParticionCarrera(
+            carrera=self.cursos.carrera(nodos[0]),
+            nodos=nodos,
+            metadata=metadata,
+            indices=indices,
+            descendientes=tuple(descendientes),
+            impacto=impacto,
+            requisitos=requisitos,
+            matriz_requisitos=np.packbits(matriz_requisitos, axis=1),
+            creditos_minimos=np.array([req.creditos_minimos for req in requisitos], dtype=np.float64),
+            con_externos=tuple(i for i, req in enumerate(requisitos) if req.externos),
+            con_alternativas=tuple(i for i, req in enumerate(requisitos) if req.alternativas),
+            orden_impacto=np.lexsort((
+                np.array(nodos), np.array([metadata[n]["nivel"] for n in nodos]), -np.array(impacto)
+            )),
+            orden_topologico=orden_topologico,
+            alturas=alturas,
+            dependientes=dependientes
+        )
+        # las ubicaciones van antes: quien ve la partición publicada ya las encuentra
+        for id_curso, i in indices.items():
+            self._ubicaciones[id_curso] = (particion, i)
+        self._particiones[carrera_clean] = particion
+    
+    def _compilar_requisitos(self, id_curso: str, indices: Dict[str, int]) -> RequisitoCompilado:
+        carrera_curso = self.cursos.carrera(id_curso)
+        indices_req = []
+        externos = []
+        alternativas = []
+        creditos_minimos = 0
+        
+        # la raíz es un AND: sus hijos se exigen todos
+        for r in self.cursos.expresion_requisitos(id_curso)[1]:
+            if r[0] == O:
+                alternativas.append((O, tuple(
+                    self._compilar_alternativa(hoja, carrera_curso, indices) for hoja in r[1]
+                )))
+            elif r[0] in ("COURSE", "COURSE_CRED"):
+                id_prereq = self._crear_id_curso(r[1], carrera_curso)
+                if id_prereq in indices:
+                    indices_req.append(indices[id_prereq])
+                else:
+                    externos.append(id_prereq)
+            elif r[0] == "CRED":
+                creditos_minimos = max(creditos_minimos, r[1] if len(r) > 1 else 0)
+        
+        indices_req = tuple(sorted(set(indices_req)))
+        return RequisitoCompilado(
+            indices=indices_req,
+            mascara=sum(1 << i for i in indices_req),
+            externos=tuple(dict.fromkeys(externos)),
+            creditos_minimos=creditos_minimos,
+            alternativas=tuple(alternativas)
+        )
+    
+    def _compilar_alternativa(self, hoja: Tuple, carrera_curso: str, indices: Dict[str, int]) -> Tuple:
+        if hoja[0] == "CRED":
+            return ("CRED", hoja[1] if len(hoja) > 1 else 0)
+        id_prereq = self._crear_id_curso(hoja[1], carrera_curso)
+        return ("COURSE", id_prereq, indices.get(id_prereq))
+    
+    def _ubicar_curso(self, id_curso: str) -> Optional[Tuple[ParticionCarrera, int]]:
+        id_nodo = id_curso if id_curso in self.cursos or "|" in id_curso else self._resolver_id_curso(id_curso)
+        if id_nodo is None or id_nodo not in self.cursos:
+            return None
+        ubicacion = self._ubicaciones.get(id_nodo)
+        if ubicacion is None and self._obtener_particion(self.cursos.carrera(id_nodo)) is not None:
+            ubicacion = self._ubicaciones.get(id_nodo)
+        return ubicacion
+    
+    @staticmethod
+    def _vector_aprobados(particion: ParticionCarrera, aprobados_dict: Dict) -> np.ndarray:
+        aprobados = np.zeros(len(particion.nodos), dtype=bool)
+        indices = [particion.indices[id_curso] for id_curso in aprobados_dict if id_curso in particion.indices]
+        aprobados[indices] = True
+        return aprobados
+    
+    @staticmethod
+    def _evaluar_elegibles(particion: ParticionCarrera, aprobados: np.ndarray, 
+                           aprobados_dicts: List[Dict], totales_creditos: np.ndarray) -> np.ndarray:
+        # aprobados: una fila por estudiante; se procesa por tramos para acotar la
+        # matriz temporal estudiantes x cursos x bytes
+        bytes_fila = particion.matriz_requisitos.shape[1]
+        tramo = max(1, 4_000_000 // max(1, len(particion.nodos) * bytes_fila))
+        aprobados_bits = np.packbits(aprobados, axis=1)
+        faltan_requisitos = np.empty(aprobados.shape, dtype=bool)
+        for inicio in range(0, len(aprobados), tramo):
+            bits = aprobados_bits[inicio:inicio + tramo, None, :]
+            faltan_requisitos[inicio:inicio + tramo] = (particion.matriz_requisitos & ~bits).any(axis=2)
+        
+        elegibles = ~aprobados & ~faltan_requisitos & (particion.creditos_minimos <= totales_creditos[:, None])
+        
+        for i in particion.con_externos:
+            externos = particion.requisitos[i].externos
+            for fila, aprobados_dict in enumerate(aprobados_dicts):
+                if elegibles[fila, i] and not all(id_prereq in aprobados_dict for id_prereq in externos):
+                    elegibles[fila, i] = False
+        
+        for i in particion.con_alternativas:
+            req = particion.requisitos[i]
+            for fila, aprobados_dict in enumerate(aprobados_dicts):
+                if elegibles[fila, i] and not cumple_alternativas(
+                        req, lambda id_prereq, _: id_prereq in aprobados_dict, totales_creditos[fila]):
+                    elegibles[fila, i] = False
+        return elegibles
+    
+    @staticmethod
+    def _calcular_descendientes(subgrafo: nx.DiGraph, indices: Dict[str, int]) -> List[int]:
+        # Una sola pasada en orden topológico inverso sobre las componentes fuertemente
+        # conexas (hay mallas con requisitos mutuos); equivale a nx.descendants por nodo.
+        condensado = nx.condensation(subgrafo)
+        miembros = {
+            c: sum(1 << indices[n] for n in condensado.nodes[c]["members"])
+            for c in condensado.nodes
+        }
+        alcanzables = {}
+        for c in reversed(list(nx.topological_sort(condensado))):
+            mascara = 0
+            for sucesor in condensado.successors(c):
+                mascara |= miembros[sucesor] | alcanzables[sucesor]
+            alcanzables[c] = mascara
+        
+        descendientes = [0] * len(indices)
+        for id_curso, i in indices.items():
+            c = condensado.graph["mapping"][id_curso]
+            descendientes[i] = alcanzables[c] | (miembros[c] & ~(1 << i))
+        return descendientes
+    
+    @staticmethod
+    def _ordenar_requisitos(requisitos: Tuple[RequisitoCompilado, ...]) -> Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[Tuple[int, ...], ...]]:
+        dependientes = [[] for _ in requisitos]
+        pendientes = [len(req.indices) for req in requisitos]
+        for i, req in enumerate(requisitos):
+            for j in req.indices:
+                dependientes[j].append(i)
+        
+        orden = [i for i, n in enumerate(pendientes) if n == 0]
+        for i in orden:
+            for d in dependientes[i]:
+                pendientes[d] -= 1
+                if pendientes[d] == 0:
+                    orden.append(d)
+        
+        alturas = [0] * len(requisitos)
+        for i in reversed(orden):
+            alturas[i] = 1 + max((alturas[d] for d in dependientes[i]), default=0)
+        return tuple(orden), tuple(alturas), tuple(tuple(d) for d in dependientes)
+    
+    def recalcular_carrera(self, carrera: str):
+        self._recalcular_carreras([carrera])
+    
+    def _recalcular_carreras(self, carreras: List[str]):
+        # Las aristas solo unen cursos de la misma carrera, así que basta con
+        # reconstruir esas particiones.
+        with self._lock_particiones:
+            carreras_clean = {self._normalizar_carrera(c) for c in carreras}
+            self._descendientes_precalculados = {
+                id_curso: d for id_curso, d in self._descendientes_precalculados.items()
+                if self._normalizar_carrera(self._extraer_carrera(id_curso)) not in carreras_clean
+            }
+            for carrera in carreras:
+                self._construir_aristas(carrera)
+                self._construir_particion(carrera)
+            self._invalidar_planificaciones()
+    
+    def clonar(self) -> "MotorAcademico":
+        # Copia independiente del catálogo en memoria; las particiones son inmutables
+        # y se comparten hasta que el clon las recalcule
+        clon = MotorAcademico.__new__(MotorAcademico)
+        clon.__dict__.update(self.__dict__)
+        clon.cursos = self.cursos.copiar()
+        clon._indice_nodos = dict(self._indice_nodos)
+        clon._nodos_por_carrera = {carrera: list(ids) for carrera, ids in self._nodos_por_carrera.items()}
+        clon._indice_codigos = {codigo: list(ids) for codigo, ids in self._indice_codigos.items()}
+        clon._particiones = dict(self._particiones)
+        clon._ubicaciones = dict(self._ubicaciones)
+        clon._descendientes_precalculados = dict(self._descendientes_precalculados)
+        clon._lock_particiones = threading.RLock()
+        clon._cache_planificacion = CacheLRU(
+            max_entradas=self._cache_planificacion.max_entradas,
+            ttl_segundos=self._cache_planificacion.ttl_segundos
+        )
+        clon.desde_snapshot = False
+        return clon
+    
+    def _invalidar_planificaciones(self):
+        # La versión va en la clave, así que un resultado calculado durante la
+        # recarga tampoco se puede servir después.
+        self.version_catalogo = next(MotorAcademico._versiones)
+        self._cache_planificacion.limpiar()
+    
+    def vista_catalogo(self) -> VistaCatalogo:
+        # Se arma una vez por versión del catálogo y se comparte entre peticiones
+        vista = self._vista_catalogo
+        if vista is None or vista.version != self.version_catalogo or vista.version_almacen != self.cursos.version:
+            with self._lock_particiones:
+                vista = self._vista_catalogo
+                if vista is None or vista.version != self.version_catalogo or vista.version_almacen != self.cursos.version:
+                    vista = self._vista_catalogo = VistaCatalogo(self.cursos, self.version_catalogo)
+        return vista
+    
+    def estadisticas_cache(self) -> Dict:
+        return {**self._cache_planificacion.estadisticas(), "version_catalogo": self.version_catalogo}
     
     def _borrar_cursos_existentes(self):
         try:
@@ -208,111 +747,299 @@ class MotorAcademico:
             print(f"⚠️  Advertencia al borrar cursos: {e}")
     
     def _insertar_cursos_en_lotes(self, cursos_para_insertar: List[Dict]):
-        try:
-            cursos_guardados = 0
-            for i in range(0, len(cursos_para_insertar), 100):
-                lote = cursos_para_insertar[i:i+100]
-                lote = eliminar_duplicados_lote(lote)
-                lote_limpio = [limpiar_curso_data(curso) for curso in lote]
-                
-                self.supabase.table("cursos").upsert(
-                    lote_limpio, 
-                    on_conflict="codigo,carrera"
-                ).execute()
-                
-                cursos_guardados += len(lote)
-                print(f"✅ Lote {i//100 + 1}: {len(lote)} cursos procesados")
+        tamano_lote = max(1, int(os.getenv("CURSOS_LOTE_UPSERT", "500")))
+        concurrencia = max(1, int(os.getenv("CURSOS_CONCURRENCIA_UPSERT", "4")))
+        inicio = time.perf_counter()
+        
+        # dedup global por (codigo, carrera): gana la última fila, como en el upsert
+        cursos = [limpiar_curso_data(curso) for curso in eliminar_duplicados_lote(cursos_para_insertar)]
+        lotes = [cursos[i:i + tamano_lote] for i in range(0, len(cursos), tamano_lote)]
+        metricas = {
+            "cursos_recibidos": len(cursos_para_insertar),
+            "duplicados_descartados": len(cursos_para_insertar) - len(cursos),
+            "lotes": len(lotes),
+            "tamano_lote": tamano_lote,
+            "concurrencia": concurrencia,
+            "lotes_guardados": 0,
+            "lotes_fallidos": 0,
+            "cursos_guardados": 0,
+            "reintentos": 0,
+            "segundos": 0.0,
+            "cursos_por_segundo": 0.0
+        }
+        self.metricas_carga = metricas
+        lock_metricas = threading.Lock()
+        
+        def subir_lote(numero: int, lote: List[Dict]):
+            intentos = 0
             
-            print(f"✅ Total: {cursos_guardados} cursos guardados en Supabase")
-        except Exception as e:
-            print(f"❌ Error guardando cursos en Supabase: {e}")
-            import traceback
-            traceback.print_exc()
+            def upsert():
+                nonlocal intentos
+                intentos += 1
+                return self.supabase.table("cursos").upsert(lote, on_conflict="codigo,carrera").execute()
+            
+            try:
+                reintentar(upsert, descripcion=f"el upsert del lote {numero}")
+                guardado = True
+            except Exception as e:
+                print(f"❌ Error guardando el lote {numero} ({len(lote)} cursos) en Supabase: {e}")
+                guardado = False
+            with lock_metricas:
+                metricas["reintentos"] += intentos - 1
+                if guardado:
+                    metricas["lotes_guardados"] += 1
+                    metricas["cursos_guardados"] += len(lote)
+                else:
+                    metricas["lotes_fallidos"] += 1
+        
+        with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+            list(executor.map(subir_lote, range(1, len(lotes) + 1), lotes))
+        
+        metricas["segundos"] = round(time.perf_counter() - inicio, 3)
+        metricas["cursos_por_segundo"] = round(metricas["cursos_guardados"] / max(metricas["segundos"], 1e-9), 1)
+        print(f"✅ Total: {metricas['cursos_guardados']} cursos guardados en Supabase "
+              f"({metricas['lotes_guardados']}/{metricas['lotes']} lotes, {metricas['lotes_fallidos']} fallidos, "
+              f"{metricas['duplicados_descartados']} duplicados, {metricas['segundos']:.2f}s)")
+    
+    def _eliminar_cursos(self, claves: List[Tuple[str, str]]):
+        por_carrera: Dict[str, List[str]] = {}
+        for codigo, carrera in claves:
+            por_carrera.setdefault(carrera, []).append(codigo)
+        
+        for carrera, codigos in por_carrera.items():
+            for i in range(0, len(codigos), 200):
+                tramo = codigos[i:i + 200]
+                reintentar(
+                    lambda: self.supabase.table("cursos").delete().eq("carrera", carrera).in_("codigo", tramo).execute(),
+                    descripcion=f"el borrado de cursos de '{carrera}'"
+                )
+    
+    @staticmethod
+    def _huella_curso(curso: Dict) -> str:
+        contenido = (
+            str(curso.get("nombre") or ""),
+            float(curso.get("creditos") or 0),
+            int(curso.get("nivel") or 0),
+            curso.get("requisitos") or ""
+        )
+        return hashlib.sha1(repr(contenido).encode("utf-8")).hexdigest()
+    
+    def recargar_incremental(self, csv_path: str) -> Tuple["MotorAcademico", Dict]:
+        # Compara el CSV con la tabla cursos por (codigo, carrera) y huella de contenido,
+        # escribe solo las diferencias y devuelve un motor nuevo con las carreras
+        # afectadas recalculadas. Este motor (el publicado) no se modifica: las
+        # escrituras y sus métricas van por el clon.
+        inicio = time.perf_counter()
+        nuevo = self.clonar()
+        nuevo.metricas_carga = {}
+        nuevos = {(curso["codigo"], curso["carrera"]): limpiar_curso_data(curso) for curso in self._leer_cursos_csv(csv_path)}
+        actuales = {(curso["codigo"], curso["carrera"]): curso for pagina in self._paginas_cursos_db() for curso in pagina}
+        
+        insertados = [curso for clave, curso in nuevos.items() if clave not in actuales]
+        actualizados = [
+            curso for clave, curso in nuevos.items()
+            if clave in actuales and self._huella_curso(curso) != self._huella_curso(actuales[clave])
+        ]
+        eliminados = [clave for clave in actuales if clave not in nuevos]
+        
+        if insertados or actualizados:
+            nuevo._insertar_cursos_en_lotes(insertados + actualizados)
+            fallidos = nuevo.metricas_carga["lotes_fallidos"]
+            if fallidos:
+                # la base quedó a medias: no se arma un motor con cambios que no se
+                # guardaron (la próxima recarga vuelve a calcular las diferencias)
+                raise RuntimeError(
+                    f"{fallidos} de {nuevo.metricas_carga['lotes']} lotes no se pudieron guardar en Supabase"
+                )
+        if eliminados:
+            nuevo._eliminar_cursos(eliminados)
+        if insertados or actualizados or eliminados:
+            # las escrituras subieron la versión del catálogo a un valor que no se conoce
+            nuevo._marca_cargada = None
+        
+        metricas_carga = nuevo.metricas_carga
+        carreras_afectadas = nuevo._aplicar_catalogo(nuevos)
+        if not carreras_afectadas:
+            # el grafo no cambió: se sigue con este motor, su versión y sus caches
+            nuevo = self
+        
+        resumen = {
+            "insertados": len(insertados),
+            "actualizados": len(actualizados),
+            "eliminados": len(eliminados),
+            "sin_cambios": len(nuevos) - len(insertados) - len(actualizados),
+            "carreras_afectadas": carreras_afectadas,
+            "segundos": round(time.perf_counter() - inicio, 3),
+            # las del clon: si se sigue con este motor, sus métricas no cambian
+            "metricas_carga": metricas_carga
+        }
+        print(f"🔄 Recarga incremental: +{resumen['insertados']} ~{resumen['actualizados']} -{resumen['eliminados']} "
+              f"({len(carreras_afectadas)} carreras afectadas, {resumen['segundos']:.2f}s)")
+        return nuevo, resumen
+    
+    def _aplicar_catalogo(self, cursos: Dict[Tuple[str, str], Dict]) -> List[str]:
+        # Deja el grafo igual a `cursos` tocando solo los nodos que cambiaron y
+        # recalcula las carreras afectadas
+        afectadas: Dict[str, str] = {}
+        vigentes = set()
+        
+        for (codigo, carrera), curso in cursos.items():
+            id_curso = self._crear_id_curso(codigo, carrera)
+            vigentes.add(id_curso)
+            requisitos = parse_expresion_requisitos(curso.get("requisitos") or "")
+            creditos = float(curso["creditos"])
+            if id_curso in self.cursos and \
+                    (self.cursos.nombre(id_curso), self.cursos.creditos(id_curso), self.cursos.nivel(id_curso), self.cursos.expresion_requisitos(id_curso)) == \
+                    (curso["nombre"], creditos, curso["nivel"], requisitos):
+                continue
+            self._registrar_nodo(codigo, creditos, curso["nombre"], curso["nivel"], carrera, requisitos)
+            afectadas[self._normalizar_carrera(carrera)] = carrera
+        
+        for id_curso in [n for n in self.cursos if n not in vigentes]:
+            carrera = self.cursos.carrera(id_curso)
+            self._eliminar_nodo_del_grafo(id_curso)
+            afectadas[self._normalizar_carrera(carrera)] = carrera
+        
+        if not afectadas:
+            return []
+        self._recalcular_carreras(list(afectadas.values()))
+        return sorted(afectadas.values())
     
     def get_info_curso(self, id_curso: str, carrera: Optional[str] = None) -> Optional[Dict]:
         if "|" in id_curso:
-            if id_curso not in self.graph.nodes:
-                return None
-            data = self.graph.nodes[id_curso]
+            id_nodo = id_curso
+        elif carrera:
+            id_nodo = self._crear_id_curso(id_curso, carrera)
         else:
-            if carrera:
-                id_buscado = self._crear_id_curso(id_curso, carrera)
-                if id_buscado not in self.graph.nodes:
-                    return None
-                data = self.graph.nodes[id_buscado]
-            else:
-                for id_nodo in self.graph.nodes:
-                    nodo_data = self.graph.nodes[id_nodo]
-                    if nodo_data.get("codigo") == id_curso:
-                        data = nodo_data
-                        break
-                else:
-                    return None
+            id_nodo = self._resolver_id_curso(id_curso)
+        if id_nodo is None or id_nodo not in self.cursos:
+            return None
         
         return {
-            "nombre": data.get("nombre", ""),
-            "creditos": data.get("creditos", 0),
-            "nivel": data.get("nivel", 0),
-            "carrera": data.get("carrera", ""),
-            "reqs": data.get("reqs_logicos", [])
+            "nombre": self.cursos.nombre(id_nodo),
+            "creditos": self.cursos.creditos(id_nodo),
+            "nivel": self.cursos.nivel(id_nodo),
+            "carrera": self.cursos.carrera(id_nodo),
+            "reqs": list(self.cursos.requisitos(id_nodo))
         }
     
     def get_carrera_curso(self, id_curso: str) -> Optional[str]:
         if "|" in id_curso:
             return self._extraer_carrera(id_curso)
         else:
-            info = self.get_info_curso(id_curso)
-            return info.get("carrera") if info else None
+            id_nodo = self._resolver_id_curso(id_curso)
+            return self.cursos.carrera(id_nodo) if id_nodo else None
+    
+    def _exportar_nodo(self, id_curso: str, id_visible: str, carrera: str) -> Dict:
+        nodo = {
+            "id": id_visible,
+            "label": self.cursos.nombre(id_curso),
+            "nivel": self.cursos.nivel(id_curso),
+            "creditos": self.cursos.creditos(id_curso),
+            "carrera": carrera
+        }
+        creditos_generales_requeridos = self.cursos.creditos_generales_requeridos(id_curso)
+        if creditos_generales_requeridos:
+            nodo["creditos_generales_requeridos"] = max(creditos_generales_requeridos)
+        return nodo
+    
+    @staticmethod
+    def _exportar_arista(codigo_u: str, codigo_v: str, edge_data: Dict) -> Dict:
+        arista = {
+            "source": codigo_u,
+            "target": codigo_v
+        }
+        if edge_data.get("tipo") == "COURSE_CRED" and "creditos_requeridos" in edge_data:
+            arista["tipo"] = "COURSE_CRED"
+            arista["creditos_requeridos"] = edge_data["creditos_requeridos"]
+        elif edge_data.get("tipo") == "COURSE":
+            arista["tipo"] = "COURSE"
+        return arista
+    
+    def exportar_grafo(self, carrera: Optional[str] = None) -> Dict:
+        # Grafo para el frontend: con carrera, sus cursos y las aristas internas;
+        # sin carrera, un nodo por código y aristas sin repetir entre códigos
+        if carrera and carrera.strip():
+            ids_carrera = self._nodos_por_carrera.get(self._normalizar_carrera(carrera), [])
+            en_carrera = set(ids_carrera)
+            nodos = [
+                self._exportar_nodo(n, self._extraer_codigo(n), self.cursos.carrera(n))
+                for n in ids_carrera
+            ]
+            aristas = [
+                self._exportar_arista(self._extraer_codigo(u), self._extraer_codigo(v), edge_data)
+                for u in ids_carrera
+                for v, edge_data in self.cursos.salientes(u)
+                if v in en_carrera
+            ]
+        else:
+            nodos_por_codigo = {}
+            for n in self.cursos:
+                codigo = self._extraer_codigo(n)
+                if codigo not in nodos_por_codigo:
+                    nodos_por_codigo[codigo] = self._exportar_nodo(n, codigo, "")
+            nodos = list(nodos_por_codigo.values())
+            
+            aristas_dict = {}
+            for u, v, edge_data in self.cursos.aristas():
+                key = (self._extraer_codigo(u), self._extraer_codigo(v))
+                if key[0] != key[1] and key not in aristas_dict:
+                    aristas_dict[key] = self._exportar_arista(key[0], key[1], edge_data)
+            aristas = list(aristas_dict.values())
+        
+        return {
+            "nodes": nodos,
+            "edges": aristas,
+            "total_nodes": len(nodos),
+            "total_edges": len(aristas),
+            "carrera_filtro": carrera if carrera else None
+        }
     
     def cumple_requisitos(self, id_curso_objetivo: str, aprobados_dict: Dict, total_creditos: float) -> bool:
-        info = self.get_info_curso(id_curso_objetivo)
-        if not info:
+        ubicacion = self._ubicar_curso(id_curso_objetivo)
+        if ubicacion is None:
             return False
         
-        carrera_objetivo = info.get("carrera", "")
-        reqs = info["reqs"]
-        if not reqs or len(reqs) == 0:
-            return True
-        
-        for r in reqs:
-            tipo = r[0]
-            if tipo == "COURSE":
-                curso_req_codigo = r[1] if len(r) > 1 else None
-                if curso_req_codigo:
-                    id_prereq = self._crear_id_curso(curso_req_codigo, carrera_objetivo)
-                    if id_prereq not in aprobados_dict:
-                        return False
-            elif tipo == "CRED":
-                cred_req = r[1] if len(r) > 1 else 0
-                if total_creditos < cred_req:
-                    return False
-            elif tipo == "COURSE_CRED":
-                curso_req_codigo = r[1] if len(r) > 1 else None
-                if curso_req_codigo:
-                    id_prereq = self._crear_id_curso(curso_req_codigo, carrera_objetivo)
-                    if id_prereq not in aprobados_dict:
-                        return False
-        
-        return True
+        particion, i = ubicacion
+        req = particion.requisitos[i]
+        if total_creditos < req.creditos_minimos:
+            return False
+        return all(particion.nodos[j] in aprobados_dict for j in req.indices) and \
+            all(id_prereq in aprobados_dict for id_prereq in req.externos) and \
+            cumple_alternativas(req, lambda id_prereq, _: id_prereq in aprobados_dict, total_creditos)
     
     def generar_planificacion(self, historial_alumno: List[str], max_creditos: float, 
-                             carrera_filtro: Optional[str] = None) -> Tuple[List[Dict], List[Dict]]:
+                             carrera_filtro: Optional[str] = None, 
+                             modo_seleccion: str = "voraz") -> Tuple[List[Dict], List[Dict]]:
+        # El orden del historial no cambia el resultado; los repetidos sí (suman créditos)
+        huella = hashlib.sha1("\x1f".join(sorted(historial_alumno)).encode("utf-8")).hexdigest()
+        clave = (self.version_catalogo, carrera_filtro, huella, float(max_creditos), modo_seleccion)
+        en_cache = self._cache_planificacion.obtener(clave)
+        if en_cache is not None:
+            candidatos, seleccionados = en_cache
+            print(f"📊 Planificación (cache): {len(candidatos)} candidatos, {len(seleccionados)} seleccionados, carrera_filtro={carrera_filtro}")
+            return candidatos, seleccionados
+        
         aprobados_dict, total_creditos = self._procesar_historial(historial_alumno, carrera_filtro)
         candidatos = self._obtener_candidatos(aprobados_dict, total_creditos, carrera_filtro)
-        seleccionados = self._seleccionar_optimos(candidatos, max_creditos)
+        seleccionados = self._seleccionar_optimos(candidatos, max_creditos, modo_seleccion)
+        self._cache_planificacion.guardar(clave, (candidatos, seleccionados))
         
-        print(f"📊 Planificación: {len(candidatos)} candidatos, {len(seleccionados)} seleccionados, carrera_filtro={carrera_filtro}")
+        print(f"📊 Planificación: {len(candidatos)} candidatos, {len(seleccionados)} seleccionados, carrera_filtro={carrera_filtro}, modo={modo_seleccion}")
         
         return candidatos, seleccionados
     
     def _procesar_historial(self, historial: List[str], carrera_filtro: Optional[str] = None) -> Tuple[Dict, float]:
         aprobados_dict = {}
         total_creditos = 0.0
+        if carrera_filtro:
+            self._obtener_particion(carrera_filtro)
         
         for cod in historial:
             if carrera_filtro:
                 id_curso = self._crear_id_curso(cod, carrera_filtro)
-                info = self.get_info_curso(id_curso, carrera_filtro)
+                ubicacion = self._ubicaciones.get(id_curso)
+                info = ubicacion[0].metadata[id_curso] if ubicacion else None
             else:
                 info = self.get_info_curso(cod)
             
@@ -338,49 +1065,23 @@ class MotorAcademico:
             print(f"⚠️  No se proporcionó carrera para filtrar")
             return candidatos
         
-        carrera_filtro_clean = carrera_filtro.strip().lower()
-        total_cursos = len(self.graph.nodes)
-        cursos_filtrados_carrera = 0
+        particion = self._obtener_particion(carrera_filtro)
+        nodos_carrera = particion.nodos if particion else ()
+        total_cursos = len(self.cursos)
+        cursos_filtrados_carrera = len(nodos_carrera)
         cursos_excluidos_aprobados = 0
         cursos_excluidos_requisitos = 0
-        carreras_encontradas = set()
         
         print(f"🔍 Filtrando cursos por carrera: '{carrera_filtro}' (total nodos: {total_cursos})")
         
-        for curso in self.graph.nodes:
-            carrera_curso = self.get_carrera_curso(curso)
-            if carrera_curso:
-                carreras_encontradas.add(carrera_curso.strip())
-            carrera_curso_clean = carrera_curso.strip().lower() if carrera_curso else ""
-            
-            if not carrera_curso_clean or carrera_curso_clean != carrera_filtro_clean:
-                continue
-            
-            cursos_filtrados_carrera += 1
-            
-            if curso in aprobados_dict:
-                cursos_excluidos_aprobados += 1
-                continue
-            
-            if self.cumple_requisitos(curso, aprobados_dict, total_creditos):
-                info = self.get_info_curso(curso)
-                if not info:
-                    cursos_excluidos_requisitos += 1
-                    continue
-                    
-                impacto = len(nx.descendants(self.graph, curso))
-                
-                codigo_simple = self._extraer_codigo(curso)
-                candidatos.append({
-                    "id": codigo_simple,
-                    "nombre": info["nombre"],
-                    "creditos": info["creditos"],
-                    "nivel": info["nivel"],
-                    "carrera": info.get("carrera", ""),
-                    "impacto": impacto
-                })
-            else:
-                cursos_excluidos_requisitos += 1
+        if particion is not None:
+            aprobados = self._vector_aprobados(particion, aprobados_dict)
+            elegibles = self._evaluar_elegibles(
+                particion, aprobados[None, :], [aprobados_dict], np.array([total_creditos])
+            )[0]
+            candidatos = self._armar_candidatos(particion, elegibles)
+            cursos_excluidos_aprobados = int(aprobados.sum())
+            cursos_excluidos_requisitos = cursos_filtrados_carrera - cursos_excluidos_aprobados - len(candidatos)
         
         disponibles = cursos_filtrados_carrera - cursos_excluidos_aprobados
         
@@ -395,14 +1096,75 @@ class MotorAcademico:
             print(f"⚠️  Advertencia: Solo {len(candidatos)} de {disponibles} cursos disponibles cumplen requisitos")
         
         if cursos_filtrados_carrera == 0:
+            carreras_encontradas = {
+                self.cursos.carrera(ids[0]).strip() for ids in self._nodos_por_carrera.values() if ids
+            } - {""}
             print(f"⚠️  No se encontraron cursos para la carrera '{carrera_filtro}'")
             print(f"   Carreras disponibles (primeras 10): {sorted(list(carreras_encontradas))[:10]}")
             print(f"   Total carreras distintas: {len(carreras_encontradas)}")
         
-        candidatos.sort(key=lambda x: x["impacto"], reverse=True)
         return candidatos
     
-    def _seleccionar_optimos(self, candidatos: List[Dict], max_creditos: float) -> List[Dict]:
+    @staticmethod
+    def _armar_candidatos(particion: ParticionCarrera, elegibles: np.ndarray) -> List[Dict]:
+        orden = particion.orden_impacto[elegibles[particion.orden_impacto]]
+        return [
+            {**particion.metadata[particion.nodos[i]], "impacto": particion.impacto[i]}
+            for i in orden.tolist()
+        ]
+    
+    def generar_planificacion_lote(self, estudiantes: Iterable[Tuple[List[str], float, Optional[str], str]], 
+                                   tamano_bloque: int = 1000) -> Iterator[Tuple[float, List[Dict], List[Dict]]]:
+        # Recibe (historial, max_creditos, carrera, modo_seleccion) y devuelve
+        # (créditos aprobados, candidatos, seleccionados) por estudiante, en el
+        # mismo orden de entrada; se procesa por bloques para que la memoria no crezca.
+        iterador = iter(estudiantes)
+        total_estudiantes = 0
+        
+        while True:
+            bloque = list(itertools.islice(iterador, tamano_bloque))
+            if not bloque:
+                break
+            yield from self._planificar_bloque(bloque)
+            total_estudiantes += len(bloque)
+        
+        print(f"📊 Planificación por lote: {total_estudiantes} estudiantes")
+    
+    def _planificar_bloque(self, bloque: List[Tuple[List[str], float, Optional[str], str]]) -> List[Tuple[float, List[Dict], List[Dict]]]:
+        historiales = [self._procesar_historial(historial, carrera) for historial, _, carrera, _ in bloque]
+        
+        grupos: Dict[str, List[int]] = {}
+        for pos, (_, _, carrera, _) in enumerate(bloque):
+            grupos.setdefault(self._normalizar_carrera(carrera), []).append(pos)
+        
+        resultados = [None] * len(bloque)
+        for carrera_clean, posiciones in grupos.items():
+            particion = self._obtener_particion(carrera_clean) if carrera_clean else None
+            if particion is None:
+                for pos in posiciones:
+                    resultados[pos] = (historiales[pos][1], [], [])
+                continue
+            
+            aprobados = np.zeros((len(posiciones), len(particion.nodos)), dtype=bool)
+            for fila, pos in enumerate(posiciones):
+                aprobados[fila] = self._vector_aprobados(particion, historiales[pos][0])
+            aprobados_dicts = [historiales[pos][0] for pos in posiciones]
+            totales = np.array([historiales[pos][1] for pos in posiciones], dtype=np.float64)
+            
+            elegibles = self._evaluar_elegibles(particion, aprobados, aprobados_dicts, totales)
+            for fila, pos in enumerate(posiciones):
+                candidatos = self._armar_candidatos(particion, elegibles[fila])
+                _, max_creditos, _, modo_seleccion = bloque[pos]
+                seleccionados = self._seleccionar_optimos(candidatos, max_creditos, modo_seleccion)
+                resultados[pos] = (historiales[pos][1], candidatos, seleccionados)
+        
+        return resultados
+    
+    def _seleccionar_optimos(self, candidatos: List[Dict], max_creditos: float, 
+                             modo_seleccion: str = "voraz") -> List[Dict]:
+        if modo_seleccion == "optimo":
+            return self._seleccionar_optimos_mochila(candidatos, max_creditos)
+        
         seleccionados = []
         carga_actual = 0.0
         
@@ -412,4 +1174,83 @@ class MotorAcademico:
                 carga_actual += cand["creditos"]
         
         return seleccionados
-
+    
+    @staticmethod
+    def _seleccionar_optimos_mochila(candidatos: List[Dict], max_creditos: float) -> List[Dict]:
+        # Mochila 0/1 exacta: maximiza el impacto total y, a igual impacto, los créditos
+        # usados. Los créditos son enteros pequeños, así que cuesta O(candidatos x max_creditos).
+        escala = 1 if all(float(c["creditos"]).is_integer() for c in candidatos) else 10
+        limite = max_creditos * escala + 1e-9
+        if math.isnan(limite):
+            return []
+        
+        pesos = [int(round(c["creditos"] * escala)) for c in candidatos]
+        # una capacidad mayor que el peso total nunca se usa: así la tabla no
+        # crece con max_creditos (que puede ser enorme o infinito)
+        total_pesos = sum(pesos)
+        capacidad = total_pesos if limite >= total_pesos else int(limite)
+        if capacidad < 0:
+            return []
+        mejor = np.zeros(capacidad + 1, dtype=np.int64)
+        tomado = np.zeros((len(candidatos), capacidad + 1), dtype=bool)
+        
+        for k, (cand, peso) in enumerate(zip(candidatos, pesos)):
+            if peso == 0 or peso > capacidad:
+                continue
+            valor = cand["impacto"] * (capacidad + 1) + peso
+            con_curso = mejor[:capacidad + 1 - peso] + valor
+            mejora = con_curso > mejor[peso:]
+            tomado[k, peso:] = mejora
+            mejor[peso:] = np.where(mejora, con_curso, mejor[peso:])
+        
+        elegidos = set()
+        restante = capacidad
+        for k in range(len(candidatos) - 1, -1, -1):
+            if pesos[k] == 0:
+                elegidos.add(k)
+            elif tomado[k, restante]:
+                elegidos.add(k)
+                restante -= pesos[k]
+        
+        return [cand for k, cand in enumerate(candidatos) if k in elegidos]
+    
+    def generar_roadmap(self, historial_alumno: List[str], max_creditos: float, carrera: str, 
+                        presupuesto_segundos: float = 0.5) -> Dict:
+        aprobados_dict, total_creditos = self._procesar_historial(historial_alumno, carrera)
+        particion = self._obtener_particion(carrera)
+        resultado = {
+            "resumen_creditos_aprobados": total_creditos,
+            "carrera_filtro": carrera,
+            "total_semestres": 0,
+            "optimo": True,
+            "semestres": [],
+            "cursos_no_alcanzables": []
+        }
+        if particion is None:
+            print(f"⚠️  No se encontraron cursos para la carrera '{carrera}'")
+            return resultado
+        
+        planificador = PlanificadorRoadmap(
+            particion, aprobados_dict, total_creditos, max_creditos, presupuesto_segundos, self.MAX_ESTADOS_ROADMAP
+        )
+        mejor = planificador.planificar()
+        
+        for numero, semestre in enumerate(mejor, start=1):
+            resultado["semestres"].append({
+                "semestre": numero,
+                "creditos": sum(planificador.creditos[i] for i in semestre),
+                "cursos": [
+                    {**particion.metadata[particion.nodos[i]], "impacto": particion.impacto[i]}
+                    for i in semestre
+                ]
+            })
+        resultado["total_semestres"] = len(mejor)
+        resultado["optimo"] = planificador.optimo
+        resultado["cursos_no_alcanzables"] = [
+            particion.metadata[id_curso] for i, id_curso in enumerate(particion.nodos)
+            if not planificador.alcanzables >> i & 1
+        ]
+        
+        print(f"🗺️  Roadmap: {len(mejor)} semestres, óptimo={planificador.optimo}, "
+              f"estados visitados={len(planificador.visitados)}, carrera={carrera}")
+        return resultado
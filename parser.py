@@ -1,34 +1,90 @@
 import re
-from typing import List, Tuple, Union
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
 
+# Expresión de requisitos como tuplas anidadas:
+#   hojas: ("COURSE", codigo) | ("COURSE_CRED", codigo, creditos) | ("CRED", creditos)
+#   nodos: ("AND", hijos) | ("OR", hijos)
+# "," ";" e "y" separan requisitos que se exigen todos; "o" y "/" separan
+# alternativas y ligan más fuerte: "MA101 o MA102, FI101" = (MA101 o MA102) y FI101.
+# Por eso la raíz es siempre un AND cuyos hijos son hojas u OR de hojas.
+Y = "AND"
+O = "OR"
+Expresion = Tuple
+SIN_REQUISITOS: Expresion = (Y, ())
 
-def parse_requisitos(req_str: str) -> List[Tuple[str, ...]]:
-    s = str(req_str).strip()
+# "y"/"o" sueltos al inicio o al final ("MA101 o") también separan, para no
+# perder el curso que queda pegado a ellos
+_SEPARADOR_Y = re.compile(r'[,;]|(?:^|\s+)y(?:\s+|$)', re.IGNORECASE)
+_SEPARADOR_O = re.compile(r'/|(?:^|\s+)o(?:\s+|$)', re.IGNORECASE)
+_CURSO_CREDITOS = re.compile(r'([A-Z]{2,}\d{2,})\s*:\s*(\d+)')
+_CREDITOS = re.compile(r'(\d+)\s*(CRED|CREDITOS?)')
+_CURSO = re.compile(r'[A-Z]{2,}\d{2,}')
+
+
+def _parse_hoja(token: str) -> Optional[Tuple]:
+    U = token.strip().upper()
+    if not U:
+        return None
+
+    m_cc = _CURSO_CREDITOS.fullmatch(U)
+    if m_cc:
+        return ("COURSE_CRED", m_cc.group(1), int(m_cc.group(2)))
+
+    m_cr = _CREDITOS.search(U)
+    if m_cr:
+        return ("CRED", int(m_cr.group(1)))
+
+    if _CURSO.fullmatch(U):
+        return ("COURSE", U)
+    return None
+
+
+@lru_cache(maxsize=32768)
+def _parse_expresion(s: str) -> Expresion:
     if not s or s == "nan":
-        return []
-    
-    parts = re.split(r'(?:,|;|/|\s+y\s+|\s+o\s+)', s, flags=re.IGNORECASE)
-    parsed = []
-    
-    for t in parts:
-        t = t.strip()
-        if not t:
-            continue
-        
-        U = t.upper()
-        
-        m_cc = re.fullmatch(r'([A-Z]{2,}\d{2,})\s*:\s*(\d+)', U)
-        if m_cc:
-            parsed.append(("COURSE_CRED", m_cc.group(1), int(m_cc.group(2))))
-            continue
-        
-        m_cr = re.search(r'(\d+)\s*(CRED|CREDITOS?)', U)
-        if m_cr:
-            parsed.append(("CRED", int(m_cr.group(1))))
-            continue
-        
-        if re.fullmatch(r'[A-Z]{2,}\d{2,}', U):
-            parsed.append(("COURSE", U))
-    
-    return parsed
+        return SIN_REQUISITOS
+
+    hijos = []
+    for parte in _SEPARADOR_Y.split(s):
+        alternativas = tuple(h for h in map(_parse_hoja, _SEPARADOR_O.split(parte)) if h is not None)
+        # si solo se entiende una alternativa, esa es la que se exige
+        if len(alternativas) == 1:
+            hijos.append(alternativas[0])
+        elif alternativas:
+            hijos.append((O, alternativas))
+    return (Y, tuple(hijos))
+
+
+def parse_expresion_requisitos(req_str: str) -> Expresion:
+    # Muchas carreras repiten el mismo texto de requisitos: se parsea una vez
+    return _parse_expresion(str(req_str).strip())
+
+
+@lru_cache(maxsize=32768)
+def hojas_requisitos(expresion: Expresion) -> Tuple[Tuple, ...]:
+    if expresion[0] in (Y, O):
+        return tuple(hoja for hijo in expresion[1] for hoja in hojas_requisitos(hijo))
+    return (expresion,)
+
+
+def parse_requisitos(req_str: str) -> List[Tuple[str, ...]]:
+    # Lista plana de requisitos, sin distinguir alternativas
+    return list(hojas_requisitos(parse_expresion_requisitos(req_str)))
+
+
+def expresion_desde_listas(valor) -> Expresion:
+    # Inversa de serializar la expresión a JSON (las tuplas vuelven como listas)
+    if valor[0] in (Y, O):
+        return (valor[0], tuple(expresion_desde_listas(hijo) for hijo in valor[1]))
+    return tuple(valor)
+
 
+def evaluar_requisitos(expresion: Expresion, cumple_hoja: Callable[[Tuple], bool]) -> bool:
+    # Corta en cuanto el resultado está decidido
+    operador = expresion[0]
+    if operador == Y:
+        return all(evaluar_requisitos(hijo, cumple_hoja) for hijo in expresion[1])
+    if operador == O:
+        return any(evaluar_requisitos(hijo, cumple_hoja) for hijo in expresion[1])
+    return cumple_hoja(expresion)
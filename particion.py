@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, NamedTuple, Tuple
+import numpy as np
+from parser import Expresion, evaluar_requisitos
+
+
+class RequisitoCompilado(NamedTuple):
+    # índices (dentro de la partición) de los cursos requeridos y su máscara de bits
+    indices: Tuple[int, ...]
+    mascara: int
+    # ids de cursos requeridos que no existen en la malla; solo se cumplen si
+    # aparecen tal cual en el historial
+    externos: Tuple[str, ...]
+    creditos_minimos: float
+    # requisitos con alternativas ("A o B"): cada uno es un OR cuyas hojas son
+    # ("COURSE", id, índice en la partición o None) o ("CRED", créditos)
+    alternativas: Tuple[Expresion, ...]
+
+
+@dataclass(frozen=True)
+class ParticionCarrera:
+    carrera: str
+    nodos: Tuple[str, ...]
+    # id del nodo -> datos del curso tal como se devuelven en la planificación
+    metadata: Dict[str, Dict]
+    indices: Dict[str, int]
+    # bitset de descendientes por nodo (bit i = nodos[i]) y su conteo ("impacto")
+    descendientes: Tuple[int, ...]
+    impacto: Tuple[int, ...]
+    requisitos: Tuple[RequisitoCompilado, ...]
+    # fila i = bits empaquetados (np.packbits) de los requisitos de nodos[i]
+    matriz_requisitos: np.ndarray
+    creditos_minimos: np.ndarray
+    con_externos: Tuple[int, ...]
+    con_alternativas: Tuple[int, ...]
+    # índices ordenados por impacto descendente; a igual impacto, por nivel y por
+    # id, para no depender del orden en que se cargaron los cursos
+    orden_impacto: np.ndarray
+    # orden topológico de los requisitos (sin los cursos con requisitos cíclicos) y
+    # largo de la cadena más larga de cursos que depende de cada nodo
+    orden_topologico: Tuple[int, ...]
+    alturas: Tuple[int, ...]
+    dependientes: Tuple[Tuple[int, ...], ...]
+
+
+def cumple_alternativas(req: RequisitoCompilado, curso_aprobado: Callable[[str, Optional[int]], bool],
+                        total_creditos: float) -> bool:
+    def cumple_hoja(hoja: Tuple) -> bool:
+        if hoja[0] == "CRED":
+            return total_creditos >= hoja[1]
+        return curso_aprobado(hoja[1], hoja[2])
+    return all(evaluar_requisitos(alternativa, cumple_hoja) for alternativa in req.alternativas)
@@ -0,0 +1,89 @@
+import gzip
+import hashlib
+import json
+from typing import Dict, Optional, Set
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# por debajo de esto comprimir no compensa
+MIN_BYTES_COMPRESION = 1024
+
+
+def _a_nativo(valor):
+    # orjson no acepta subclases de float (p. ej. valores sueltos de numpy)
+    if isinstance(valor, float):
+        return float(valor)
+    if hasattr(valor, "item"):
+        return valor.item()
+    raise TypeError(f"Tipo no serializable a JSON: {type(valor).__name__}")
+
+
+def codificar_json(datos) -> bytes:
+    # mismo JSON compacto y UTF-8 que la respuesta por defecto de FastAPI
+    if orjson is not None:
+        return orjson.dumps(datos, default=_a_nativo, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(datos, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class RespuestaJSON(JSONResponse):
+    """JSONResponse que no pasa por jsonable_encoder y codifica con orjson si está instalado"""
+
+    def render(self, content) -> bytes:
+        return codificar_json(content)
+
+
+class CargaCodificada:
+    """JSON serializado una sola vez, con su ETag y sus variantes comprimidas"""
+
+    __slots__ = ("cuerpo", "etag", "variantes")
+
+    def __init__(self, datos):
+        self.cuerpo = codificar_json(datos)
+        self.etag = f'"{hashlib.sha1(self.cuerpo).hexdigest()}"'
+        self.variantes: Dict[str, bytes] = {}
+        if len(self.cuerpo) >= MIN_BYTES_COMPRESION:
+            self.variantes["gzip"] = gzip.compress(self.cuerpo, compresslevel=6)
+            if brotli is not None:
+                self.variantes["br"] = brotli.compress(self.cuerpo, quality=5)
+
+
+def _codificaciones_aceptadas(accept_encoding: Optional[str]) -> Set[str]:
+    aceptadas = set()
+    for parte in (accept_encoding or "").split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = parametros.strip()
+        if calidad.startswith("q=") and calidad[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        if nombre:
+            aceptadas.add(nombre.strip().lower())
+    return aceptadas
+
+
+def _etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidatos = [e.strip() for e in if_none_match.split(",")]
+    return "*" in candidatos or any(e.removeprefix("W/") == etag for e in candidatos)
+
+
+def responder_carga(request: Request, carga: CargaCodificada, cabeceras: Optional[Dict[str, str]] = None) -> Response:
+    headers = {"ETag": carga.etag, "Vary": "Accept-Encoding", **(cabeceras or {})}
+    if _etag_coincide(request.headers.get("if-none-match"), carga.etag):
+        return Response(status_code=304, headers=headers)
+
+    aceptadas = _codificaciones_aceptadas(request.headers.get("accept-encoding"))
+    for codificacion in ("br", "gzip"):
+        if codificacion in carga.variantes and codificacion in aceptadas:
+            headers["Content-Encoding"] = codificacion
+            return Response(content=carga.variantes[codificacion], media_type="application/json", headers=headers)
+    return Response(content=carga.cuerpo, media_type="application/json", headers=headers)
@@ -0,0 +1,178 @@
+import math
+import time
+from typing import Dict, Iterator, List, Optional
+from particion import ParticionCarrera, cumple_alternativas
+
+
+class PlanificadorRoadmap:
+    """Plan de semestres con el mínimo número de semestres para aprobar todo lo
+    alcanzable de una partición, con un tope de créditos por semestre.
+
+    Parte de una solución voraz y la mejora con ramificación y poda (cota por
+    ruta crítica y estados ya visitados) hasta agotar `presupuesto_segundos`;
+    si el tiempo se agota devuelve lo mejor encontrado y `optimo` queda en False.
+    Los cursos se manejan como índices de la partición y los conjuntos como
+    máscaras de bits.
+    """
+
+    def __init__(self, particion: ParticionCarrera, aprobados_dict: Dict, total_creditos: float,
+                 max_creditos: float, presupuesto_segundos: float, max_estados: int):
+        self.particion = particion
+        self.aprobados_dict = aprobados_dict
+        self.total_creditos = total_creditos
+        self.max_creditos = max_creditos
+        self.presupuesto_segundos = presupuesto_segundos
+        self.max_estados = max_estados
+
+        self.creditos = [particion.metadata[id_curso]["creditos"] for id_curso in particion.nodos]
+        self.aprobados = sum(1 << particion.indices[id_curso] for id_curso in aprobados_dict if id_curso in particion.indices)
+        self.bloqueados = 0
+        for i in particion.con_externos:
+            if not all(id_prereq in aprobados_dict for id_prereq in particion.requisitos[i].externos):
+                self.bloqueados |= 1 << i
+        for i, cr in enumerate(self.creditos):
+            if cr > max_creditos:
+                self.bloqueados |= 1 << i
+
+        # Cursos alcanzables: se aprueba todo lo elegible, sin tope de créditos, hasta
+        # que no cambie nada. Lo que queda fuera nunca se podrá llevar.
+        self.alcanzables, creditos_cierre = self.aprobados, total_creditos
+        while True:
+            nuevos = self.elegibles(self.alcanzables, creditos_cierre)
+            if not nuevos:
+                break
+            for i in nuevos:
+                self.alcanzables |= 1 << i
+                creditos_cierre += self.creditos[i]
+        self.objetivo = self.alcanzables & ~self.aprobados
+
+        # Prioridad al expandir: cadena crítica más larga y luego impacto
+        rango_impacto = {int(i): r for r, i in enumerate(particion.orden_impacto)}
+        prioridad = sorted(range(len(self.creditos)), key=lambda i: (-particion.alturas[i], rango_impacto[i]))
+        self.posicion = {i: p for p, i in enumerate(prioridad)}
+
+        self.mejor: List[List[int]] = []
+        self.visitados: Dict[int, int] = {}
+        self.agotado = False
+        self.limite = 0.0
+
+    def elegibles(self, mascara: int, creditos_actuales: float) -> List[int]:
+        def curso_aprobado(id_prereq: str, j: Optional[int]) -> bool:
+            return bool(mascara >> j & 1) if j is not None else id_prereq in self.aprobados_dict
+        return [
+            i for i, req in enumerate(self.particion.requisitos)
+            if not (mascara | self.bloqueados) >> i & 1
+            and req.mascara & ~mascara == 0
+            and req.creditos_minimos <= creditos_actuales
+            and (not req.alternativas or cumple_alternativas(req, curso_aprobado, creditos_actuales))
+        ]
+
+    def cota_inferior(self, mascara: int, creditos_actuales: float) -> int:
+        # Ruta crítica con tope de créditos: los cursos que están a k o más pasos del
+        # final (o del inicio) de su cadena ocupan al menos k - 1 semestres extra.
+        restantes = self.objetivo & ~mascara
+        if not restantes:
+            return 0
+        particion = self.particion
+        desde_inicio, hasta_final = {}, {}
+        for i in particion.orden_topologico:
+            if restantes >> i & 1:
+                req = particion.requisitos[i]
+                faltan_creditos = req.creditos_minimos - creditos_actuales
+                espera = 1 + math.ceil(faltan_creditos / self.max_creditos - 1e-9) if faltan_creditos > 0 else 1
+                desde_inicio[i] = max(
+                    espera, 1 + max((desde_inicio[j] for j in req.indices if j in desde_inicio), default=0)
+                )
+        for i in reversed(particion.orden_topologico):
+            if i in desde_inicio:
+                hasta_final[i] = 1 + max((hasta_final[d] for d in particion.dependientes[i] if d in hasta_final), default=0)
+
+        cota = 1
+        for pasos in (desde_inicio, hasta_final):
+            creditos_por_nivel = {}
+            for i, k in pasos.items():
+                creditos_por_nivel[k] = creditos_por_nivel.get(k, 0) + self.creditos[i]
+            acumulado = 0
+            for k in sorted(creditos_por_nivel, reverse=True):
+                acumulado += creditos_por_nivel[k]
+                cota = max(cota, k - 1 + math.ceil(acumulado / self.max_creditos - 1e-9))
+        return cota
+
+    def _sin_tiempo(self) -> bool:
+        if self.agotado or time.perf_counter() > self.limite:
+            self.agotado = True
+        return self.agotado
+
+    def combinaciones_maximas(self, candidatos: List[int]) -> Iterator[List[int]]:
+        # Solo conviene llevar conjuntos maximales: aprobar más cursos nunca
+        # vuelve inelegible a otro, así que agregar uno que entra no empeora el plan.
+        creditos, max_creditos = self.creditos, self.max_creditos
+
+        def expandir(k: int, elegidos: List[int], carga: float):
+            if self._sin_tiempo():
+                return
+            if k == len(candidatos):
+                if all(carga + creditos[i] > max_creditos for i in candidatos if i not in elegidos):
+                    yield list(elegidos)
+                return
+            i = candidatos[k]
+            if carga + creditos[i] <= max_creditos:
+                elegidos.append(i)
+                yield from expandir(k + 1, elegidos, carga + creditos[i])
+                elegidos.pop()
+            yield from expandir(k + 1, elegidos, carga)
+        yield from expandir(0, [], 0.0)
+
+    def plan_voraz(self) -> List[List[int]]:
+        # Cada semestre toma los elegibles en orden de prioridad mientras quepan
+        plan, mascara, creditos_actuales = [], self.aprobados, self.total_creditos
+        while self.objetivo & ~mascara:
+            semestre, carga = [], 0.0
+            for i in sorted(self.elegibles(mascara, creditos_actuales), key=self.posicion.get):
+                if self.objetivo >> i & 1 and carga + self.creditos[i] <= self.max_creditos:
+                    semestre.append(i)
+                    carga += self.creditos[i]
+            plan.append(semestre)
+            mascara |= sum(1 << i for i in semestre)
+            creditos_actuales += carga
+        return plan
+
+    def _buscar(self, mascara: int, creditos_actuales: float, plan: List[List[int]]):
+        if self._sin_tiempo():
+            return
+        if not self.objetivo & ~mascara:
+            if len(plan) < len(self.mejor):
+                self.mejor = [list(semestre) for semestre in plan]
+            return
+        if len(plan) + self.cota_inferior(mascara, creditos_actuales) >= len(self.mejor):
+            return
+        # el estado (aprobados, créditos) queda definido por la máscara
+        if self.visitados.get(mascara, len(plan) + 1) <= len(plan):
+            return
+        if len(self.visitados) < self.max_estados:
+            self.visitados[mascara] = len(plan)
+
+        candidatos = sorted(
+            (i for i in self.elegibles(mascara, creditos_actuales) if self.objetivo >> i & 1), key=self.posicion.get
+        )
+        for semestre in self.combinaciones_maximas(candidatos):
+            plan.append(semestre)
+            self._buscar(
+                mascara | sum(1 << i for i in semestre), creditos_actuales + sum(self.creditos[i] for i in semestre), plan
+            )
+            plan.pop()
+            if self.agotado:
+                return
+
+    def planificar(self) -> List[List[int]]:
+        """Semestres del mejor plan encontrado, como listas de índices de la partición"""
+        self.limite = time.perf_counter() + self.presupuesto_segundos
+        # la solución voraz da la cota superior y es la respuesta si se agota el tiempo
+        self.mejor = self.plan_voraz()
+        if len(self.mejor) > self.cota_inferior(self.aprobados, self.total_creditos):
+            self._buscar(self.aprobados, self.total_creditos, [])
+        return self.mejor
+
+    @property
+    def optimo(self) -> bool:
+        return not self.agotado
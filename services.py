@@ -1,17 +1,92 @@
-from typing import List, Optional, Dict
+import time
+from typing import Iterable, List, Optional, Dict, Tuple
 from datetime import datetime
 from fastapi import HTTPException
 from database import get_supabase
 from models import UsuarioCreate, UsuarioUpdate, HistorialUpdate
+from unidad_trabajo import Consulta, en_unidad_trabajo, unidad_actual
+
+COLUMNAS_HISTORIAL = "curso_codigo, carrera, aprobado_en"
+# Supabase acepta varios valores en .in_(); más allá de esto se parte la consulta
+LOTE_CODIGOS = 100
+# filas por página al reconciliar los créditos de todos los usuarios
+PAGINA_RECONCILIACION = 1000
+# intentos de ajustar creditos_totales si otro cambio lo modificó entre medio
+INTENTOS_AJUSTE_CREDITOS = 3
 
 
 class UsuarioService:
+    # Lecturas como (clave, consulta) para la unidad de trabajo; la misma clave
+    # en una operación se lee una sola vez
+    @staticmethod
+    def _lectura_usuario(user_id: str) -> Tuple[Tuple, Consulta]:
+        return ("usuarios", user_id), lambda s: s.table("usuarios").select("*").eq("id", user_id).execute()
+    
+    @staticmethod
+    def _lectura_perfil(user_id: str) -> Tuple[Tuple, Consulta]:
+        return ("usuarios", "perfil", user_id), lambda s: s.rpc("get_user_profile", {"p_user_id": user_id}).execute()
+    
+    @staticmethod
+    def _lectura_historial(user_id: str) -> Tuple[Tuple, Consulta]:
+        return ("historial_aprobados", user_id), lambda s: s.table("historial_aprobados").select(
+            COLUMNAS_HISTORIAL
+        ).eq("usuario_id", user_id).execute()
+    
+    @staticmethod
+    def _leer_historial_items(user_id: str) -> List[Dict]:
+        return unidad_actual().leer(*UsuarioService._lectura_historial(user_id)).data or []
+    
+    @staticmethod
+    def _leer_cursos(codigos: Iterable[str]) -> Dict[Tuple[str, str], Dict]:
+        """Cursos de esos códigos en todas las carreras, por (codigo, carrera); los lotes van en paralelo"""
+        codigos = sorted(set(codigos))
+        lecturas = [
+            (("cursos", "codigos", tuple(lote)),
+             lambda s, lote=lote: s.table("cursos").select("codigo, nombre, carrera, creditos, nivel").in_("codigo", lote).execute())
+            for lote in (codigos[i:i + LOTE_CODIGOS] for i in range(0, len(codigos), LOTE_CODIGOS))
+        ]
+        return {
+            (curso["codigo"], curso["carrera"]): curso
+            for response in unidad_actual().leer_varias(lecturas)
+            for curso in (response.data or [])
+        }
+    
+    @staticmethod
+    def _creditos_por_curso(claves: Iterable[Tuple[str, str]], motor=None) -> Dict[Tuple[str, str], float]:
+        """Créditos por (codigo, carrera): del motor en memoria y, lo que no tenga, de la BD.
+        Los cursos que no existen no aparecen."""
+        creditos = {}
+        faltantes = set()
+        for codigo, carrera in set(claves):
+            info = motor.get_info_curso(codigo, carrera) if motor is not None else None
+            if info is not None:
+                creditos[(codigo, carrera)] = float(info["creditos"])
+            else:
+                faltantes.add((codigo, carrera))
+        
+        if faltantes:
+            cursos = UsuarioService._leer_cursos(codigo for codigo, _ in faltantes)
+            for clave in faltantes:
+                if clave in cursos:
+                    creditos[clave] = float(cursos[clave].get("creditos", 0))
+        return creditos
+    
+    @staticmethod
+    def _creditos_curso(codigo: str, carrera: str, motor=None) -> float:
+        creditos = UsuarioService._creditos_por_curso([(codigo, carrera)], motor).get((codigo, carrera))
+        if creditos is None:
+            raise HTTPException(status_code=404, detail=f"Curso {codigo} no encontrado para la carrera {carrera}")
+        return creditos
+    
     @staticmethod
+    @en_unidad_trabajo
     def obtener_usuario(user_id: str) -> Dict:
-        supabase = get_supabase()
+        uow = unidad_actual()
+        # el perfil y el historial son independientes: se piden juntos
+        uow.precargar([UsuarioService._lectura_perfil(user_id), UsuarioService._lectura_historial(user_id)])
         
         # Usar la función SQL que combina datos de auth.users y usuarios
-        response = supabase.rpc("get_user_profile", {"p_user_id": user_id}).execute()
+        response = uow.leer(*UsuarioService._lectura_perfil(user_id))
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
@@ -31,13 +106,13 @@ class UsuarioService:
         usuario["historial_aprobados"] = historial
         
         # Los créditos totales ya vienen del get_user_profile desde la tabla usuarios
-        # Solo se recalculan cuando se modifica el historial (en agregar/eliminar curso)
+        # Se ajustan con cada cambio del historial (en agregar/eliminar curso)
         
         return usuario
     
     @staticmethod
+    @en_unidad_trabajo
     def crear_usuario(usuario: UsuarioCreate, user_id: str) -> Dict:
-        supabase = get_supabase()
         
         update_data = {}
         if usuario.carrera is not None:
@@ -50,22 +125,23 @@ class UsuarioService:
         
         update_data["updated_at"] = datetime.now().isoformat()
         
-        response = supabase.table("usuarios").upsert({
+        response = unidad_actual().escribir("usuarios", lambda s: s.table("usuarios").upsert({
             "id": user_id,
             **update_data
-        }, on_conflict="id").execute()
+        }, on_conflict="id").execute())
         
         return response.data[0] if response.data else {"id": user_id, **update_data}
     
     @staticmethod
+    @en_unidad_trabajo
     def actualizar_usuario(user_id: str, usuario: UsuarioUpdate) -> Dict:
-        supabase = get_supabase()
+        uow = unidad_actual()
         
         print(f"[ACTUALIZAR USUARIO] Iniciando actualización para usuario: {user_id}")
         print(f"[ACTUALIZAR USUARIO] Datos recibidos: {usuario.dict()}")
         
         # Verificar que el usuario existe primero
-        usuario_existente = supabase.table("usuarios").select("*").eq("id", user_id).execute()
+        usuario_existente = uow.leer(*UsuarioService._lectura_usuario(user_id))
         print(f"[ACTUALIZAR USUARIO] Usuario existente: {usuario_existente.data}")
         
         if not usuario_existente.data:
@@ -87,24 +163,22 @@ class UsuarioService:
         
         try:
             print(f"[ACTUALIZAR USUARIO] Ejecutando UPDATE en BD...")
-            response = supabase.table("usuarios").update(update_data).eq("id", user_id).execute()
+            response = uow.escribir("usuarios", lambda s: s.table("usuarios").update(update_data).eq("id", user_id).execute())
             print(f"[ACTUALIZAR USUARIO] Respuesta del update - Tipo: {type(response)}")
             print(f"[ACTUALIZAR USUARIO] Respuesta del update - Data: {response.data}")
             print(f"[ACTUALIZAR USUARIO] Respuesta del update - Status: {getattr(response, 'status_code', 'N/A')}")
             
-            # Intentar obtener el usuario actualizado siempre (por si el UPDATE no devuelve datos)
-            print(f"[ACTUALIZAR USUARIO] Obteniendo usuario actualizado después del UPDATE...")
-            usuario_actualizado_query = supabase.table("usuarios").select("*").eq("id", user_id).execute()
-            print(f"[ACTUALIZAR USUARIO] Usuario obtenido después del UPDATE: {usuario_actualizado_query.data}")
+            # El UPDATE devuelve la fila; solo si no lo hace se vuelve a leer
+            usuario_actualizado_data = response.data
+            if not usuario_actualizado_data:
+                print(f"[ACTUALIZAR USUARIO] Obteniendo usuario actualizado después del UPDATE...")
+                usuario_actualizado_data = uow.leer(*UsuarioService._lectura_usuario(user_id)).data
+                print(f"[ACTUALIZAR USUARIO] Usuario obtenido después del UPDATE: {usuario_actualizado_data}")
             
-            if usuario_actualizado_query.data and len(usuario_actualizado_query.data) > 0:
-                usuario_actualizado = usuario_actualizado_query.data[0]
-                
-                # Recalcular créditos después de actualizar (por si cambió la carrera)
-                UsuarioService._actualizar_creditos_usuario(user_id)
-                
-                # Obtener créditos actualizados
-                usuario_actualizado["creditos_totales"] = UsuarioService._calcular_creditos_desde_historial(user_id)
+            if usuario_actualizado_data and len(usuario_actualizado_data) > 0:
+                # Los créditos suman todo el historial, sin importar la carrera del
+                # usuario: se mantienen al día con cada cambio del historial
+                usuario_actualizado = usuario_actualizado_data[0]
                 
                 print(f"[ACTUALIZAR USUARIO] Usuario actualizado exitosamente")
                 return usuario_actualizado
@@ -119,13 +193,17 @@ class UsuarioService:
             raise HTTPException(status_code=500, detail=f"Error al actualizar usuario: {str(e)}")
     
     @staticmethod
-    def agregar_curso_aprobado(user_id: str, curso_codigo: str, carrera: Optional[str] = None) -> Dict:
+    @en_unidad_trabajo
+    def agregar_curso_aprobado(user_id: str, curso_codigo: str, carrera: Optional[str] = None, motor=None) -> Dict:
         import traceback
-        supabase = get_supabase()
+        uow = unidad_actual()
         
         try:
             print(f"[AGREGAR CURSO] Iniciando - user_id: {user_id}, curso_codigo: {curso_codigo}, carrera_provided: {carrera}")
             
+            # la fila del usuario trae la carrera y los créditos que se van a ajustar
+            uow.precargar([UsuarioService._lectura_usuario(user_id)])
+            
             if not carrera:
                 print(f"[AGREGAR CURSO] Carrera no proporcionada, obteniendo del usuario...")
                 carrera = UsuarioService.obtener_carrera_usuario(user_id)
@@ -136,8 +214,8 @@ class UsuarioService:
                 print(f"[AGREGAR CURSO] Carrera obtenida: {carrera}")
             
             print(f"[AGREGAR CURSO] Buscando curso: {curso_codigo} en carrera: {carrera}")
-            curso = CursoService.obtener_curso_por_carrera(curso_codigo, carrera)
-            print(f"[AGREGAR CURSO] Curso encontrado: {curso}")
+            creditos_curso = UsuarioService._creditos_curso(curso_codigo, carrera, motor)
+            print(f"[AGREGAR CURSO] Curso encontrado: {curso_codigo} ({creditos_curso} créditos)")
             
             hist_data = {
                 "usuario_id": user_id,
@@ -146,16 +224,22 @@ class UsuarioService:
             }
             print(f"[AGREGAR CURSO] Datos a insertar: {hist_data}")
             
+            # ignore_duplicates: solo devuelve la fila si era nueva, y solo entonces
+            # cambian los créditos
             print(f"[AGREGAR CURSO] Ejecutando upsert en historial_aprobados...")
-            response = supabase.table("historial_aprobados").upsert(
+            response = uow.escribir("historial_aprobados", lambda s: s.table("historial_aprobados").upsert(
                 hist_data, 
-                on_conflict="usuario_id,curso_codigo,carrera"
-            ).execute()
+                on_conflict="usuario_id,curso_codigo,carrera",
+                ignore_duplicates=True
+            ).execute())
             print(f"[AGREGAR CURSO] Upsert exitoso: {response.data if hasattr(response, 'data') else 'No data'}")
             
-            print(f"[AGREGAR CURSO] Actualizando créditos del usuario desde historial...")
-            UsuarioService._actualizar_creditos_usuario(user_id)
-            print(f"[AGREGAR CURSO] Créditos actualizados correctamente")
+            if response.data:
+                print(f"[AGREGAR CURSO] Sumando {creditos_curso} créditos al usuario...")
+                UsuarioService._ajustar_creditos_usuario(user_id, creditos_curso, motor)
+                print(f"[AGREGAR CURSO] Créditos actualizados correctamente")
+            else:
+                print(f"[AGREGAR CURSO] El curso ya estaba en el historial, los créditos no cambian")
             
             return {"message": "Curso agregado al historial", "curso": curso_codigo, "carrera": carrera}
             
@@ -174,40 +258,55 @@ class UsuarioService:
             )
     
     @staticmethod
-    def eliminar_curso_aprobado(user_id: str, curso_codigo: str, carrera: Optional[str] = None) -> Dict:
-        supabase = get_supabase()
+    @en_unidad_trabajo
+    def eliminar_curso_aprobado(user_id: str, curso_codigo: str, carrera: Optional[str] = None, motor=None) -> Dict:
+        uow = unidad_actual()
+        uow.precargar([UsuarioService._lectura_usuario(user_id)])
         
         if not carrera:
             carrera = UsuarioService.obtener_carrera_usuario(user_id)
             if not carrera:
                 raise HTTPException(status_code=400, detail="El usuario debe tener una carrera asignada")
         
-        curso = CursoService.obtener_curso_por_carrera(curso_codigo, carrera)
+        creditos_curso = UsuarioService._creditos_curso(curso_codigo, carrera, motor)
         
-        supabase.table("historial_aprobados").delete().eq(
+        # el DELETE devuelve las filas borradas: si no había ninguna, no se resta nada
+        response = uow.escribir("historial_aprobados", lambda s: s.table("historial_aprobados").delete().eq(
             "usuario_id", user_id
-        ).eq("curso_codigo", curso_codigo).eq("carrera", carrera).execute()
+        ).eq("curso_codigo", curso_codigo).eq("carrera", carrera).execute())
         
-        UsuarioService._actualizar_creditos_usuario(user_id)
+        if response.data:
+            UsuarioService._ajustar_creditos_usuario(user_id, -creditos_curso * len(response.data), motor)
         
         return {"message": "Curso eliminado del historial"}
     
     @staticmethod
+    @en_unidad_trabajo
     def obtener_historial(user_id: str, carrera: Optional[str] = None) -> List[str]:
         return UsuarioService._obtener_historial(user_id, carrera)
     
     @staticmethod
-    def obtener_historial_completo(user_id: str, carrera: Optional[str] = None) -> Dict:
-        supabase = get_supabase()
-        query = supabase.table("historial_aprobados").select(
-            "curso_codigo, carrera, aprobado_en"
-        ).eq("usuario_id", user_id)
-        
-        if carrera:
-            query = query.eq("carrera", carrera)
+    @en_unidad_trabajo
+    def obtener_historial_completo(user_id: str, carrera: Optional[str] = None, motor=None) -> Dict:
+        historial_items = [
+            item for item in UsuarioService._leer_historial_items(user_id)
+            if not carrera or item["carrera"] == carrera
+        ]
         
-        response = query.execute()
-        historial_items = response.data or []
+        # Detalles desde el motor en memoria; lo que no tenga sale de una sola
+        # consulta por lotes, no de una por curso
+        detalles = {}
+        faltantes = set()
+        for item in historial_items:
+            clave = (item["curso_codigo"], item["carrera"])
+            info = motor.get_info_curso(*clave) if motor is not None else None
+            if info is not None:
+                detalles[clave] = info
+            else:
+                faltantes.add(clave)
+        if faltantes:
+            cursos = UsuarioService._leer_cursos(codigo for codigo, _ in faltantes)
+            detalles.update({clave: cursos[clave] for clave in faltantes if clave in cursos})
         
         cursos_detalle = []
         total_creditos = 0.0
@@ -215,9 +314,9 @@ class UsuarioService:
         for item in historial_items:
             curso_codigo = item["curso_codigo"]
             curso_carrera = item["carrera"]
+            curso_info = detalles.get((curso_codigo, curso_carrera))
             
-            try:
-                curso_info = CursoService.obtener_curso_por_carrera(curso_codigo, curso_carrera)
+            if curso_info is not None:
                 cursos_detalle.append({
                     "curso_codigo": curso_codigo,
                     "carrera": curso_carrera,
@@ -227,7 +326,7 @@ class UsuarioService:
                     "aprobado_en": item.get("aprobado_en")
                 })
                 total_creditos += float(curso_info.get("creditos", 0))
-            except HTTPException:
+            else:
                 cursos_detalle.append({
                     "curso_codigo": curso_codigo,
                     "carrera": curso_carrera,
@@ -245,19 +344,18 @@ class UsuarioService:
         }
     
     @staticmethod
-    def actualizar_curso_aprobado(user_id: str, curso_codigo: str, historial_update: HistorialUpdate) -> Dict:
-        supabase = get_supabase()
+    @en_unidad_trabajo
+    def actualizar_curso_aprobado(user_id: str, curso_codigo: str, historial_update: HistorialUpdate, motor=None) -> Dict:
+        uow = unidad_actual()
         
         carrera_actual = historial_update.carrera
         if not carrera_actual:
-            response = supabase.table("historial_aprobados").select("carrera").eq(
-                "usuario_id", user_id
-            ).eq("curso_codigo", curso_codigo).execute()
+            filas = [item for item in UsuarioService._leer_historial_items(user_id) if item["curso_codigo"] == curso_codigo]
             
-            if not response.data:
+            if not filas:
                 raise HTTPException(status_code=404, detail="Curso no encontrado en el historial")
             
-            carrera_actual = response.data[0]["carrera"]
+            carrera_actual = filas[0]["carrera"]
         
         update_data = {}
         if historial_update.aprobado_en:
@@ -267,11 +365,14 @@ class UsuarioService:
         if carrera_final != carrera_actual:
             update_data["carrera"] = carrera_final
             
-            curso = CursoService.obtener_curso_por_carrera(curso_codigo, carrera_final)
+            creditos_final = UsuarioService._creditos_curso(curso_codigo, carrera_final, motor)
+            creditos_actual = UsuarioService._creditos_por_curso([(curso_codigo, carrera_actual)], motor).get(
+                (curso_codigo, carrera_actual), 0.0
+            )
             
-            supabase.table("historial_aprobados").delete().eq(
+            borradas = uow.escribir("historial_aprobados", lambda s: s.table("historial_aprobados").delete().eq(
                 "usuario_id", user_id
-            ).eq("curso_codigo", curso_codigo).eq("carrera", carrera_actual).execute()
+            ).eq("curso_codigo", curso_codigo).eq("carrera", carrera_actual).execute())
             
             hist_data = {
                 "usuario_id": user_id,
@@ -282,31 +383,30 @@ class UsuarioService:
             if historial_update.aprobado_en:
                 hist_data["aprobado_en"] = historial_update.aprobado_en
             
-            supabase.table("historial_aprobados").insert(hist_data).execute()
+            uow.escribir("historial_aprobados", lambda s: s.table("historial_aprobados").insert(hist_data).execute())
             
-            # Recalcular créditos después de actualizar
-            UsuarioService._actualizar_creditos_usuario(user_id)
+            UsuarioService._ajustar_creditos_usuario(
+                user_id, creditos_final - creditos_actual * len(borradas.data or []), motor
+            )
             
             return {"message": "Curso actualizado en el historial", "curso": curso_codigo, "carrera": carrera_final}
         
         if update_data:
-            supabase.table("historial_aprobados").update(update_data).eq(
+            uow.escribir("historial_aprobados", lambda s: s.table("historial_aprobados").update(update_data).eq(
                 "usuario_id", user_id
-            ).eq("curso_codigo", curso_codigo).eq("carrera", carrera_actual).execute()
-            
-            # Recalcular créditos después de actualizar
-            UsuarioService._actualizar_creditos_usuario(user_id)
+            ).eq("curso_codigo", curso_codigo).eq("carrera", carrera_actual).execute())
             
+            # la fila sigue con el mismo curso y carrera: los créditos no cambian
             return {"message": "Historial actualizado", "curso": curso_codigo, "carrera": carrera_actual}
         
         return {"message": "No hay cambios para actualizar"}
     
     @staticmethod
+    @en_unidad_trabajo
     def obtener_carrera_usuario(user_id: str) -> Optional[str]:
-        supabase = get_supabase()
         print(f"[OBTENER CARRERA] Buscando carrera para usuario: {user_id}")
         try:
-            response = supabase.table("usuarios").select("carrera").eq("id", user_id).execute()
+            response = unidad_actual().leer(*UsuarioService._lectura_usuario(user_id))
             print(f"[OBTENER CARRERA] Respuesta recibida: {response.data}")
             
             if response.data and len(response.data) > 0:
@@ -321,122 +421,98 @@ class UsuarioService:
             return None
     
     @staticmethod
-    def obtener_historial_completo(user_id: str, carrera: Optional[str] = None) -> Dict:
-        supabase = get_supabase()
-        query = supabase.table("historial_aprobados").select(
-            "curso_codigo, carrera, aprobado_en"
-        ).eq("usuario_id", user_id)
-        
-        if carrera:
-            query = query.eq("carrera", carrera)
-        
-        response = query.execute()
-        historial_items = response.data or []
-        
-        cursos_detalle = []
-        total_creditos = 0.0
-        
-        for item in historial_items:
-            curso_codigo = item["curso_codigo"]
-            curso_carrera = item["carrera"]
-            
-            try:
-                curso_info = CursoService.obtener_curso_por_carrera(curso_codigo, curso_carrera)
-                cursos_detalle.append({
-                    "curso_codigo": curso_codigo,
-                    "carrera": curso_carrera,
-                    "nombre": curso_info.get("nombre", ""),
-                    "creditos": float(curso_info.get("creditos", 0)),
-                    "nivel": curso_info.get("nivel", 0),
-                    "aprobado_en": item.get("aprobado_en")
-                })
-                total_creditos += float(curso_info.get("creditos", 0))
-            except HTTPException:
-                cursos_detalle.append({
-                    "curso_codigo": curso_codigo,
-                    "carrera": curso_carrera,
-                    "nombre": "Curso no encontrado",
-                    "creditos": 0,
-                    "nivel": 0,
-                    "aprobado_en": item.get("aprobado_en")
-                })
-        
-        return {
-            "usuario_id": user_id,
-            "cursos": cursos_detalle,
-            "total_cursos": len(cursos_detalle),
-            "total_creditos": total_creditos
-        }
+    def _obtener_historial(user_id: str, carrera: Optional[str] = None) -> List[str]:
+        # se filtra aquí para compartir la misma lectura del historial completo
+        return [
+            h["curso_codigo"] for h in UsuarioService._leer_historial_items(user_id)
+            if not carrera or h["carrera"] == carrera
+        ]
     
     @staticmethod
-    def _obtener_historial(user_id: str, carrera: Optional[str] = None) -> List[str]:
-        supabase = get_supabase()
-        query = supabase.table("historial_aprobados").select("curso_codigo, carrera").eq("usuario_id", user_id)
-        
-        if carrera:
-            query = query.eq("carrera", carrera)
-        
-        response = query.execute()
-        return [h["curso_codigo"] for h in (response.data or [])]
+    def _sumar_creditos(historial_items: List[Dict], creditos: Dict[Tuple[str, str], float]) -> float:
+        # Sumar créditos solo de los cursos que existen
+        return sum(creditos.get((item["curso_codigo"], item["carrera"]), 0.0) for item in historial_items)
     
     @staticmethod
-    def _calcular_creditos_rapido(user_id: str) -> float:
+    def _calcular_creditos_rapido(user_id: str, motor=None) -> float:
         """Calcula los créditos totales sumando créditos de cursos aprobados (función backend optimizada)"""
-        supabase = get_supabase()
-        
-        # Obtener historial de cursos aprobados
-        historial_items = supabase.table("historial_aprobados").select(
-            "curso_codigo, carrera"
-        ).eq("usuario_id", user_id).execute()
-        
-        if not historial_items.data:
+        historial_items = UsuarioService._leer_historial_items(user_id)
+        if not historial_items:
             return 0.0
         
-        # Crear conjunto de códigos únicos y mapeo (codigo, carrera) para filtrar después
-        codigos_unicos = list(set([item["curso_codigo"] for item in historial_items.data]))
-        codigos_carreras = [(item["curso_codigo"], item["carrera"]) for item in historial_items.data]
-        
-        # Obtener TODOS los cursos con esos códigos en una sola query (mucho más eficiente)
-        # Paginamos si hay muchos códigos
-        todos_cursos = []
-        batch_size = 100  # Supabase permite múltiples valores en .in()
-        
-        for i in range(0, len(codigos_unicos), batch_size):
-            batch_codigos = codigos_unicos[i:i + batch_size]
-            response = supabase.table("cursos").select("codigo, carrera, creditos").in_("codigo", batch_codigos).execute()
-            if response.data:
-                todos_cursos.extend(response.data)
-        
-        # Crear diccionario para búsqueda rápida: (codigo, carrera) -> créditos
-        cursos_dict = {}
-        for curso in todos_cursos:
-            key = (curso["codigo"], curso["carrera"])
-            cursos_dict[key] = float(curso.get("creditos", 0))
-        
-        # Sumar créditos solo de los cursos que están en el historial
-        total = 0.0
-        for codigo, carrera in codigos_carreras:
-            total += cursos_dict.get((codigo, carrera), 0.0)
-        
-        return total
+        creditos = UsuarioService._creditos_por_curso(
+            ((item["curso_codigo"], item["carrera"]) for item in historial_items), motor
+        )
+        return UsuarioService._sumar_creditos(historial_items, creditos)
     
     @staticmethod
-    def _calcular_creditos_desde_historial(user_id: str) -> float:
+    def _calcular_creditos_desde_historial(user_id: str, motor=None) -> float:
         """Calcula los créditos totales sumando todos los cursos en historial_aprobados"""
-        return UsuarioService._calcular_creditos_rapido(user_id)
+        return UsuarioService._calcular_creditos_rapido(user_id, motor)
     
     @staticmethod
-    def _actualizar_creditos_usuario(user_id: str, creditos: float = None, sumar: bool = True):
-        """Actualiza los créditos del usuario. Si creditos es None, los calcula desde el historial"""
-        supabase = get_supabase()
+    def _guardar_creditos_usuario(user_id: str, creditos_totales: float):
+        unidad_actual().escribir("usuarios", lambda s: s.table("usuarios").update({
+            "creditos_totales": creditos_totales,
+            "updated_at": datetime.now().isoformat()
+        }).eq("id", user_id).execute())
+        print(f"[ACTUALIZAR CREDITOS] Créditos actualizados en BD: {creditos_totales}")
+    
+    @staticmethod
+    def _corregir_creditos_usuario(user_id: str, creditos_totales: float, creditos_leidos) -> bool:
+        """Escribe la corrección solo si creditos_totales sigue valiendo lo que se leyó.
+        Devuelve False si otro cambio (un ajuste por diferencia) se adelantó."""
+        def consulta(s):
+            query = s.table("usuarios").update({
+                "creditos_totales": creditos_totales,
+                "updated_at": datetime.now().isoformat()
+            }).eq("id", user_id)
+            if creditos_leidos is None:
+                return query.is_("creditos_totales", "null").execute()
+            return query.eq("creditos_totales", creditos_leidos).execute()
+        return bool(unidad_actual().escribir("usuarios", consulta).data)
+    
+    @staticmethod
+    def _ajustar_creditos_usuario(user_id: str, delta: float, motor=None) -> Optional[float]:
+        """Suma delta a creditos_totales sin releer el historial.
+        
+        El UPDATE solo se aplica si creditos_totales sigue valiendo lo que se leyó;
+        si otro cambio se adelantó se vuelve a intentar y, como último recurso, se
+        recalcula desde el historial.
+        """
+        uow = unidad_actual()
+        for _ in range(INTENTOS_AJUSTE_CREDITOS):
+            response = uow.leer(*UsuarioService._lectura_usuario(user_id))
+            if not response.data:
+                print(f"[AJUSTAR CREDITOS] Usuario {user_id} no encontrado, no se ajustan créditos")
+                return None
+            
+            creditos_actuales = response.data[0].get("creditos_totales")
+            if creditos_actuales is None:
+                break
+            creditos_totales = max(0.0, float(creditos_actuales) + delta)
+            actualizado = uow.escribir("usuarios", lambda s: s.table("usuarios").update({
+                "creditos_totales": creditos_totales,
+                "updated_at": datetime.now().isoformat()
+            }).eq("id", user_id).eq("creditos_totales", creditos_actuales).execute())
+            if actualizado.data:
+                print(f"[AJUSTAR CREDITOS] {creditos_actuales} {delta:+} -> {creditos_totales}")
+                return creditos_totales
+            print(f"[AJUSTAR CREDITOS] creditos_totales cambió mientras se ajustaba, reintentando")
+        
+        return UsuarioService._actualizar_creditos_usuario(user_id, motor=motor)
+    
+    @staticmethod
+    def _actualizar_creditos_usuario(user_id: str, creditos: float = None, sumar: bool = True, motor=None) -> float:
+        """Actualiza los créditos del usuario y los devuelve. Si creditos es None, los calcula desde el historial"""
         try:
             if creditos is None:
                 # Calcular desde el historial real
-                creditos_totales = UsuarioService._calcular_creditos_desde_historial(user_id)
+                creditos_totales = UsuarioService._calcular_creditos_desde_historial(user_id, motor)
                 print(f"[ACTUALIZAR CREDITOS] Créditos calculados desde historial: {creditos_totales}")
             else:
                 # Método antiguo (mantener para compatibilidad)
-                response = supabase.table("usuarios").select("creditos_totales").eq("id", user_id).execute()
+                response = unidad_actual().leer(*UsuarioService._lectura_usuario(user_id))
                 if response.data:
                     creditos_actuales = float(response.data[0]["creditos_totales"])
                     creditos_totales = creditos_actuales + creditos if sumar else max(0, creditos_actuales - creditos)
@@ -445,38 +521,101 @@ class UsuarioService:
                     creditos_totales = 0.0
             
             # Actualizar en la base de datos
-            supabase.table("usuarios").update({
-                "creditos_totales": creditos_totales,
-                "updated_at": datetime.now().isoformat()
-            }).eq("id", user_id).execute()
-            print(f"[ACTUALIZAR CREDITOS] Créditos actualizados en BD: {creditos_totales}")
+            UsuarioService._guardar_creditos_usuario(user_id, creditos_totales)
+            return creditos_totales
         except Exception as e:
             print(f"[ACTUALIZAR CREDITOS] ERROR: {type(e).__name__}: {str(e)}")
             raise
+    
+    @staticmethod
+    def _leer_paginado(tabla: str, columnas: str, orden: List[str]) -> List[Dict]:
+        filas = []
+        offset = 0
+        while True:
+            def consulta(s, offset=offset):
+                query = s.table(tabla).select(columnas)
+                for columna in orden:
+                    query = query.order(columna)
+                return query.range(offset, offset + PAGINA_RECONCILIACION - 1).execute()
+            pagina = unidad_actual().leer((tabla, "pagina", columnas, offset), consulta).data or []
+            filas.extend(pagina)
+            if len(pagina) < PAGINA_RECONCILIACION:
+                return filas
+            offset += PAGINA_RECONCILIACION
+    
+    @staticmethod
+    @en_unidad_trabajo
+    def reconciliar_creditos(user_id: Optional[str] = None, motor=None) -> Dict:
+        """Recalcula creditos_totales desde el historial (de un usuario o de todos) y corrige los que se desviaron"""
+        uow = unidad_actual()
+        inicio = time.perf_counter()
+        
+        if user_id:
+            uow.precargar([UsuarioService._lectura_usuario(user_id), UsuarioService._lectura_historial(user_id)])
+            usuarios = uow.leer(*UsuarioService._lectura_usuario(user_id)).data or []
+            historial_items = [{**item, "usuario_id": user_id} for item in UsuarioService._leer_historial_items(user_id)]
+        else:
+            usuarios = UsuarioService._leer_paginado("usuarios", "id, creditos_totales", ["id"])
+            historial_items = UsuarioService._leer_paginado(
+                "historial_aprobados", "usuario_id, curso_codigo, carrera", ["usuario_id", "curso_codigo", "carrera"]
+            )
+        
+        por_usuario: Dict[str, List[Dict]] = {}
+        for item in historial_items:
+            por_usuario.setdefault(item["usuario_id"], []).append(item)
+        creditos = UsuarioService._creditos_por_curso(
+            ((item["curso_codigo"], item["carrera"]) for item in historial_items), motor
+        )
+        
+        corregidos = []
+        # usuarios cuyo historial cambió durante la reconciliación: se revisan en la próxima
+        omitidos = []
+        for usuario in usuarios:
+            esperado = UsuarioService._sumar_creditos(por_usuario.get(usuario["id"], []), creditos)
+            actual = usuario.get("creditos_totales")
+            if actual is None or abs(float(actual) - esperado) > 1e-6:
+                if UsuarioService._corregir_creditos_usuario(usuario["id"], esperado, actual):
+                    corregidos.append({"usuario_id": usuario["id"], "antes": actual, "despues": esperado})
+                else:
+                    omitidos.append(usuario["id"])
+        
+        print(f"🧮 Créditos reconciliados: {len(usuarios)} usuarios revisados, {len(corregidos)} corregidos, "
+              f"{len(omitidos)} omitidos por cambios en curso en {time.perf_counter() - inicio:.2f}s")
+        return {
+            "usuarios_revisados": len(usuarios),
+            "usuarios_corregidos": len(corregidos),
+            "usuarios_omitidos": omitidos,
+            "correcciones": corregidos
+        }
 
 
 class CursoService:
+    # Con el motor cargado el catálogo se lee de su vista en memoria; mientras
+    # arranca (motor=None) se consulta la base como antes
     @staticmethod
-    def obtener_cursos(carrera: Optional[str] = None) -> Dict:
-        supabase = get_supabase()
-        query = supabase.table("cursos").select("codigo, nombre, carrera, creditos, nivel")
-        
-        if carrera:
-            query = query.ilike("carrera", f"%{carrera}%")
-        
-        response = query.order("codigo").execute()
-        cursos = response.data or []
-        
-        lista_cursos = [
-            {
-                "value": curso["codigo"],
-                "label": f"{curso['codigo']} - {curso['nombre']}",
-                "carrera": curso.get("carrera", ""),
-                "creditos": curso.get("creditos", 0),
-                "nivel": curso.get("nivel", 0)
-            }
-            for curso in cursos
-        ]
+    def obtener_cursos(carrera: Optional[str] = None, motor=None) -> Dict:
+        if motor is not None:
+            lista_cursos = motor.vista_catalogo().filtrar_cursos(carrera)
+        else:
+            supabase = get_supabase()
+            query = supabase.table("cursos").select("codigo, nombre, carrera, creditos, nivel")
+            
+            if carrera:
+                query = query.ilike("carrera", f"%{carrera}%")
+            
+            response = query.order("codigo").execute()
+            cursos = response.data or []
+            
+            lista_cursos = [
+                {
+                    "value": curso["codigo"],
+                    "label": f"{curso['codigo']} - {curso['nombre']}",
+                    "carrera": curso.get("carrera", ""),
+                    "creditos": curso.get("creditos", 0),
+                    "nivel": curso.get("nivel", 0)
+                }
+                for curso in cursos
+            ]
         
         return {
             "total": len(lista_cursos),
@@ -485,7 +624,14 @@ class CursoService:
         }
     
     @staticmethod
-    def obtener_carreras() -> Dict:
+    def obtener_carreras(motor=None) -> Dict:
+        if motor is not None:
+            carreras = motor.vista_catalogo().carreras
+            return {
+                "total": len(carreras),
+                "carreras": carreras
+            }
+        
         supabase = get_supabase()
         
         try:
@@ -516,8 +662,10 @@ class CursoService:
     
     @staticmethod
     def obtener_curso(codigo: str) -> Dict:
-        supabase = get_supabase()
-        response = supabase.table("cursos").select("codigo, creditos").eq("codigo", codigo).execute()
+        response = unidad_actual().leer(
+            ("cursos", codigo),
+            lambda s: s.table("cursos").select("codigo, creditos").eq("codigo", codigo).execute()
+        )
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Curso no encontrado")
@@ -526,11 +674,13 @@ class CursoService:
     
     @staticmethod
     def obtener_curso_por_carrera(codigo: str, carrera: str) -> Dict:
-        supabase = get_supabase()
         print(f"[OBTENER CURSO] Buscando curso: codigo={codigo}, carrera={carrera}")
         
         try:
-            response = supabase.table("cursos").select("codigo, nombre, creditos, carrera, nivel").eq("codigo", codigo).eq("carrera", carrera).execute()
+            response = unidad_actual().leer(
+                ("cursos", codigo, carrera),
+                lambda s: s.table("cursos").select("codigo, nombre, creditos, carrera, nivel").eq("codigo", codigo).eq("carrera", carrera).execute()
+            )
             print(f"[OBTENER CURSO] Respuesta recibida: {len(response.data) if response.data else 0} curso(s) encontrado(s)")
             
             if not response.data:
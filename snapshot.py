@@ -0,0 +1,88 @@
+import json
+import os
+import struct
+import tempfile
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+# Archivo: MAGIA | versión de formato (uint32) | largo del encabezado (uint64) |
+# encabezado JSON | arreglos crudos alineados a 64 bytes (se leen con np.memmap)
+MAGIA = b"MOTORSNP"
+# subirla cuando cambie el formato o lo que guarda (p. ej. cómo se parsean los requisitos)
+VERSION_FORMATO = 3
+_PREFIJO = struct.Struct("<8sIQ")
+_ALINEACION = 64
+
+
+def _alinear(posicion: int) -> int:
+    return (posicion + _ALINEACION - 1) // _ALINEACION * _ALINEACION
+
+
+def guardar_snapshot(ruta: str, marca: str, datos: Dict, arreglos: Dict[str, np.ndarray]):
+    descriptores = {}
+    posicion = 0
+    for nombre, arreglo in arreglos.items():
+        arreglo = np.ascontiguousarray(arreglo)
+        arreglos[nombre] = arreglo
+        descriptores[nombre] = {
+            "dtype": arreglo.dtype.str,
+            "shape": list(arreglo.shape),
+            "offset": posicion
+        }
+        posicion = _alinear(posicion + arreglo.nbytes)
+    
+    encabezado = json.dumps({
+        "marca": marca,
+        "datos": datos,
+        "arreglos": descriptores
+    }, ensure_ascii=False).encode("utf-8")
+    inicio_arreglos = _alinear(_PREFIJO.size + len(encabezado))
+    
+    # temporal propio de esta escritura: dos guardados a la vez no se pisan y
+    # el último os.replace deja un archivo completo
+    descriptor, temporal = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(ruta)), prefix=f"{os.path.basename(ruta)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(_PREFIJO.pack(MAGIA, VERSION_FORMATO, len(encabezado)))
+            f.write(encabezado)
+            for nombre, arreglo in arreglos.items():
+                f.seek(inicio_arreglos + descriptores[nombre]["offset"])
+                f.write(arreglo.tobytes())
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def cargar_snapshot(ruta: str, marca: str) -> Optional[Tuple[Dict, Dict[str, np.ndarray]]]:
+    """Devuelve (datos, arreglos) si el snapshot existe, es de este formato y su marca coincide"""
+    if not os.path.exists(ruta):
+        return None
+    
+    with open(ruta, "rb") as f:
+        prefijo = f.read(_PREFIJO.size)
+        if len(prefijo) < _PREFIJO.size:
+            return None
+        magia, version, largo = _PREFIJO.unpack(prefijo)
+        if magia != MAGIA or version != VERSION_FORMATO:
+            return None
+        encabezado = json.loads(f.read(largo).decode("utf-8"))
+    
+    if encabezado.get("marca") != marca:
+        return None
+    
+    inicio_arreglos = _alinear(_PREFIJO.size + largo)
+    arreglos = {}
+    for nombre, desc in encabezado["arreglos"].items():
+        shape = tuple(desc["shape"])
+        if int(np.prod(shape)) == 0:
+            arreglos[nombre] = np.zeros(shape, dtype=desc["dtype"])
+            continue
+        arreglos[nombre] = np.memmap(
+            ruta, dtype=desc["dtype"], mode="r",
+            offset=inicio_arreglos + desc["offset"], shape=shape
+        )
+    return encabezado["datos"], arreglos
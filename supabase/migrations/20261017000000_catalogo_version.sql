@@ -0,0 +1,29 @@
+-- Versión del catálogo de cursos. El motor guarda en su snapshot la versión con
+-- la que se cargó y al arrancar la compara con esta fila: si coincide, arranca
+-- desde el snapshot sin descargar la tabla cursos.
+create table if not exists public.catalogo_version (
+    id smallint primary key default 1 check (id = 1),
+    version bigint not null default 0,
+    actualizado_en timestamptz not null default now()
+);
+
+insert into public.catalogo_version (id) values (1) on conflict (id) do nothing;
+
+alter table public.catalogo_version enable row level security;
+drop policy if exists "catalogo_version lectura" on public.catalogo_version;
+create policy "catalogo_version lectura" on public.catalogo_version for select using (true);
+
+-- Cualquier escritura en cursos (desde el motor, el panel de Supabase u otro
+-- proceso) sube la versión y deja vencidos los snapshots anteriores
+create or replace function public.subir_catalogo_version() returns trigger
+language plpgsql security definer set search_path = public as $$
+begin
+    update public.catalogo_version set version = version + 1, actualizado_en = now() where id = 1;
+    return null;
+end;
+$$;
+
+drop trigger if exists cursos_subir_catalogo_version on public.cursos;
+create trigger cursos_subir_catalogo_version
+    after insert or update or delete or truncate on public.cursos
+    for each statement execute function public.subir_catalogo_version();
@@ -0,0 +1,46 @@
+import contextlib
+import csv
+import io
+import os
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+# las pruebas nunca leen ni pisan el snapshot del entorno de desarrollo
+os.environ["MOTOR_SNAPSHOT_PATH"] = os.path.join(tempfile.gettempdir(), f"tests_snapshot_{os.getpid()}.bin")
+
+import pytest  # noqa: E402
+from motor_academico import MotorAcademico  # noqa: E402
+from supabase_local import SupabaseLocal  # noqa: E402
+
+COLUMNAS_CSV = ["Nivel", "Facultad", "Carrera", "Código", "Asignatura", "Créditos", "Requisitos"]
+
+
+def cargar_motor(ruta_csv: str) -> MotorAcademico:
+    # el motor imprime su progreso; en las pruebas solo estorba
+    with contextlib.redirect_stdout(io.StringIO()):
+        motor = MotorAcademico(None, supabase=SupabaseLocal(), cargar=False)
+        motor.cargar_desde_csv(ruta_csv)
+    return motor
+
+
+@pytest.fixture
+def motor_malla(tmp_path):
+    """Arma un motor con una malla chica: recibe filas (codigo, creditos, nivel, requisitos)
+    de la carrera "Prueba" """
+    def armar(filas):
+        ruta = tmp_path / "malla.csv"
+        with open(ruta, "w", newline="", encoding="utf-8") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(COLUMNAS_CSV)
+            for codigo, creditos, nivel, requisitos in filas:
+                escritor.writerow([nivel, "Facultad", "Prueba", codigo, f"Curso {codigo}", creditos, requisitos])
+        return cargar_motor(str(ruta))
+    return armar
+
+
+@pytest.fixture(scope="session")
+def motor_catalogo():
+    return cargar_motor(os.path.join(RAIZ, "mallas_consolidadas.csv"))
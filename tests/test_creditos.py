@@ -0,0 +1,67 @@
+import contextlib
+import io
+import pytest
+import database
+from services import UsuarioService
+from supabase_local import SupabaseLocal
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    cliente = SupabaseLocal({
+        "cursos": [
+            {"codigo": "MA101", "carrera": "Prueba", "nombre": "Cálculo", "creditos": 4, "nivel": 1},
+            {"codigo": "FI101", "carrera": "Prueba", "nombre": "Física", "creditos": 3, "nivel": 1},
+        ],
+        "usuarios": [
+            {"id": "desviado", "carrera": "Prueba", "creditos_totales": 0.0},
+            {"id": "al_dia", "carrera": "Prueba", "creditos_totales": 4.0},
+            {"id": "sin_creditos", "carrera": "Prueba", "creditos_totales": None},
+        ],
+        "historial_aprobados": [
+            {"usuario_id": "desviado", "curso_codigo": "MA101", "carrera": "Prueba"},
+            {"usuario_id": "desviado", "curso_codigo": "FI101", "carrera": "Prueba"},
+            {"usuario_id": "al_dia", "curso_codigo": "MA101", "carrera": "Prueba"},
+            {"usuario_id": "sin_creditos", "curso_codigo": "FI101", "carrera": "Prueba"},
+        ],
+    })
+    monkeypatch.setattr(database, "_supabase", cliente)
+    return cliente
+
+
+def creditos(cliente, user_id):
+    return next(u["creditos_totales"] for u in cliente.tablas["usuarios"] if u["id"] == user_id)
+
+
+def reconciliar():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return UsuarioService.reconciliar_creditos()
+
+
+def test_reconciliacion_corrige_los_desvios(cliente):
+    resultado = reconciliar()
+    assert resultado["usuarios_corregidos"] == 2
+    assert resultado["usuarios_omitidos"] == []
+    assert (creditos(cliente, "desviado"), creditos(cliente, "al_dia"), creditos(cliente, "sin_creditos")) == (7.0, 4.0, 3.0)
+
+
+def test_reconciliacion_no_pisa_un_ajuste_que_se_adelanto(cliente):
+    # Entre la lectura de la reconciliación y su escritura, otra petición aplica
+    # un ajuste por diferencia a "desviado": la corrección no debe pisarlo
+    def ajuste_concurrente(tabla, operacion):
+        if (tabla, operacion) == ("usuarios", "update") and not ajuste_concurrente.hecho:
+            ajuste_concurrente.hecho = True
+            for usuario in cliente.tablas["usuarios"]:
+                if usuario["id"] == "desviado":
+                    usuario["creditos_totales"] = 5.0
+        return False
+    ajuste_concurrente.hecho = False
+    cliente.fallar = ajuste_concurrente
+
+    resultado = reconciliar()
+    assert resultado["usuarios_omitidos"] == ["desviado"]
+    assert creditos(cliente, "desviado") == 5.0
+    # la siguiente pasada lo vuelve a revisar con datos frescos
+    cliente.fallar = None
+    assert reconciliar()["usuarios_omitidos"] == []
+    assert creditos(cliente, "desviado") == 7.0
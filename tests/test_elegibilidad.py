@@ -0,0 +1,67 @@
+import itertools
+import pytest
+
+MALLA = [
+    ("MA101", 3, 1, ""),
+    ("MA102", 3, 1, ""),
+    ("FI101", 4, 1, ""),
+    ("FI201", 4, 2, "MA101 o MA102, FI101"),
+    ("QU201", 3, 2, "MA101 / MA102"),
+    ("CR201", 3, 2, "MA101, 6CRED"),
+    ("EX301", 3, 3, "ZZ999 o MA102"),
+    ("EX302", 3, 3, "ZZ999"),
+]
+
+
+@pytest.fixture
+def motor(motor_malla):
+    return motor_malla(MALLA)
+
+
+def aprobados(motor, historial):
+    return motor._procesar_historial(historial, "Prueba")
+
+
+@pytest.mark.parametrize("historial, cumple", [
+    (["MA101", "FI101"], True),
+    (["MA102", "FI101"], True),
+    (["MA101", "MA102", "FI101"], True),
+    (["MA101", "MA102"], False),
+    (["FI101"], False),
+])
+def test_requisito_con_alternativas(motor, historial, cumple):
+    assert motor.cumple_requisitos("FI201|Prueba", *aprobados(motor, historial)) is cumple
+
+
+def test_alternativas_con_curso_inexistente(motor):
+    # ZZ999 no está en la malla: la alternativa existente basta
+    assert motor.cumple_requisitos("EX301|Prueba", *aprobados(motor, ["MA102"]))
+    assert not motor.cumple_requisitos("EX301|Prueba", *aprobados(motor, ["MA101"]))
+    assert not motor.cumple_requisitos("EX302|Prueba", *aprobados(motor, ["MA101", "MA102", "FI101"]))
+
+
+def test_creditos_minimos(motor):
+    assert not motor.cumple_requisitos("CR201|Prueba", *aprobados(motor, ["MA101"]))
+    assert motor.cumple_requisitos("CR201|Prueba", *aprobados(motor, ["MA101", "MA102"]))
+
+
+def test_planificacion_coincide_con_cumple_requisitos(motor):
+    # la elegibilidad vectorizada de la partición y la evaluación curso a curso
+    # tienen que decidir lo mismo para cualquier historial
+    codigos = [codigo for codigo, *_ in MALLA]
+    for k in range(len(codigos) + 1):
+        for historial in itertools.combinations(codigos, k):
+            candidatos, _ = motor.generar_planificacion(list(historial), 22, "Prueba")
+            aprobados_dict, total = aprobados(motor, list(historial))
+            esperados = {
+                codigo for codigo in codigos
+                if codigo not in historial and motor.cumple_requisitos(f"{codigo}|Prueba", aprobados_dict, total)
+            }
+            assert {c["id"] for c in candidatos} == esperados, historial
+
+
+def test_aristas_de_alternativas(motor):
+    # cada alternativa queda como arista hacia el curso, aunque baste una
+    grafo = motor.exportar_grafo("Prueba")
+    origenes = {arista["source"] for arista in grafo["edges"] if arista["target"] == "FI201"}
+    assert origenes == {"MA101", "MA102", "FI101"}
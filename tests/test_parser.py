@@ -0,0 +1,66 @@
+from parser import O, SIN_REQUISITOS, Y, evaluar_requisitos, parse_expresion_requisitos, parse_requisitos
+
+
+def curso(codigo):
+    return ("COURSE", codigo)
+
+
+def test_alternativas_ligan_mas_fuerte_que_la_conjuncion():
+    assert parse_expresion_requisitos("MA101 o MA102, FI101") == (
+        Y, ((O, (curso("MA101"), curso("MA102"))), curso("FI101"))
+    )
+    assert parse_expresion_requisitos("MA101 / MA102 y FI101 ; QU101") == (
+        Y, ((O, (curso("MA101"), curso("MA102"))), curso("FI101"), curso("QU101"))
+    )
+
+
+def test_cadena_de_alternativas_queda_en_un_solo_or():
+    assert parse_expresion_requisitos("MA101 o MA102 O MA103/MA104") == (
+        Y, ((O, tuple(curso(f"MA10{k}") for k in range(1, 5))),)
+    )
+
+
+def test_hojas_de_creditos():
+    assert parse_expresion_requisitos("HO215,36CRED") == (Y, (curso("HO215"), ("CRED", 36)))
+    assert parse_expresion_requisitos("ma101 : 4") == (Y, (("COURSE_CRED", "MA101", 4),))
+
+
+def test_separadores_sueltos_no_pierden_cursos():
+    esperado = (Y, (curso("MA101"), curso("FI101")))
+    assert parse_expresion_requisitos(", MA101,, ;FI101 ,") == esperado
+    assert parse_expresion_requisitos("MA101 y FI101 o") == esperado
+    assert parse_expresion_requisitos("MA101 o,FI101") == esperado
+    for texto in ("MA101 o", "MA101 y", "o MA101", "MA101 /", "/ MA101"):
+        assert parse_expresion_requisitos(texto) == (Y, (curso("MA101"),)), texto
+
+
+def test_sin_requisitos():
+    for texto in ("", "nan", "   ", "/", ",;", " o ", "Y"):
+        assert parse_expresion_requisitos(texto) == SIN_REQUISITOS, texto
+
+
+def test_tokens_desconocidos_se_descartan():
+    assert parse_expresion_requisitos("Ninguno") == SIN_REQUISITOS
+    # una alternativa que no se entiende no se puede verificar: la que sí se
+    # entiende queda obligatoria, como con el parser original
+    assert parse_expresion_requisitos("MA101 o algo") == (Y, (curso("MA101"),))
+    assert parse_expresion_requisitos("MA101 o algo, FI101") == (Y, (curso("MA101"), curso("FI101")))
+    assert parse_expresion_requisitos("MA101, consultar") == (Y, (curso("MA101"),))
+    # "o" dentro de un código no es separador
+    assert parse_expresion_requisitos("OR101 o MO202") == (Y, ((O, (curso("OR101"), curso("MO202"))),))
+
+
+def test_lista_plana_para_aristas():
+    assert parse_requisitos("MA101 o MA102, 20CRED") == [curso("MA101"), curso("MA102"), ("CRED", 20)]
+
+
+def test_evaluacion_corta_al_decidirse():
+    expresion = parse_expresion_requisitos("MA101 o MA102, FI101")
+    consultadas = []
+
+    def cumple(hoja):
+        consultadas.append(hoja[1])
+        return hoja[1] in {"MA101", "FI101"}
+
+    assert evaluar_requisitos(expresion, cumple)
+    assert consultadas == ["MA101", "FI101"]
@@ -0,0 +1,60 @@
+import contextlib
+import io
+import json
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import endpoints
+
+
+@pytest.fixture
+def cliente_http(motor_catalogo, monkeypatch):
+    monkeypatch.setattr(endpoints, "motor", motor_catalogo)
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    return TestClient(app)
+
+
+def planificar(cliente_http, max_creditos, modo):
+    carrera = "Ingeniería Civil"
+    with contextlib.redirect_stdout(io.StringIO()):
+        return cliente_http.post("/api/planificar", json={
+            "historial": [], "max_creditos": max_creditos, "carrera": carrera, "modo_seleccion": modo
+        })
+
+
+@pytest.mark.parametrize("modo", ["voraz", "optimo"])
+@pytest.mark.parametrize("max_creditos", [100, 1e9])
+def test_tope_de_creditos_alto_lleva_todos_los_candidatos(cliente_http, modo, max_creditos):
+    # la mochila no crece con el tope: su tabla llega como mucho al peso total
+    inicio = time.perf_counter()
+    respuesta = planificar(cliente_http, max_creditos, modo)
+    assert time.perf_counter() - inicio < 1.0
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert cuerpo["cursos_disponibles"]
+    assert cuerpo["recomendacion_optima"] == cuerpo["cursos_disponibles"]
+
+
+@pytest.mark.parametrize("max_creditos", [0, -5])
+def test_tope_de_creditos_no_positivo(cliente_http, max_creditos):
+    assert planificar(cliente_http, max_creditos, "voraz").status_code == 422
+
+
+def test_lote_responde_una_linea_por_estudiante_en_orden(cliente_http, motor_catalogo):
+    # más estudiantes que líneas por envío, de varias carreras y modos
+    carreras = sorted({motor_catalogo.cursos.carrera(ids[0]) for ids in motor_catalogo._nodos_por_carrera.values()})[:3]
+    estudiantes = [
+        {"historial": [], "max_creditos": 12 + k % 10, "carrera": carreras[k % 3],
+         "modo_seleccion": ("voraz", "optimo")[k % 2]}
+        for k in range(endpoints.LOTE_LINEAS_POR_ENVIO * 2 + 7)
+    ]
+    with contextlib.redirect_stdout(io.StringIO()):
+        respuesta = cliente_http.post("/api/planificar/lote", json=estudiantes)
+        individuales = [cliente_http.post("/api/planificar", json=est).json() for est in estudiantes[:5]]
+    assert respuesta.status_code == 200
+    lineas = [json.loads(linea) for linea in respuesta.text.splitlines()]
+    assert len(lineas) == len(estudiantes)
+    assert [linea["carrera_filtro"] for linea in lineas] == [est["carrera"] for est in estudiantes]
+    assert lineas[:5] == individuales
@@ -0,0 +1,75 @@
+import contextlib
+import io
+import os
+import shutil
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import database
+import endpoints
+import utils
+from conftest import RAIZ
+from motor_academico import MotorAcademico
+from supabase_local import SupabaseLocal, filas_cursos_csv
+
+
+@pytest.fixture
+def entorno(tmp_path, monkeypatch):
+    """Motor publicado sobre un cliente local cuya tabla cursos tiene además un
+    curso que no está en el CSV, para que la recarga incremental lo borre"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        filas = filas_cursos_csv(os.path.join(RAIZ, "mallas_consolidadas.csv"))
+    sobrante = {**filas[0], "codigo": "ZZ999", "nombre": "Curso retirado"}
+    cliente = SupabaseLocal({"cursos": filas + [sobrante], "catalogo_version": [{"id": 1, "version": 1}]})
+    monkeypatch.setattr(database, "_supabase", cliente)
+    monkeypatch.setattr(utils.time, "sleep", lambda segundos: None)
+    monkeypatch.chdir(tmp_path)
+    shutil.copy(os.path.join(RAIZ, "mallas_consolidadas.csv"), tmp_path / "mallas_consolidadas.csv")
+    monkeypatch.setenv("MOTOR_SNAPSHOT_PATH", str(tmp_path / "motor_snapshot.bin"))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        motor = MotorAcademico(None, supabase=cliente)
+    motor.metricas_carga = {"marca": "carga inicial"}
+    monkeypatch.setattr(endpoints, "motor", motor)
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    return TestClient(app), cliente, motor
+
+
+def recargar(cliente_http, modo="incremental"):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return cliente_http.post(f"/api/cursos/recargar?modo={modo}")
+
+
+@pytest.mark.parametrize("operacion", ["delete", "select"])
+def test_error_de_supabase_en_la_recarga_incremental(entorno, operacion):
+    cliente_http, cliente, motor = entorno
+    cliente.fallar = lambda tabla, op: tabla == "cursos" and op == operacion
+    respuesta = recargar(cliente_http)
+
+    assert respuesta.status_code == 502
+    assert endpoints.motor is motor
+    assert motor.metricas_carga == {"marca": "carga inicial"}
+    assert "ZZ999|" + cliente.tablas["cursos"][0]["carrera"] in motor.cursos
+
+
+def test_error_de_supabase_en_la_recarga_completa(entorno):
+    cliente_http, cliente, motor = entorno
+    cliente.fallar = lambda tabla, op: tabla == "cursos" and op == "upsert"
+    respuesta = recargar(cliente_http, "completo")
+
+    assert respuesta.status_code == 502
+    assert "lotes no se pudieron guardar" in respuesta.json()["detail"]
+    assert endpoints.motor is motor
+
+
+def test_recarga_incremental_no_toca_el_motor_publicado(entorno):
+    cliente_http, cliente, motor = entorno
+    respuesta = recargar(cliente_http)
+
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert cuerpo["eliminados"] == 1
+    assert endpoints.motor is not motor
+    assert motor.metricas_carga == {"marca": "carga inicial"}
+    assert all(codigo != "ZZ999" for codigo, _ in (n.split("|") for n in endpoints.motor.cursos))
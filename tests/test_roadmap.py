@@ -0,0 +1,75 @@
+import time
+import pytest
+
+# Cadena MA101 -> MA201 -> MA301 -> MA401 más cursos sueltos: con 7 créditos por
+# semestre la cadena y el total de créditos alcanzables (28) piden 4 semestres,
+# y solo se logran si cada semestre lleva un curso de la cadena
+MALLA = [
+    ("MA101", 3, 1, ""),
+    ("MA201", 3, 2, "MA101"),
+    ("MA301", 3, 3, "MA201"),
+    ("MA401", 3, 4, "MA301"),
+    ("HU101", 4, 1, ""),
+    ("HU102", 4, 1, ""),
+    ("HU103", 4, 1, ""),
+    ("HU201", 4, 2, "HU101 o HU102"),
+    ("EX301", 3, 3, "ZZ999"),
+    ("GR501", 9, 5, ""),
+]
+
+
+def validar_plan(motor, resultado, historial, max_creditos, carrera):
+    aprobados_dict, total = motor._procesar_historial(historial, carrera)
+    for semestre in resultado["semestres"]:
+        assert semestre["creditos"] <= max_creditos
+        assert semestre["creditos"] == sum(c["creditos"] for c in semestre["cursos"])
+        # todo lo del semestre tiene sus requisitos cumplidos al empezarlo
+        for curso in semestre["cursos"]:
+            assert motor.cumple_requisitos(f'{curso["id"]}|{carrera}', aprobados_dict, total)
+        for curso in semestre["cursos"]:
+            aprobados_dict[f'{curso["id"]}|{carrera}'] = curso["creditos"]
+            total += curso["creditos"]
+    return {id_curso.split("|")[0] for id_curso in aprobados_dict}
+
+
+def test_roadmap_optimo_en_malla_chica(motor_malla):
+    motor = motor_malla(MALLA)
+    resultado = motor.generar_roadmap([], 7, "Prueba", presupuesto_segundos=5)
+
+    assert resultado["optimo"]
+    assert resultado["total_semestres"] == 4
+    llevados = validar_plan(motor, resultado, [], 7, "Prueba")
+    # EX301 pide un curso que no existe y GR501 no entra en un semestre de 7 créditos
+    assert {c["id"] for c in resultado["cursos_no_alcanzables"]} == {"EX301", "GR501"}
+    assert llevados == {codigo for codigo, *_ in MALLA} - {"EX301", "GR501"}
+
+
+def test_roadmap_parte_del_historial(motor_malla):
+    motor = motor_malla(MALLA)
+    historial = ["MA101", "MA201", "HU101"]
+    resultado = motor.generar_roadmap(historial, 7, "Prueba", presupuesto_segundos=5)
+
+    assert resultado["optimo"]
+    assert resultado["resumen_creditos_aprobados"] == 10
+    assert resultado["total_semestres"] == 3
+    cursos = {c["id"] for semestre in resultado["semestres"] for c in semestre["cursos"]}
+    assert cursos.isdisjoint(historial)
+    validar_plan(motor, resultado, historial, 7, "Prueba")
+
+
+@pytest.mark.parametrize("max_creditos", [12, 22])
+def test_roadmap_respeta_el_presupuesto_de_tiempo(motor_catalogo, max_creditos):
+    # con un presupuesto mínimo igual devuelve un plan completo y válido (el voraz
+    # o uno mejor), solo que sin garantía de óptimo
+    presupuesto = 0.02
+    for id_curso in list(motor_catalogo._nodos_por_carrera.values())[:20]:
+        carrera = motor_catalogo.cursos.carrera(id_curso[0])
+        inicio = time.perf_counter()
+        resultado = motor_catalogo.generar_roadmap([], max_creditos, carrera, presupuesto_segundos=presupuesto)
+        # margen para armar la partición la primera vez y para la solución voraz inicial
+        assert time.perf_counter() - inicio < presupuesto + 1.0, carrera
+
+        llevados = validar_plan(motor_catalogo, resultado, [], max_creditos, carrera)
+        no_alcanzables = {c["id"] for c in resultado["cursos_no_alcanzables"]}
+        particion = motor_catalogo._obtener_particion(carrera)
+        assert llevados | no_alcanzables == {n.split("|")[0] for n in particion.nodos}, carrera
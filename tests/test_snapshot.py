@@ -0,0 +1,87 @@
+import contextlib
+import io
+import os
+import pytest
+from motor_academico import MotorAcademico
+from supabase_local import SupabaseLocal, filas_cursos_csv
+
+
+@pytest.fixture(scope="module")
+def filas():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return filas_cursos_csv()
+
+
+@pytest.fixture(autouse=True)
+def ruta_snapshot(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "motor_snapshot.bin")
+    monkeypatch.setenv("MOTOR_SNAPSHOT_PATH", ruta)
+    return ruta
+
+
+def arrancar(cliente):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return MotorAcademico(None, supabase=cliente)
+
+
+def descargas_cursos(cliente):
+    return sum(1 for llamada in cliente.llamadas if llamada == ("cursos", "select"))
+
+
+def test_arranque_desde_snapshot_sin_descargar_cursos(filas):
+    cliente = SupabaseLocal({"cursos": filas, "catalogo_version": [{"id": 1, "version": 7}]})
+    motor = arrancar(cliente)
+    assert not motor.desde_snapshot
+    with contextlib.redirect_stdout(io.StringIO()):
+        motor.guardar_snapshot()
+
+    cliente.llamadas.clear()
+    desde_snapshot = arrancar(cliente)
+    assert desde_snapshot.desde_snapshot
+    assert descargas_cursos(cliente) == 0
+    assert len(cliente.llamadas) == 1
+    assert list(desde_snapshot.cursos) == list(motor.cursos)
+
+    carrera = filas[0]["carrera"]
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert desde_snapshot.generar_planificacion([], 22, carrera) == motor.generar_planificacion([], 22, carrera)
+
+
+def test_escritura_en_cursos_vence_el_snapshot(filas):
+    cliente = SupabaseLocal({"cursos": filas, "catalogo_version": [{"id": 1, "version": 1}]})
+    with contextlib.redirect_stdout(io.StringIO()):
+        arrancar(cliente).guardar_snapshot()
+
+    fila = filas[0]
+    cliente.table("cursos").update({"nombre": "Renombrado"}).eq("codigo", fila["codigo"]).eq("carrera", fila["carrera"]).execute()
+    motor = arrancar(cliente)
+    assert not motor.desde_snapshot
+    assert motor.cursos.nombre(f'{fila["codigo"]}|{fila["carrera"]}') == "Renombrado"
+
+
+def test_sin_tabla_de_version_no_hay_snapshot(filas, ruta_snapshot):
+    cliente = SupabaseLocal({"cursos": filas})
+    motor = arrancar(cliente)
+    assert len(motor.cursos) > 0 and motor._marca_cargada is None
+    with contextlib.redirect_stdout(io.StringIO()):
+        motor.guardar_snapshot()
+    assert not os.path.exists(ruta_snapshot)
+
+
+def test_snapshot_no_arma_carreras_pendientes(filas):
+    cliente = SupabaseLocal({"cursos": filas, "catalogo_version": [{"id": 1, "version": 1}]})
+    motor = arrancar(cliente)
+    carreras = sorted({f["carrera"] for f in filas})
+    usada, otra = carreras[0], carreras[1]
+    with contextlib.redirect_stdout(io.StringIO()):
+        motor.generar_planificacion([], 22, usada)
+        motor.guardar_snapshot()
+    assert set(motor._particiones) == {motor._normalizar_carrera(usada)}
+
+    desde_snapshot = arrancar(cliente)
+    assert desde_snapshot.desde_snapshot
+    # solo la carrera armada trae sus descendientes; la otra se calcula al usarla
+    assert {MotorAcademico._extraer_carrera(n) for n in desde_snapshot._descendientes_precalculados} == {usada}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for carrera in (usada, otra):
+            assert desde_snapshot.generar_planificacion([], 22, carrera) == motor.generar_planificacion([], 22, carrera)
@@ -0,0 +1,139 @@
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+from database import get_supabase
+
+# Una consulta recibe el cliente de Supabase y devuelve la respuesta ya ejecutada
+Consulta = Callable[[Any], Any]
+
+_unidad_actual: ContextVar[Optional["UnidadTrabajo"]] = ContextVar("unidad_trabajo", default=None)
+_lock_estadisticas = threading.Lock()
+_estadisticas: Dict[str, Dict[str, int]] = {}
+
+
+class UnidadTrabajo:
+    """Acceso a Supabase de una operación: cada lectura se hace una sola vez,
+    las independientes van en paralelo y cada escritura invalida las lecturas
+    de su tabla.
+
+    Las claves de lectura empiezan por el nombre de la tabla.
+    """
+
+    def __init__(self, nombre: str, supabase=None):
+        self.nombre = nombre
+        self.supabase = supabase or get_supabase()
+        self._lecturas: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.viajes = 0
+        self.reutilizadas = 0
+
+    def _contar_viaje(self):
+        with self._lock:
+            self.viajes += 1
+
+    def _reservar(self, clave: Hashable) -> Tuple[Future, bool]:
+        # Devuelve (futuro, True si esta llamada debe ejecutar la consulta)
+        with self._lock:
+            futuro = self._lecturas.get(clave)
+            if futuro is not None:
+                self.reutilizadas += 1
+                return futuro, False
+            futuro = self._lecturas[clave] = Future()
+            return futuro, True
+
+    def _ejecutar(self, clave: Hashable, futuro: Future, consulta: Consulta):
+        self._contar_viaje()
+        try:
+            futuro.set_result(consulta(self.supabase))
+        except Exception as e:
+            # un error no queda guardado: la próxima lectura lo vuelve a intentar
+            with self._lock:
+                if self._lecturas.get(clave) is futuro:
+                    del self._lecturas[clave]
+            futuro.set_exception(e)
+
+    def leer(self, clave: Hashable, consulta: Consulta) -> Any:
+        futuro, ejecutar = self._reservar(clave)
+        if ejecutar:
+            self._ejecutar(clave, futuro, consulta)
+        return futuro.result()
+
+    def _lanzar(self, lecturas: Sequence[Tuple[Hashable, Consulta]]) -> List[Future]:
+        # Ejecuta en paralelo las lecturas que todavía no se hicieron
+        reservas = [(clave, consulta, *self._reservar(clave)) for clave, consulta in lecturas]
+        pendientes = [(clave, futuro, consulta) for clave, consulta, futuro, ejecutar in reservas if ejecutar]
+        if len(pendientes) == 1:
+            self._ejecutar(*pendientes[0])
+        elif pendientes:
+            with ThreadPoolExecutor(max_workers=len(pendientes)) as executor:
+                for pendiente in pendientes:
+                    executor.submit(self._ejecutar, *pendiente)
+        return [futuro for _, _, futuro, _ in reservas]
+
+    def leer_varias(self, lecturas: Sequence[Tuple[Hashable, Consulta]]) -> List[Any]:
+        return [futuro.result() for futuro in self._lanzar(lecturas)]
+
+    def precargar(self, lecturas: Sequence[Tuple[Hashable, Consulta]]):
+        # Adelanta lecturas que la operación hará después; si alguna falla, el
+        # error aparece (y se reintenta) cuando se lea de verdad
+        self._lanzar(lecturas)
+
+    def escribir(self, tabla: str, consulta: Consulta) -> Any:
+        self._contar_viaje()
+        try:
+            return consulta(self.supabase)
+        finally:
+            # aunque falle, la escritura pudo haberse aplicado
+            self.invalidar(tabla)
+
+    def invalidar(self, tabla: str):
+        with self._lock:
+            for clave in [c for c in self._lecturas if isinstance(c, tuple) and c and c[0] == tabla]:
+                del self._lecturas[clave]
+
+
+@contextmanager
+def unidad_trabajo(nombre: str) -> Iterator[UnidadTrabajo]:
+    # Si ya hay una unidad abierta (un servicio que llama a otro) se reutiliza
+    actual = _unidad_actual.get()
+    if actual is not None:
+        yield actual
+        return
+
+    unidad = UnidadTrabajo(nombre)
+    token = _unidad_actual.set(unidad)
+    try:
+        yield unidad
+    finally:
+        _unidad_actual.reset(token)
+        with _lock_estadisticas:
+            estadisticas = _estadisticas.setdefault(nombre, {"operaciones": 0, "viajes": 0, "reutilizadas": 0})
+            estadisticas["operaciones"] += 1
+            estadisticas["viajes"] += unidad.viajes
+            estadisticas["reutilizadas"] += unidad.reutilizadas
+        print(f"🔁 {nombre}: {unidad.viajes} viajes a Supabase, {unidad.reutilizadas} lecturas reutilizadas")
+
+
+def unidad_actual() -> UnidadTrabajo:
+    unidad = _unidad_actual.get()
+    if unidad is None:
+        # fuera de una operación cada llamada va sola
+        unidad = UnidadTrabajo("sin_unidad")
+    return unidad
+
+
+def en_unidad_trabajo(funcion: Callable) -> Callable:
+    """Ejecuta la función dentro de una unidad de trabajo con su nombre"""
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        with unidad_trabajo(funcion.__name__):
+            return funcion(*args, **kwargs)
+    return envoltura
+
+
+def estadisticas_viajes() -> Dict[str, Dict[str, int]]:
+    with _lock_estadisticas:
+        return {nombre: dict(valores) for nombre, valores in _estadisticas.items()}
@@ -1,6 +1,9 @@
 import pandas as pd
 import math
-from typing import Any
+import time
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
 
 
 def limpiar_valor_nan(valor: Any, valor_default: Any) -> Any:
@@ -45,3 +48,15 @@ def eliminar_duplicados_lote(lote: list) -> list:
         lote_unicos[clave] = curso
     return list(lote_unicos.values())
 
+
+def reintentar(operacion: Callable[[], T], descripcion: str, intentos: int = 3, espera_inicial: float = 0.5) -> T:
+    # backoff exponencial: espera_inicial, 2x, 4x...; el último error se propaga
+    for intento in range(1, intentos + 1):
+        try:
+            return operacion()
+        except Exception as e:
+            if intento == intentos:
+                raise
+            espera = espera_inicial * 2 ** (intento - 1)
+            print(f"⚠️  Falló {descripcion} (intento {intento}/{intentos}): {e}. Reintentando en {espera:.1f}s")
+            time.sleep(espera)